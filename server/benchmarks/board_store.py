@@ -0,0 +1,123 @@
+"""Compare per-object territory updates against the vectorized BoardStore.
+
+Runs the per-tick work of the grand board simulation for many sessions at
+once: resource accrual, detecting territories that changed hands and the
+map control check. Requires NumPy (``pip install riskier-server[numpy]``).
+Run from the ``server`` directory:
+
+    python -m benchmarks.board_store --sessions 2000 --territories 48
+"""
+import argparse
+import random
+import time
+from collections import Counter
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+from uuid import UUID, uuid4
+
+from src.game import BoardStore
+
+COMMANDERS = 4
+VICTORY_SHARE = 0.6
+
+# One Python object per territory, as the board first kept them; the baseline
+@dataclass(slots=True)
+class NaiveTerritory:
+    owner: Optional[UUID]
+    income: float
+    units: int
+    previous_owner: Optional[UUID] = None
+
+@dataclass(slots=True)
+class NaiveBoard:
+    commanders: List[UUID]
+    territories: List[NaiveTerritory]
+    resources: Dict[UUID, float]
+
+def build_naive(sessions: int, territories: int) -> List[NaiveBoard]:
+    boards = []
+    for _ in range(sessions):
+        commanders = [uuid4() for _ in range(COMMANDERS)]
+        boards.append(NaiveBoard(
+            commanders=commanders,
+            territories=[
+                NaiveTerritory(owner=commanders[i % COMMANDERS], income=1.0, units=3, previous_owner=commanders[i % COMMANDERS])
+                for i in range(territories)
+            ],
+            resources={commander: 0.0 for commander in commanders}
+        ))
+    return boards
+
+def build_store(sessions: int, territories: int) -> tuple:
+    store = BoardStore(max_commanders=COMMANDERS)
+    keys = []
+    for _ in range(sessions):
+        key = uuid4()
+        store.add(key, [i % COMMANDERS for i in range(territories)], [3] * territories, [1.0] * territories, VICTORY_SHARE)
+        keys.append(key)
+    return store, keys
+
+def captures(sessions: int, territories: int, per_tick: int, ticks: int, seed: int = 1) -> List[List[tuple]]:
+    """The same (session, territory, new owner) captures for both implementations"""
+    rng = random.Random(seed)
+    return [
+        [(rng.randrange(sessions), rng.randrange(territories), rng.randrange(COMMANDERS)) for _ in range(per_tick)]
+        for _ in range(ticks)
+    ]
+
+def run_naive(boards: List[NaiveBoard], plan: List[List[tuple]], seconds: float) -> float:
+    start = time.perf_counter()
+    for tick_captures in plan:
+        for session, territory, commander in tick_captures:
+            board = boards[session]
+            board.territories[territory].owner = board.commanders[commander]
+        changed = []
+        for board in boards:
+            captured = False
+            for territory in board.territories:
+                if territory.owner is not None:
+                    board.resources[territory.owner] += territory.income * seconds
+                if territory.owner != territory.previous_owner:
+                    territory.previous_owner = territory.owner
+                    captured = True
+            if captured:
+                changed.append(board)
+        for board in changed:
+            counts = Counter(territory.owner for territory in board.territories if territory.owner is not None)
+            for count in counts.values():
+                if count >= VICTORY_SHARE * len(board.territories):
+                    break
+    return len(plan) / (time.perf_counter() - start)
+
+def run_store(store: BoardStore, keys: List[UUID], plan: List[List[tuple]], seconds: float) -> float:
+    start = time.perf_counter()
+    for tick_captures in plan:
+        for session, territory, commander in tick_captures:
+            store.owner[store.ranges[keys[session]][1] + territory] = commander
+        store.accrue(seconds)
+        store.leaders(store.ownership_changes())
+    return len(plan) / (time.perf_counter() - start)
+
+def main(args: argparse.Namespace) -> None:
+    plan = captures(args.sessions, args.territories, args.captures, args.ticks)
+    seconds = 1.0 / args.tick_rate
+    naive = run_naive(build_naive(args.sessions, args.territories), plan, seconds)
+    store, keys = build_store(args.sessions, args.territories)
+    vectorized = run_store(store, keys, plan, seconds)
+
+    print(
+        f"{args.sessions} sessions x {args.territories} territories, "
+        f"{args.captures} captures per tick, {args.tick_rate:g} ticks/s budget"
+    )
+    for label, rate in (("per-object", naive), ("BoardStore", vectorized)):
+        print(f"{label:>10}: {rate:10.1f} ticks/s  {1000 / rate:8.3f} ms/tick")
+    print(f"   speedup: {vectorized / naive:10.1f}x")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=2000)
+    parser.add_argument("--territories", type=int, default=48)
+    parser.add_argument("--captures", type=int, default=20)
+    parser.add_argument("--ticks", type=int, default=200)
+    parser.add_argument("--tick-rate", type=float, default=10.0)
+    main(parser.parse_args())
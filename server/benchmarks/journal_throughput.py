@@ -0,0 +1,122 @@
+"""Compare per-message command storage against the write-behind journal.
+
+Three ways of journaling the same messages are timed:
+
+* ``baseline``: what the server did before the journal, an INSERT and a
+  commit per message on a connection in SQLite's default rollback-journal
+  mode, where every commit is synced to disk
+* ``per-message``: one commit per message on the current ``SQLiteDatabase``
+  (WAL) with the given ``synchronous`` mode
+* ``write-behind``: ``CommandJournal`` group-committing into the same database
+
+With ``--synchronous FULL`` (the default) every commit waits for an fsync, as
+the baseline's did. ``NORMAL``, the server's default, only syncs at WAL
+checkpoints, so there batching saves per-commit overhead rather than fsyncs.
+Use ``--dir`` to put the databases on the disk being measured; temporary
+directories may be on tmpfs.
+
+Run from the ``server`` directory:
+
+    python -m benchmarks.journal_throughput --messages 5000
+"""
+import argparse
+import asyncio
+import json
+import tempfile
+import time
+from pathlib import Path
+from uuid import uuid4
+
+import aiosqlite
+
+from src.database.journal import CommandJournal
+from src.database.sqlite import SQLiteDatabase
+
+
+def make_payload(i: int) -> dict:
+    return {"type": "chat", "lobby_id": "bench", "sender": "bench", "message": f"message {i}"}
+
+async def bench_baseline(db_path: str, messages: int) -> float:
+    conn = await aiosqlite.connect(db_path)
+    try:
+        await conn.execute('''
+            CREATE TABLE websocket_commands (
+                id TEXT PRIMARY KEY,
+                client_id TEXT NOT NULL,
+                message_type TEXT NOT NULL,
+                action TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                timestamp REAL NOT NULL,
+                processed BOOLEAN DEFAULT FALSE
+            )
+        ''')
+        await conn.commit()
+        start = time.perf_counter()
+        for i in range(messages):
+            async with conn.cursor() as cursor:
+                payload = json.dumps(make_payload(i))
+                row = (str(uuid4()), "bench", "chat", "send", payload, time.time())
+                await cursor.execute('''
+                    INSERT INTO websocket_commands
+                        (id, client_id, message_type, action, payload, timestamp)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                ''', row)
+                await conn.commit()
+        return messages / (time.perf_counter() - start)
+    finally:
+        await conn.close()
+
+async def bench_direct(db_path: str, messages: int, synchronous: str) -> float:
+    db = SQLiteDatabase(db_path, synchronous=synchronous)
+    await db.connect()
+    try:
+        start = time.perf_counter()
+        for i in range(messages):
+            await db.store_websocket_command("bench", "chat", "send", make_payload(i))
+        return messages / (time.perf_counter() - start)
+    finally:
+        await db.disconnect()
+
+async def bench_journal(
+    db_path: str, messages: int, synchronous: str, batch_size: int, flush_interval: float
+) -> float:
+    db = SQLiteDatabase(db_path, synchronous=synchronous)
+    await db.connect()
+    journal = CommandJournal(db, batch_size=batch_size, flush_interval=flush_interval)
+    await journal.start()
+    try:
+        start = time.perf_counter()
+        for i in range(messages):
+            await journal.record("bench", "chat", "send", make_payload(i))
+        await journal.flush()
+        return messages / (time.perf_counter() - start)
+    finally:
+        await journal.close()
+        await db.disconnect()
+
+async def main(args: argparse.Namespace) -> None:
+    with tempfile.TemporaryDirectory(dir=args.dir) as tmp:
+        baseline = await bench_baseline(str(Path(tmp) / "baseline.db"), args.messages)
+        direct = await bench_direct(str(Path(tmp) / "direct.db"), args.messages, args.synchronous)
+        journaled = await bench_journal(
+            str(Path(tmp) / "journal.db"),
+            args.messages,
+            args.synchronous,
+            args.batch_size,
+            args.flush_interval
+        )
+    mode = f"WAL {args.synchronous:<6}"
+    print(f"baseline, commit per message:     {baseline:10.0f} msg/s")
+    print(f"{mode} commit per message: {direct:10.0f} msg/s ({direct / baseline:.1f}x)")
+    print(f"{mode} write-behind batch: {journaled:10.0f} msg/s ({journaled / baseline:.1f}x)")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--messages", type=int, default=5000)
+    parser.add_argument("--batch-size", type=int, default=256)
+    parser.add_argument("--flush-interval", type=float, default=0.05)
+    parser.add_argument(
+        "--synchronous", default="FULL", choices=("OFF", "NORMAL", "FULL", "EXTRA")
+    )
+    parser.add_argument("--dir", help="directory for the databases (default: system temp dir)")
+    asyncio.run(main(parser.parse_args()))
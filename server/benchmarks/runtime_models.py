@@ -0,0 +1,121 @@
+"""Compare pydantic runtime models against the slotted dataclass models.
+
+Measures memory held by N connected players spread over lobbies, and the
+throughput of the join/leave mutations the server performs per message.
+Run from the ``server`` directory:
+
+    python -m benchmarks.runtime_models --players 100000
+"""
+import argparse
+import gc
+import time
+import tracemalloc
+from typing import Dict, Optional
+from uuid import UUID, uuid4
+
+from pydantic import BaseModel, Field
+
+from src.models import GameSession, GameState, PlayerRole
+
+# The previous BaseModel-based runtime models, kept here as the baseline
+class PydanticPlayer(BaseModel):
+    id: UUID = Field(default_factory=uuid4)
+    name: str
+    role: PlayerRole
+    session_id: Optional[UUID] = None
+
+class PydanticSession(BaseModel):
+    id: UUID = Field(default_factory=uuid4)
+    name: str
+    players: Dict[UUID, PydanticPlayer] = Field(default_factory=dict)
+    max_commanders: int = 2
+    max_pawns: int = 4
+    created_at: float = Field(default_factory=time.time)
+
+PLAYERS_PER_LOBBY = 6
+
+def role_for(i: int) -> PlayerRole:
+    return PlayerRole.COMMANDER if i % PLAYERS_PER_LOBBY < 2 else PlayerRole.PAWN
+
+def build_pydantic(players: int) -> tuple:
+    sessions = {}
+    all_players = {}
+    for lobby in range(players // PLAYERS_PER_LOBBY):
+        session = PydanticSession(name=f"lobby {lobby}")
+        sessions[session.id] = session
+        for i in range(PLAYERS_PER_LOBBY):
+            player = PydanticPlayer(name=f"player {i}", role=role_for(i))
+            all_players[player.id] = player
+            player.session_id = session.id
+            session.players[player.id] = player
+    return sessions, all_players
+
+def build_runtime(players: int) -> GameState:
+    state = GameState()
+    for lobby in range(players // PLAYERS_PER_LOBBY):
+        session = GameSession(name=f"lobby {lobby}")
+        state.sessions[session.id] = session
+        for i in range(PLAYERS_PER_LOBBY):
+            player = state.create_player(f"player {i}", role_for(i))
+            player.session_id = session.id
+            session.try_reserve_slot(player.role)
+            session.add_player(player)
+    return state
+
+def measure_memory(build, players: int) -> tuple:
+    gc.collect()
+    start = time.perf_counter()
+    result = build(players)
+    elapsed = time.perf_counter() - start
+    del result
+    gc.collect()
+    tracemalloc.start()
+    result = build(players)
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return current, elapsed
+
+def churn_pydantic(players: int, rounds: int) -> float:
+    sessions, all_players = build_pydantic(players)
+    pairs = [(p, sessions[p.session_id]) for p in all_players.values()]
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for player, session in pairs:
+            session.players.pop(player.id, None)
+            player.session_id = None
+            player.session_id = session.id
+            session.players[player.id] = player
+    return rounds * len(pairs) / (time.perf_counter() - start)
+
+def churn_runtime(players: int, rounds: int) -> float:
+    state = build_runtime(players)
+    pairs = [(p, state.sessions[p.session_id]) for p in state.players.values()]
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for player, session in pairs:
+            session.remove_player(player.id)
+            player.session_id = None
+            session.try_reserve_slot(player.role)
+            player.session_id = session.id
+            session.add_player(player)
+    return rounds * len(pairs) / (time.perf_counter() - start)
+
+def main(args: argparse.Namespace) -> None:
+    results = {}
+    for label, build, churn in (
+        ("pydantic", build_pydantic, churn_pydantic),
+        ("dataclass", build_runtime, churn_runtime),
+    ):
+        memory, build_time = measure_memory(build, args.players)
+        results[label] = (memory, build_time, churn(args.players, args.rounds))
+
+    print(f"{args.players} players, {PLAYERS_PER_LOBBY} per lobby")
+    for label, (memory, build_time, ops) in results.items():
+        print(f"{label:>10}: {memory / 2**20:8.1f} MiB  build {build_time:6.2f}s  {ops:12.0f} leave+join/s")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--players", type=int, default=100000)
+    parser.add_argument("--rounds", type=int, default=3)
+    main(parser.parse_args())
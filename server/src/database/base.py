@@ -1,7 +1,44 @@
+import base64
+import time
 from abc import ABC, abstractmethod
-from typing import Optional, List, Dict, Any
+from functools import wraps
+from typing import AsyncContextManager, Optional, List, Dict, Any, Tuple
 from uuid import UUID
 
+from src.log import get_logger
+from src.metrics import REGISTRY
+from src.models.codec import CodecError, Frame, decode_frame
+
+logger = get_logger(__name__)
+
+QUERY_SECONDS = REGISTRY.histogram(
+    "risker_db_query_seconds", "Time spent in database operations", ("operation",)
+)
+
+def timed(method):
+    """Record the duration of a database operation when metrics are enabled"""
+    operation = method.__name__
+
+    @wraps(method)
+    async def wrapper(*args, **kwargs):
+        if not REGISTRY.enabled:
+            return await method(*args, **kwargs)
+        start = time.perf_counter()
+        try:
+            return await method(*args, **kwargs)
+        finally:
+            QUERY_SECONDS.observe(time.perf_counter() - start, operation)
+    return wrapper
+
+def decode_command_payload(command_id: str, frame: Frame, codec: str) -> Dict[str, Any]:
+    """Decode a journaled frame; one that does not decode is kept base64-encoded, so it can still be archived"""
+    try:
+        return decode_frame(frame, codec)
+    except CodecError as e:
+        logger.warning("Undecodable journaled command", command_id=command_id, codec=codec, error=str(e))
+        raw = frame if isinstance(frame, bytes) else frame.encode()
+        return {"undecodable": base64.b64encode(raw).decode()}
+
 class Database(ABC):
     @abstractmethod
     async def connect(self) -> None:
@@ -13,6 +50,11 @@ class Database(ABC):
         """Close database connection"""
         pass
 
+    @abstractmethod
+    def transaction(self) -> AsyncContextManager[None]:
+        """Run the enclosed operations in one transaction, committed on exit and rolled back on error"""
+        pass
+
     @abstractmethod
     async def create_tables(self) -> None:
         """Create necessary database tables if they don't exist"""
@@ -20,8 +62,10 @@ class Database(ABC):
 
     # Lobby operations
     @abstractmethod
-    async def create_lobby(self, name: str, max_commanders: int, max_pawns: int) -> Dict[str, Any]:
-        """Create a new lobby"""
+    async def create_lobby(
+        self, name: str, max_commanders: int, max_pawns: int, lobby_id: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """Create a new lobby, with a generated ID unless one is given"""
         pass
 
     @abstractmethod
@@ -30,8 +74,13 @@ class Database(ABC):
         pass
 
     @abstractmethod
-    async def list_lobbies(self) -> List[Dict[str, Any]]:
-        """List all lobbies"""
+    async def list_lobbies(
+        self,
+        status: Optional[str] = None,
+        limit: Optional[int] = None,
+        cursor: Optional[str] = None,
+    ) -> List[Dict[str, Any]]:
+        """List lobbies, optionally filtered by status and paginated after a cursor lobby ID"""
         pass
 
     @abstractmethod
@@ -46,8 +95,13 @@ class Database(ABC):
 
     # Player operations
     @abstractmethod
-    async def create_player(self, name: str, role: str) -> Dict[str, Any]:
-        """Create a new player"""
+    async def create_player(self, name: str, role: str, player_id: Optional[str] = None) -> Dict[str, Any]:
+        """Create a new player, with a generated ID unless one is given"""
+        pass
+
+    @abstractmethod
+    async def create_players(self, players: List[Tuple[Optional[str], str, str]]) -> List[Dict[str, Any]]:
+        """Create several players from (id, name, role) tuples, generating the IDs given as None"""
         pass
 
     @abstractmethod
@@ -71,6 +125,11 @@ class Database(ABC):
         """Add a player to a lobby"""
         pass
 
+    @abstractmethod
+    async def add_players_to_lobby(self, player_ids: List[UUID], lobby_id: UUID) -> int:
+        """Add several players to a lobby and return how many were added"""
+        pass
+
     @abstractmethod
     async def remove_player_from_lobby(self, player_id: UUID, lobby_id: UUID) -> bool:
         """Remove a player from a lobby"""
@@ -79,4 +138,63 @@ class Database(ABC):
     @abstractmethod
     async def get_lobby_players(self, lobby_id: UUID) -> List[Dict[str, Any]]:
         """Get all players in a lobby"""
-        pass 
\ No newline at end of file
+        pass 
+
+    @abstractmethod
+    async def get_lobbies_players(self, lobby_ids: List[UUID]) -> Dict[str, List[Dict[str, Any]]]:
+        """Get the players of several lobbies, keyed by lobby ID"""
+        pass
+
+    # Command journal operations
+    @abstractmethod
+    async def store_websocket_commands(self, commands: List[Tuple[str, str, str, str, Any, str, float]]) -> int:
+        """Store a batch of (id, client_id, message_type, action, payload, codec, timestamp) commands"""
+        pass
+
+    @abstractmethod
+    async def get_unprocessed_commands(self, limit: int = 100) -> List[Dict[str, Any]]:
+        """Get unprocessed WebSocket commands"""
+        pass
+
+    @abstractmethod
+    async def mark_command_processed(self, command_id: str) -> bool:
+        """Mark a WebSocket command as processed"""
+        pass
+
+    @abstractmethod
+    async def mark_commands_processed(self, command_ids: List[str]) -> int:
+        """Mark several WebSocket commands as processed and return how many were updated"""
+        pass
+
+    @abstractmethod
+    async def get_commands_before(self, before: float, processed: bool = True, limit: int = 1000) -> List[Dict[str, Any]]:
+        """Get the oldest commands journaled before a timestamp, in (timestamp, id) order"""
+        pass
+
+    @abstractmethod
+    async def delete_commands(self, command_ids: List[str]) -> int:
+        """Delete journaled commands, e.g. once they have been archived"""
+        pass
+
+    # Retention
+    @abstractmethod
+    async def get_expired_lobbies(self, finished_before: float, abandoned_before: float, limit: int = 500) -> List[str]:
+        """IDs of lobbies whose status changed to finished before ``finished_before`` and of
+        lobbies that are not in progress, have no members and last changed
+        status (or were created) before ``abandoned_before``"""
+        pass
+
+    @abstractmethod
+    async def delete_lobbies(self, lobby_ids: List[str]) -> int:
+        """Delete lobbies and their memberships"""
+        pass
+
+    @abstractmethod
+    async def delete_orphan_players(self, before: float) -> int:
+        """Delete players created before a timestamp that are no longer in any lobby"""
+        pass
+
+    @abstractmethod
+    async def compact(self) -> None:
+        """Return space freed by deletions to the filesystem, where the backend does not do it itself"""
+        pass
@@ -0,0 +1,19 @@
+from typing import Optional
+
+from .base import Database
+from .postgres import PostgresDatabase
+from .sqlite import SQLiteDatabase
+
+def database_from_url(url: Optional[str]) -> Database:
+    """Database backend for a configured URL.
+
+    ``postgres://`` and ``postgresql://`` URLs select Postgres, ``sqlite:///path``
+    selects SQLite at that path, and no URL keeps the default ``risker.db``.
+    """
+    if not url:
+        return SQLiteDatabase()
+    if url.startswith(("postgres://", "postgresql://")):
+        return PostgresDatabase(url)
+    if url.startswith("sqlite:///"):
+        return SQLiteDatabase(url[len("sqlite:///"):])
+    raise ValueError(f"Unsupported database URL: {url}")
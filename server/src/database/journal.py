@@ -0,0 +1,123 @@
+import asyncio
+import time
+from typing import Optional, List, Tuple, Dict, Any, Union
+from uuid import uuid4
+
+from src.log import get_logger
+from src.models.codec import JSON
+
+from .base import Database
+
+logger = get_logger(__name__)
+
+# (id, client_id, message_type, action, payload, codec, timestamp)
+CommandRow = Tuple[str, str, str, str, Any, str, float]
+# A queued command ID on its own marks that command as processed
+JournalEntry = Union[CommandRow, str]
+
+class CommandJournal:
+    """Write-behind journal that group-commits WebSocket commands.
+
+    Commands are queued in memory and written by a single background task in
+    batches, one transaction per batch. A batch is flushed once it reaches
+    ``batch_size`` commands or ``flush_interval`` seconds after its first
+    command arrived, whichever comes first. The queue is bounded by
+    ``max_pending``; once it is full, ``record`` waits for the writer to catch
+    up, which applies backpressure to the connection handlers.
+
+    Once a command has been handled, ``processed`` queues its ID behind the
+    command itself, so the mark is written in the same or a later batch.
+    """
+
+    def __init__(
+        self,
+        db: Database,
+        batch_size: int = 256,
+        flush_interval: float = 0.05,
+        max_pending: int = 10000,
+    ):
+        self.db = db
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue: asyncio.Queue[JournalEntry] = asyncio.Queue(maxsize=max_pending)
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def pending(self) -> int:
+        """Number of commands and processed marks queued but not yet written"""
+        return self._queue.qsize()
+
+    async def start(self) -> None:
+        """Start the background writer task"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def record(
+        self,
+        client_id: str,
+        message_type: str,
+        action: str,
+        payload: Union[str, bytes, Dict[str, Any]],
+        codec: str = JSON.name,
+    ) -> str:
+        """Queue a command for journaling and return its ID.
+
+        ``payload`` may be the raw inbound frame, which is stored as received
+        along with the name of the ``codec`` it is read back with.
+        """
+        command_id = str(uuid4())
+        await self._queue.put((command_id, client_id, message_type, action, payload, codec, time.time()))
+        return command_id
+
+    async def processed(self, command_id: str) -> None:
+        """Queue a recorded command to be marked processed"""
+        await self._queue.put(command_id)
+
+    async def flush(self) -> None:
+        """Wait until every queued command has been written"""
+        await self._queue.join()
+
+    async def close(self) -> None:
+        """Flush pending commands and stop the writer task"""
+        if self._task is None:
+            return
+        await self.flush()
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def _next_batch(self) -> List[JournalEntry]:
+        loop = asyncio.get_running_loop()
+        batch = [await self._queue.get()]
+        deadline = loop.time() + self.flush_interval
+        while len(batch) < self.batch_size:
+            if not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+                continue
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self) -> None:
+        while True:
+            batch = await self._next_batch()
+            commands = [entry for entry in batch if isinstance(entry, tuple)]
+            processed = [entry for entry in batch if isinstance(entry, str)]
+            try:
+                if commands:
+                    await self.db.store_websocket_commands(commands)
+                if processed:
+                    await self.db.mark_commands_processed(processed)
+            except Exception:
+                logger.error("Failed to write journaled commands", count=len(batch), exc_info=True)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
@@ -0,0 +1,558 @@
+import asyncio
+import json
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Optional, List, Dict, Any, Tuple, Union
+from uuid import uuid4
+
+try:
+    import asyncpg
+except ImportError:  # optional: pip install riskier-server[postgres]
+    asyncpg = None
+
+from src.log import get_logger
+
+from .base import Database, decode_command_payload, timed
+
+logger = get_logger(__name__)
+
+# Same shape as the SQLite lobby summary query, with members collected into arrays
+_LOBBY_SUMMARY_QUERY = '''
+    SELECT l.id, l.name, l.max_commanders, l.max_pawns, l.status, l.created_at,
+           coalesce(array_agg(p.id) FILTER (WHERE p.role = 'commander'), '{{}}') AS commanders,
+           coalesce(array_agg(p.id) FILTER (WHERE p.role <> 'commander'), '{{}}') AS pawns
+    FROM (
+        SELECT * FROM lobbies l
+        {where}
+        ORDER BY l.created_at, l.id
+        {limit}
+    ) l
+    LEFT JOIN lobby_players lp ON lp.lobby_id = l.id
+    LEFT JOIN players p ON p.id = lp.player_id
+    GROUP BY l.id, l.name, l.max_commanders, l.max_pawns, l.status, l.created_at
+    ORDER BY l.created_at, l.id
+'''
+
+_COMMAND_COLUMNS = ("id", "client_id", "message_type", "action", "payload", "is_binary", "codec", "timestamp")
+
+def _encode_payload(payload: Union[str, bytes, Dict[str, Any]]) -> Tuple[bytes, bool]:
+    # Raw frames are stored as received; the flag tells binary frames from text ones
+    if isinstance(payload, bytes):
+        return payload, True
+    if isinstance(payload, str):
+        return payload.encode(), False
+    return json.dumps(payload).encode(), False
+
+def _rowcount(status: str) -> int:
+    # asyncpg returns the command tag, e.g. "UPDATE 1" or "INSERT 0 3"
+    return int(status.rsplit(" ", 1)[-1])
+
+def _command_from_record(record: Any) -> Dict[str, Any]:
+    return {
+        "id": record["id"],
+        "client_id": record["client_id"],
+        "message_type": record["message_type"],
+        "action": record["action"],
+        "payload": decode_command_payload(
+            record["id"], record["payload"] if record["is_binary"] else record["payload"].decode(), record["codec"]
+        ),
+        "timestamp": record["timestamp"],
+        "processed": record["processed"]
+    }
+
+def _lobby_from_record(record: Any) -> Dict[str, Any]:
+    return {
+        "id": record["id"],
+        "name": record["name"],
+        "max_commanders": record["max_commanders"],
+        "max_pawns": record["max_pawns"],
+        "status": record["status"],
+        "created_at": record["created_at"],
+        "commanders": list(record["commanders"]),
+        "pawns": list(record["pawns"])
+    }
+
+class PostgresDatabase(Database):
+    """Postgres storage over an asyncpg connection pool.
+
+    asyncpg prepares each parameterized query on the server the first time a
+    pooled connection runs it and reuses the prepared statement afterwards,
+    keeping up to ``statement_cache_size`` per connection. Journal batches
+    are written with COPY.
+    """
+
+    def __init__(
+        self,
+        dsn: str,
+        min_size: int = 2,
+        max_size: int = 10,
+        statement_cache_size: int = 256,
+        command_timeout: float = 10.0,
+    ):
+        self.dsn = dsn
+        self.min_size = min_size
+        self.max_size = max_size
+        self.statement_cache_size = statement_cache_size
+        self.command_timeout = command_timeout
+        self.pool = None
+        # Connection holding the open transaction of each task inside transaction()
+        self._transactions: Dict[asyncio.Task, Any] = {}
+
+    async def connect(self) -> None:
+        """Open the connection pool"""
+        if asyncpg is None:
+            raise RuntimeError("Postgres support is not installed")
+        self.pool = await asyncpg.create_pool(
+            self.dsn,
+            min_size=self.min_size,
+            max_size=self.max_size,
+            statement_cache_size=self.statement_cache_size,
+            command_timeout=self.command_timeout
+        )
+        await self.create_tables()
+
+    async def disconnect(self) -> None:
+        """Close the connection pool"""
+        if self.pool:
+            await self.pool.close()
+            self.pool = None
+
+    @asynccontextmanager
+    async def _connection(self) -> AsyncIterator[Any]:
+        """The current task's transaction connection, or one borrowed from the pool"""
+        if not self.pool:
+            raise RuntimeError("Database not connected")
+        conn = self._transactions.get(asyncio.current_task())
+        if conn is not None:
+            yield conn
+            return
+        async with self.pool.acquire() as conn:
+            yield conn
+
+    @asynccontextmanager
+    async def transaction(self) -> AsyncIterator[None]:
+        """Run the enclosed operations in one transaction, committed on exit and rolled back on error.
+
+        Operations from the same task run on the transaction's connection;
+        nested calls join the outer transaction.
+        """
+        if not self.pool:
+            raise RuntimeError("Database not connected")
+        task = asyncio.current_task()
+        if task in self._transactions:
+            yield
+            return
+        async with self.pool.acquire() as conn, conn.transaction():
+            self._transactions[task] = conn
+            try:
+                yield
+            finally:
+                del self._transactions[task]
+
+    async def create_tables(self) -> None:
+        """Create necessary database tables if they don't exist"""
+        async with self._connection() as conn, conn.transaction():
+            # Shard workers start together; serialize their schema setup
+            await conn.execute("SELECT pg_advisory_xact_lock(hashtext('risker_schema'))")
+            await conn.execute('''
+                CREATE TABLE IF NOT EXISTS lobbies (
+                    id TEXT PRIMARY KEY,
+                    name TEXT NOT NULL,
+                    max_commanders INTEGER NOT NULL,
+                    max_pawns INTEGER NOT NULL,
+                    status TEXT NOT NULL DEFAULT 'waiting',
+                    created_at DOUBLE PRECISION NOT NULL,
+                    data JSONB,
+                    status_changed_at DOUBLE PRECISION NOT NULL
+                )
+            ''')
+            if not await self._has_column(conn, "lobbies", "status_changed_at"):
+                await conn.execute(
+                    "ALTER TABLE lobbies ADD COLUMN status_changed_at DOUBLE PRECISION NOT NULL DEFAULT 0"
+                )
+                await conn.execute("UPDATE lobbies SET status_changed_at = created_at")
+            await conn.execute('''
+                CREATE TABLE IF NOT EXISTS players (
+                    id TEXT PRIMARY KEY,
+                    name TEXT NOT NULL,
+                    role TEXT NOT NULL,
+                    created_at DOUBLE PRECISION NOT NULL,
+                    data JSONB
+                )
+            ''')
+            await conn.execute('''
+                CREATE TABLE IF NOT EXISTS lobby_players (
+                    lobby_id TEXT NOT NULL REFERENCES lobbies(id),
+                    player_id TEXT NOT NULL REFERENCES players(id),
+                    joined_at DOUBLE PRECISION NOT NULL,
+                    PRIMARY KEY (lobby_id, player_id)
+                )
+            ''')
+            # No foreign key on client_id: Postgres enforces it, and one unknown
+            # client would fail a whole COPY batch
+            await conn.execute('''
+                CREATE TABLE IF NOT EXISTS websocket_commands (
+                    id TEXT PRIMARY KEY,
+                    client_id TEXT NOT NULL,
+                    message_type TEXT NOT NULL,
+                    action TEXT NOT NULL,
+                    payload BYTEA NOT NULL,
+                    is_binary BOOLEAN NOT NULL DEFAULT FALSE,
+                    timestamp DOUBLE PRECISION NOT NULL,
+                    processed BOOLEAN NOT NULL DEFAULT FALSE,
+                    codec TEXT NOT NULL DEFAULT 'json'
+                )
+            ''')
+            if not await self._has_column(conn, "websocket_commands", "codec"):
+                # Journals written before the codec was stored held MessagePack frames as binary
+                await conn.execute("ALTER TABLE websocket_commands ADD COLUMN codec TEXT NOT NULL DEFAULT 'json'")
+                await conn.execute("UPDATE websocket_commands SET codec = 'msgpack' WHERE is_binary")
+            await conn.execute('''
+                CREATE INDEX IF NOT EXISTS idx_lobbies_status_created
+                ON lobbies (status, created_at, id)
+            ''')
+            await conn.execute('''
+                CREATE INDEX IF NOT EXISTS idx_lobbies_created
+                ON lobbies (created_at, id)
+            ''')
+            # Finished lobbies expire by when they finished
+            await conn.execute('''
+                CREATE INDEX IF NOT EXISTS idx_lobbies_status_changed
+                ON lobbies (status, status_changed_at)
+            ''')
+            await conn.execute('''
+                CREATE INDEX IF NOT EXISTS idx_lobby_players_player
+                ON lobby_players (player_id)
+            ''')
+            # Replay reads unprocessed commands and archival processed ones, both oldest first
+            await conn.execute('''
+                CREATE INDEX IF NOT EXISTS idx_websocket_commands_processed
+                ON websocket_commands (processed, timestamp)
+            ''')
+
+    @staticmethod
+    async def _has_column(conn: Any, table: str, column: str) -> bool:
+        """Whether a table has a column, to add columns missing from databases created by older versions"""
+        return bool(await conn.fetchval('''
+            SELECT 1 FROM information_schema.columns
+            WHERE table_schema = current_schema() AND table_name = $1 AND column_name = $2
+        ''', table, column))
+
+    @timed
+    async def create_lobby(
+        self, name: str, max_commanders: int, max_pawns: int, lobby_id: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """Create a new lobby, with a generated ID unless one is given"""
+        lobby_id = lobby_id or str(uuid4())
+        created_at = time.time()
+
+        async with self._connection() as conn:
+            await conn.execute('''
+                INSERT INTO lobbies (id, name, max_commanders, max_pawns, created_at, status_changed_at)
+                VALUES ($1, $2, $3, $4, $5, $5)
+            ''', lobby_id, name, max_commanders, max_pawns, created_at)
+        logger.debug("Lobby row created", lobby_id=lobby_id)
+
+        return {
+            "id": lobby_id,
+            "name": name,
+            "max_commanders": max_commanders,
+            "max_pawns": max_pawns,
+            "status": "waiting",
+            "created_at": created_at,
+            "commanders": [],
+            "pawns": []
+        }
+
+    @timed
+    async def get_lobby(self, lobby_id: str) -> Optional[Dict[str, Any]]:
+        """Get lobby by ID"""
+        async with self._connection() as conn:
+            record = await conn.fetchrow(_LOBBY_SUMMARY_QUERY.format(where="WHERE l.id = $1", limit=""), lobby_id)
+            return _lobby_from_record(record) if record else None
+
+    @timed
+    async def list_lobbies(
+        self,
+        status: Optional[str] = None,
+        limit: Optional[int] = None,
+        cursor: Optional[str] = None,
+    ) -> List[Dict[str, Any]]:
+        """List lobbies with their commander and pawn IDs.
+
+        Lobbies are ordered by creation time. ``cursor`` is the ID of the last
+        lobby from a previous page; only lobbies after it are returned.
+        """
+        conditions = []
+        params: List[Any] = []
+        if status is not None:
+            params.append(status)
+            conditions.append(f"l.status = ${len(params)}")
+        if cursor is not None:
+            params.append(cursor)
+            conditions.append(f"(l.created_at, l.id) > (SELECT created_at, id FROM lobbies WHERE id = ${len(params)})")
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        limit_clause = ""
+        if limit is not None:
+            params.append(limit)
+            limit_clause = f"LIMIT ${len(params)}"
+
+        async with self._connection() as conn:
+            records = await conn.fetch(_LOBBY_SUMMARY_QUERY.format(where=where, limit=limit_clause), *params)
+            return [_lobby_from_record(record) for record in records]
+
+    @timed
+    async def update_lobby(self, lobby_id: str, data: Dict[str, Any]) -> bool:
+        """Update lobby data; a new status also records when it changed"""
+        async with self._connection() as conn:
+            # The SET expressions all see the row as it was before the update
+            status = await conn.execute('''
+                UPDATE lobbies
+                SET name = $1, max_commanders = $2, max_pawns = $3, status = $4,
+                    status_changed_at = CASE WHEN status = $4 THEN status_changed_at ELSE $6 END
+                WHERE id = $5
+            ''', data.get("name"), data.get("max_commanders"), data.get("max_pawns"), data.get("status"), lobby_id,
+                time.time())
+            return _rowcount(status) > 0
+
+    @timed
+    async def delete_lobby(self, lobby_id: str) -> bool:
+        """Delete a lobby"""
+        async with self._connection() as conn, conn.transaction():
+            await conn.execute('DELETE FROM lobby_players WHERE lobby_id = $1', lobby_id)
+            status = await conn.execute('DELETE FROM lobbies WHERE id = $1', lobby_id)
+            return _rowcount(status) > 0
+
+    @timed
+    async def create_player(self, name: str, role: str, player_id: Optional[str] = None) -> Dict[str, Any]:
+        """Create a new player, with a generated ID unless one is given"""
+        player_id = player_id or str(uuid4())
+        created_at = time.time()
+
+        async with self._connection() as conn:
+            await conn.execute('''
+                INSERT INTO players (id, name, role, created_at)
+                VALUES ($1, $2, $3, $4)
+            ''', player_id, name, role, created_at)
+
+        return {
+            "id": player_id,
+            "name": name,
+            "role": role,
+            "created_at": created_at
+        }
+
+    @timed
+    async def create_players(self, players: List[Tuple[Optional[str], str, str]]) -> List[Dict[str, Any]]:
+        """Create players from ``(id, name, role)`` tuples in one statement; None IDs are generated"""
+        created_at = time.time()
+        created = [
+            {"id": player_id or str(uuid4()), "name": name, "role": role, "created_at": created_at}
+            for player_id, name, role in players
+        ]
+
+        async with self._connection() as conn:
+            await conn.execute('''
+                INSERT INTO players (id, name, role, created_at)
+                SELECT id, name, role, $4::float8 FROM unnest($1::text[], $2::text[], $3::text[]) AS p (id, name, role)
+            ''', [p["id"] for p in created], [p["name"] for p in created], [p["role"] for p in created], created_at)
+
+        return created
+
+    @timed
+    async def get_player(self, player_id: str) -> Optional[Dict[str, Any]]:
+        """Get player by ID"""
+        async with self._connection() as conn:
+            record = await conn.fetchrow('SELECT id, name, role, created_at FROM players WHERE id = $1', player_id)
+            return dict(record) if record else None
+
+    @timed
+    async def update_player(self, player_id: str, data: Dict[str, Any]) -> bool:
+        """Update player data"""
+        async with self._connection() as conn:
+            status = await conn.execute('''
+                UPDATE players
+                SET name = $1, role = $2
+                WHERE id = $3
+            ''', data.get("name"), data.get("role"), player_id)
+            return _rowcount(status) > 0
+
+    @timed
+    async def delete_player(self, player_id: str) -> bool:
+        """Delete a player"""
+        async with self._connection() as conn, conn.transaction():
+            await conn.execute('DELETE FROM lobby_players WHERE player_id = $1', player_id)
+            status = await conn.execute('DELETE FROM players WHERE id = $1', player_id)
+            return _rowcount(status) > 0
+
+    @timed
+    async def add_player_to_lobby(self, player_id: str, lobby_id: str) -> bool:
+        """Add a player to a lobby"""
+        # ON CONFLICT rather than catching the error, which would abort an enclosing transaction
+        async with self._connection() as conn:
+            status = await conn.execute('''
+                INSERT INTO lobby_players (lobby_id, player_id, joined_at)
+                VALUES ($1, $2, $3)
+                ON CONFLICT DO NOTHING
+            ''', lobby_id, player_id, time.time())
+            return _rowcount(status) > 0
+
+    @timed
+    async def add_players_to_lobby(self, player_ids: List[str], lobby_id: str) -> int:
+        """Add several players to a lobby with one statement; players already in it are skipped"""
+        async with self._connection() as conn:
+            status = await conn.execute('''
+                INSERT INTO lobby_players (lobby_id, player_id, joined_at)
+                SELECT $1::text, player_id, $3::float8 FROM unnest($2::text[]) AS player_id
+                ON CONFLICT DO NOTHING
+            ''', lobby_id, list(player_ids), time.time())
+            return _rowcount(status)
+
+    @timed
+    async def remove_player_from_lobby(self, player_id: str, lobby_id: str) -> bool:
+        """Remove a player from a lobby"""
+        async with self._connection() as conn:
+            status = await conn.execute('''
+                DELETE FROM lobby_players
+                WHERE lobby_id = $1 AND player_id = $2
+            ''', lobby_id, player_id)
+            return _rowcount(status) > 0
+
+    @timed
+    async def get_lobby_players(self, lobby_id: str) -> List[Dict[str, Any]]:
+        """Get all players in a lobby"""
+        async with self._connection() as conn:
+            records = await conn.fetch('''
+                SELECT p.id, p.name, p.role, p.created_at, lp.joined_at
+                FROM players p
+                JOIN lobby_players lp ON p.id = lp.player_id
+                WHERE lp.lobby_id = $1
+            ''', lobby_id)
+            return [dict(record) for record in records]
+
+    @timed
+    async def get_lobbies_players(self, lobby_ids: List[str]) -> Dict[str, List[Dict[str, Any]]]:
+        """Get the players of several lobbies with one query, keyed by lobby ID"""
+        players: Dict[str, List[Dict[str, Any]]] = {lobby_id: [] for lobby_id in lobby_ids}
+        async with self._connection() as conn:
+            records = await conn.fetch('''
+                SELECT lp.lobby_id, p.id, p.name, p.role, p.created_at, lp.joined_at
+                FROM lobby_players lp
+                JOIN players p ON p.id = lp.player_id
+                WHERE lp.lobby_id = ANY($1::text[])
+            ''', list(lobby_ids))
+        for record in records:
+            member = dict(record)
+            players[member.pop("lobby_id")].append(member)
+        return players
+
+    @timed
+    async def store_websocket_commands(self, commands: List[Tuple[str, str, str, str, Any, str, float]]) -> int:
+        """Store a batch of WebSocket commands with a single COPY.
+
+        Each command is an ``(id, client_id, message_type, action, payload, codec, timestamp)`` tuple.
+        """
+        rows = [
+            (command_id, client_id, message_type, action, *_encode_payload(payload), codec, timestamp)
+            for command_id, client_id, message_type, action, payload, codec, timestamp in commands
+        ]
+
+        async with self._connection() as conn:
+            await conn.copy_records_to_table("websocket_commands", records=rows, columns=_COMMAND_COLUMNS)
+
+        return len(rows)
+
+    @timed
+    async def get_unprocessed_commands(self, limit: int = 100) -> List[Dict[str, Any]]:
+        """Get unprocessed WebSocket commands"""
+        async with self._connection() as conn:
+            records = await conn.fetch('''
+                SELECT id, client_id, message_type, action, payload, is_binary, codec, timestamp, processed
+                FROM websocket_commands
+                WHERE processed = FALSE
+                ORDER BY timestamp ASC
+                LIMIT $1
+            ''', limit)
+            return [_command_from_record(record) for record in records]
+
+    @timed
+    async def mark_command_processed(self, command_id: str) -> bool:
+        """Mark a WebSocket command as processed"""
+        async with self._connection() as conn:
+            status = await conn.execute('''
+                UPDATE websocket_commands
+                SET processed = TRUE
+                WHERE id = $1
+            ''', command_id)
+            return _rowcount(status) > 0
+
+    @timed
+    async def mark_commands_processed(self, command_ids: List[str]) -> int:
+        """Mark several WebSocket commands as processed with one statement"""
+        async with self._connection() as conn:
+            status = await conn.execute('''
+                UPDATE websocket_commands
+                SET processed = TRUE
+                WHERE id = ANY($1::text[]) AND processed = FALSE
+            ''', list(command_ids))
+            return _rowcount(status)
+
+    @timed
+    async def get_commands_before(self, before: float, processed: bool = True, limit: int = 1000) -> List[Dict[str, Any]]:
+        """Get the oldest commands journaled before a timestamp"""
+        async with self._connection() as conn:
+            records = await conn.fetch('''
+                SELECT id, client_id, message_type, action, payload, is_binary, codec, timestamp, processed
+                FROM websocket_commands
+                WHERE processed = $1 AND timestamp < $2
+                ORDER BY timestamp, id
+                LIMIT $3
+            ''', processed, before, limit)
+            return [_command_from_record(record) for record in records]
+
+    @timed
+    async def delete_commands(self, command_ids: List[str]) -> int:
+        """Delete journaled commands"""
+        async with self._connection() as conn:
+            status = await conn.execute(
+                "DELETE FROM websocket_commands WHERE id = ANY($1::text[])", list(command_ids)
+            )
+            return _rowcount(status)
+
+    @timed
+    async def get_expired_lobbies(self, finished_before: float, abandoned_before: float, limit: int = 500) -> List[str]:
+        """IDs of lobbies finished a while ago and of old lobbies nobody is in"""
+        async with self._connection() as conn:
+            records = await conn.fetch('''
+                SELECT id FROM lobbies
+                WHERE status = 'finished' AND status_changed_at < $1
+                UNION
+                SELECT l.id FROM lobbies l
+                WHERE l.status <> 'in_progress' AND l.status_changed_at < $2
+                  AND NOT EXISTS (SELECT 1 FROM lobby_players lp WHERE lp.lobby_id = l.id)
+                LIMIT $3
+            ''', finished_before, abandoned_before, limit)
+            return [record["id"] for record in records]
+
+    @timed
+    async def delete_lobbies(self, lobby_ids: List[str]) -> int:
+        """Delete lobbies and their memberships"""
+        lobby_ids = list(lobby_ids)
+        async with self._connection() as conn, conn.transaction():
+            await conn.execute("DELETE FROM lobby_players WHERE lobby_id = ANY($1::text[])", lobby_ids)
+            status = await conn.execute("DELETE FROM lobbies WHERE id = ANY($1::text[])", lobby_ids)
+            return _rowcount(status)
+
+    @timed
+    async def delete_orphan_players(self, before: float) -> int:
+        """Delete old players that are no longer in any lobby"""
+        async with self._connection() as conn:
+            status = await conn.execute('''
+                DELETE FROM players p
+                WHERE p.created_at < $1
+                  AND NOT EXISTS (SELECT 1 FROM lobby_players lp WHERE lp.player_id = p.id)
+            ''', before)
+            return _rowcount(status)
+
+    async def compact(self) -> None:
+        """Nothing to do: autovacuum reclaims the rows retention deletes"""
@@ -0,0 +1,209 @@
+import asyncio
+import gzip
+import os
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional
+
+from src.log import get_logger
+from src.metrics import REGISTRY
+from src.models.codec import JSON
+
+from .base import Database
+
+logger = get_logger(__name__)
+
+ARCHIVED_COMMANDS = REGISTRY.counter("risker_archived_commands_total", "Journaled commands moved to archive segments")
+EXPIRED_LOBBIES = REGISTRY.counter("risker_expired_lobbies_total", "Lobbies deleted by retention")
+EXPIRED_PLAYERS = REGISTRY.counter("risker_expired_players_total", "Players deleted by retention")
+MAINTENANCE_SECONDS = REGISTRY.histogram("risker_maintenance_seconds", "Time spent in one retention pass")
+
+@dataclass(frozen=True, slots=True)
+class RetentionPolicy:
+    """How long rows are kept and where archived commands go; durations are in seconds"""
+    interval: float = 300.0
+    archive_dir: str = "archive"
+    # Processed commands are moved to the archive once they are this old
+    archive_after: float = 3600.0
+    # Unprocessed commands are archived as well after this long; None keeps them
+    command_retention: Optional[float] = 7 * 86400.0
+    # Finished lobbies are kept this long after the game ended
+    finished_lobby_ttl: float = 86400.0
+    # Lobbies nobody is in, unless a game is in progress
+    abandoned_lobby_ttl: float = 3600.0
+    # Players are deleted once they are in no lobby and older than this
+    player_ttl: float = 86400.0
+    segment_size: int = 10000
+    lobby_page_size: int = 500
+
+def write_segment(directory: Path, commands: List[Dict[str, Any]]) -> Path:
+    """Write commands to a gzip-compressed JSON lines segment, atomically"""
+    directory.mkdir(parents=True, exist_ok=True)
+    first = commands[0]
+    # Names sort by the first command's timestamp
+    path = directory / f"commands-{int(first['timestamp'] * 1000):015d}-{first['id'][:8]}.jsonl.gz"
+    partial = path.with_suffix(".tmp")
+    with gzip.open(partial, "wt", encoding="utf-8") as segment:
+        for command in commands:
+            segment.write(JSON.encode(command))
+            segment.write("\n")
+    with open(partial, "rb") as segment:
+        os.fsync(segment.fileno())
+    os.replace(partial, path)
+    return path
+
+def read_segment(path: Path) -> List[Dict[str, Any]]:
+    """Read the commands back from an archive segment"""
+    with gzip.open(path, "rt", encoding="utf-8") as segment:
+        return [JSON.decode(line) for line in segment if line.strip()]
+
+async def _run_now(key: Hashable, call: Callable[..., Awaitable[Any]], *args: Any) -> Any:
+    return await call(*args)
+
+class Maintenance:
+    """Background retention pass over the journal, lobbies and players.
+
+    Every ``policy.interval`` seconds old commands are written to compressed
+    segment files under ``policy.archive_dir`` and only then deleted, expired
+    lobbies and orphaned players are deleted, and the database is compacted.
+    A crash between writing a segment and deleting its rows archives those
+    commands again next pass, so segments may overlap but never lose a command.
+
+    ``select_lobbies`` narrows the expired lobby IDs to the ones this process
+    may delete, for instance those it owns and nobody is connected to, and
+    ``on_lobbies_deleted`` is awaited with the IDs that were deleted. Each
+    lobby is checked again and deleted through ``run_for_lobby(lobby_id,
+    call, *args)``, which lets the caller serialize the deletion with other
+    changes to that lobby, such as a ``KeyedExecutor``'s ``run``. With
+    ``shared=False`` commands and players are left to another process, as
+    they are not partitioned between shards.
+    """
+
+    def __init__(
+        self,
+        db: Database,
+        policy: Optional[RetentionPolicy] = None,
+        select_lobbies: Callable[[List[str]], List[str]] = list,
+        on_lobbies_deleted: Optional[Callable[[List[str]], Awaitable[None]]] = None,
+        shared: bool = True,
+        run_for_lobby: Optional[Callable[..., Awaitable[Any]]] = None,
+    ):
+        self.db = db
+        self.policy = policy or RetentionPolicy()
+        self.select_lobbies = select_lobbies
+        self.on_lobbies_deleted = on_lobbies_deleted
+        self.run_for_lobby = run_for_lobby or _run_now
+        self.shared = shared
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def close(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def run_once(self, now: Optional[float] = None) -> Dict[str, int]:
+        """Run one retention pass and return how many rows it removed"""
+        now = time.time() if now is None else now
+        start = time.perf_counter()
+        stats = {"commands": 0, "lobbies": 0, "players": 0}
+        # Each step runs even if another one fails, so one bad row cannot hold up the rest
+        stats["lobbies"] = await self._step("lobbies", self.expire_lobbies(now))
+        if self.shared:
+            stats["commands"] = await self._step("commands", self.archive_commands(now))
+            stats["players"] = await self._step(
+                "players", self.db.delete_orphan_players(now - self.policy.player_ttl)
+            )
+            if REGISTRY.enabled:
+                EXPIRED_PLAYERS.inc(amount=stats["players"])
+        if any(stats.values()):
+            await self._step("compact", self.db.compact())
+        if REGISTRY.enabled:
+            MAINTENANCE_SECONDS.observe(time.perf_counter() - start)
+        return stats
+
+    async def _step(self, name: str, step: Awaitable[Optional[int]]) -> int:
+        try:
+            return await step or 0
+        except Exception:
+            logger.error("Retention step failed", step=name, exc_info=True)
+            return 0
+
+    async def archive_commands(self, now: float) -> int:
+        """Move old commands to archive segments, one segment per batch"""
+        cutoffs = [(True, now - self.policy.archive_after)]
+        if self.policy.command_retention is not None:
+            cutoffs.append((False, now - self.policy.command_retention))
+        directory = Path(self.policy.archive_dir)
+        archived = 0
+        for processed, before in cutoffs:
+            while True:
+                try:
+                    commands = await self.db.get_commands_before(before, processed, self.policy.segment_size)
+                    if not commands:
+                        break
+                    path = await asyncio.to_thread(write_segment, directory, commands)
+                    await self.db.delete_commands([command["id"] for command in commands])
+                except Exception:
+                    # The same batch would fail again; the other cutoff and steps still run
+                    logger.error("Failed to archive commands", processed=processed, exc_info=True)
+                    break
+                archived += len(commands)
+                if REGISTRY.enabled:
+                    ARCHIVED_COMMANDS.inc(amount=len(commands))
+                logger.debug("Archived commands", path=str(path), count=len(commands))
+                if len(commands) < self.policy.segment_size:
+                    break
+        return archived
+
+    async def expire_lobbies(self, now: float) -> int:
+        """Delete finished and abandoned lobbies, a page at a time"""
+        deleted = 0
+        while True:
+            expired = await self.db.get_expired_lobbies(
+                now - self.policy.finished_lobby_ttl,
+                now - self.policy.abandoned_lobby_ttl,
+                self.policy.lobby_page_size
+            )
+            results = await asyncio.gather(*(
+                self.run_for_lobby(lobby_id, self.expire_lobby, lobby_id)
+                for lobby_id in self.select_lobbies(expired)
+            ), return_exceptions=True)
+            for result in results:
+                if isinstance(result, Exception):
+                    logger.error("Failed to expire lobby", exc_info=result)
+            page = sum(result is True for result in results)
+            deleted += page
+            if REGISTRY.enabled:
+                EXPIRED_LOBBIES.inc(amount=page)
+            # Lobbies kept back would come up again on the same page
+            if page < len(expired) or len(expired) < self.policy.lobby_page_size:
+                return deleted
+
+    async def expire_lobby(self, lobby_id: str) -> bool:
+        """Delete one expired lobby, unless it was joined while waiting for its turn"""
+        if not self.select_lobbies([lobby_id]) or not await self.db.delete_lobbies([lobby_id]):
+            return False
+        if self.on_lobbies_deleted:
+            await self.on_lobbies_deleted([lobby_id])
+        return True
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.policy.interval)
+            try:
+                stats = await self.run_once()
+            except Exception:
+                logger.error("Retention pass failed", exc_info=True)
+                continue
+            if any(stats.values()):
+                logger.info("Retention pass finished", **stats)
@@ -1,32 +1,202 @@
+import asyncio
 import sqlite3
 import aiosqlite
 import time
-import logging
-from typing import Optional, List, Dict, Any
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Optional, List, Dict, Any, Set, Tuple, Union
 from uuid import uuid4
 import json
 from pathlib import Path
 
-from .base import Database
-
-logger = logging.getLogger(__name__)
+from src.log import get_logger
+from src.models.codec import JSON
+
+from .base import Database, decode_command_payload, timed
+
+logger = get_logger(__name__)
+
+# Lobbies with their members aggregated per role, in a single pass over lobby_players.
+# Lobby filters are applied in a subquery so LIMIT counts lobbies rather than members.
+_LOBBY_SUMMARY_QUERY = '''
+    SELECT l.id, l.name, l.max_commanders, l.max_pawns, l.status, l.created_at,
+           group_concat(CASE WHEN p.role = 'commander' THEN p.id END),
+           group_concat(CASE WHEN p.role <> 'commander' THEN p.id END)
+    FROM (
+        SELECT * FROM lobbies l
+        {where}
+        ORDER BY l.created_at, l.id
+        {limit}
+    ) l
+    LEFT JOIN lobby_players lp ON lp.lobby_id = l.id
+    LEFT JOIN players p ON p.id = lp.player_id
+    GROUP BY l.id
+    ORDER BY l.created_at, l.id
+'''
+
+_COMMAND_COLUMNS = "id, client_id, message_type, action, payload, timestamp, processed, codec"
+
+def _encode_payload(payload: Union[str, bytes, Dict[str, Any]]) -> Union[str, bytes]:
+    # Raw frames are stored as received; the codec column says how to read them back
+    if isinstance(payload, (str, bytes)):
+        return payload
+    return json.dumps(payload)
+
+def _command_from_row(row: tuple) -> Dict[str, Any]:
+    return {
+        "id": row[0],
+        "client_id": row[1],
+        "message_type": row[2],
+        "action": row[3],
+        "payload": decode_command_payload(row[0], row[4], row[7]),
+        "timestamp": row[5],
+        "processed": bool(row[6])
+    }
+
+def _lobby_from_row(row: tuple) -> Dict[str, Any]:
+    return {
+        "id": row[0],
+        "name": row[1],
+        "max_commanders": row[2],
+        "max_pawns": row[3],
+        "status": row[4],
+        "created_at": row[5],
+        "commanders": row[6].split(",") if row[6] else [],
+        "pawns": row[7].split(",") if row[7] else []
+    }
 
 class SQLiteDatabase(Database):
-    def __init__(self, db_path: str = "risker.db"):
+    """SQLite storage with one writer connection and a pool of read-only connections.
+
+    The database runs in WAL mode, so readers see the last committed state
+    without waiting for the writer and lookups like ``list_lobbies`` do not
+    queue behind journal inserts. Every aiosqlite connection owns a thread,
+    so ``readers`` bounds how many queries run in parallel with the writer;
+    with ``readers=0`` all queries share the writer connection.
+    """
+
+    def __init__(
+        self,
+        db_path: str = "risker.db",
+        readers: int = 4,
+        synchronous: str = "NORMAL",
+        mmap_size: int = 256 * 1024 * 1024,
+        cache_size_kib: int = 16 * 1024,
+        busy_timeout: float = 5.0,
+    ):
         self.db_path = db_path
+        # An in-memory database is private to its connection, so it cannot be pooled
+        self.readers = 0 if db_path == ":memory:" else readers
+        # NORMAL only fsyncs at checkpoints in WAL mode; a power loss can drop the
+        # last commits but never corrupts the database
+        if synchronous.upper() not in ("OFF", "NORMAL", "FULL", "EXTRA"):
+            raise ValueError(f"Invalid synchronous mode: {synchronous}")
+        self.synchronous = synchronous.upper()
+        self.mmap_size = mmap_size
+        self.cache_size_kib = cache_size_kib
+        self.busy_timeout = busy_timeout
         self.conn: Optional[aiosqlite.Connection] = None
+        self._readers: List[aiosqlite.Connection] = []
+        self._idle_readers: asyncio.Queue[aiosqlite.Connection] = asyncio.Queue()
+        # Writes share one connection, so a transaction must keep other tasks' writes out
+        self._write_lock = asyncio.Lock()
+        self._transaction_task: Optional[asyncio.Task] = None
 
     async def connect(self) -> None:
-        """Establish database connection"""
-        self.conn = await aiosqlite.connect(self.db_path)
+        """Establish the writer connection, then open the read-only pool"""
+        self.conn = await aiosqlite.connect(self.db_path, timeout=self.busy_timeout)
+        # Lets compact() hand pages freed by retention back to the filesystem; only
+        # takes effect on a new database file (existing ones need a one-off VACUUM)
+        await self.conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        await self.conn.execute("PRAGMA journal_mode = WAL")
+        await self.conn.execute(f"PRAGMA synchronous = {self.synchronous}")
+        await self._tune(self.conn)
         await self.create_tables()
 
+        uri = f"{Path(self.db_path).resolve().as_uri()}?mode=ro"
+        for _ in range(self.readers):
+            reader = await aiosqlite.connect(uri, uri=True, timeout=self.busy_timeout)
+            await self._tune(reader)
+            self._readers.append(reader)
+            self._idle_readers.put_nowait(reader)
+
     async def disconnect(self) -> None:
-        """Close database connection"""
+        """Close database connections"""
+        for reader in self._readers:
+            await reader.close()
+        self._readers.clear()
+        self._idle_readers = asyncio.Queue()
         if self.conn:
             await self.conn.close()
             self.conn = None
 
+    async def _tune(self, conn: aiosqlite.Connection) -> None:
+        await conn.execute(f"PRAGMA mmap_size = {int(self.mmap_size)}")
+        # Negative values are in KiB rather than pages
+        await conn.execute(f"PRAGMA cache_size = -{int(self.cache_size_kib)}")
+
+    @asynccontextmanager
+    async def _reader(self) -> AsyncIterator[aiosqlite.Connection]:
+        """Borrow a read-only connection, or the writer when the pool is empty"""
+        if not self.conn:
+            raise RuntimeError("Database not connected")
+        if not self._readers or self._in_transaction():
+            # Inside a transaction, reads must see its uncommitted writes
+            yield self.conn
+            return
+        conn = await self._idle_readers.get()
+        try:
+            yield conn
+        finally:
+            self._idle_readers.put_nowait(conn)
+
+    @asynccontextmanager
+    async def _write(self) -> AsyncIterator[aiosqlite.Cursor]:
+        """A writer cursor whose statements are committed on exit, unless a transaction is open"""
+        if not self.conn:
+            raise RuntimeError("Database not connected")
+        if self._in_transaction():
+            async with self.conn.cursor() as cursor:
+                yield cursor
+            return
+        async with self._write_lock:
+            try:
+                async with self.conn.cursor() as cursor:
+                    yield cursor
+            except BaseException:
+                await self.conn.rollback()
+                raise
+            await self.conn.commit()
+
+    @asynccontextmanager
+    async def transaction(self) -> AsyncIterator[None]:
+        """Run the enclosed operations in one transaction, committed on exit and rolled back on error.
+
+        Writes from other tasks wait until the transaction ends; nested calls from the same task join
+        the outer transaction.
+        """
+        if not self.conn:
+            raise RuntimeError("Database not connected")
+        if self._in_transaction():
+            yield
+            return
+        async with self._write_lock:
+            self._transaction_task = asyncio.current_task()
+            try:
+                # Take the database write lock up front so another process cannot make us fail midway
+                await self.conn.execute("BEGIN IMMEDIATE")
+                yield
+            except BaseException:
+                await self.conn.rollback()
+                raise
+            else:
+                await self.conn.commit()
+            finally:
+                self._transaction_task = None
+
+    def _in_transaction(self) -> bool:
+        """Whether the current task has a transaction open"""
+        return self._transaction_task is not None and self._transaction_task is asyncio.current_task()
+
     async def create_tables(self) -> None:
         """Create necessary database tables if they don't exist"""
         if not self.conn:
@@ -42,9 +212,13 @@ class SQLiteDatabase(Database):
                     max_pawns INTEGER NOT NULL,
                     status TEXT NOT NULL DEFAULT 'waiting',
                     created_at REAL NOT NULL,
-                    data TEXT
+                    data TEXT,
+                    status_changed_at REAL NOT NULL
                 )
             ''')
+            if "status_changed_at" not in await self._columns(cursor, "lobbies"):
+                await cursor.execute("ALTER TABLE lobbies ADD COLUMN status_changed_at REAL NOT NULL DEFAULT 0")
+                await cursor.execute("UPDATE lobbies SET status_changed_at = created_at")
 
             # Create players table
             await cursor.execute('''
@@ -79,27 +253,63 @@ class SQLiteDatabase(Database):
                     payload TEXT NOT NULL,
                     timestamp REAL NOT NULL,
                     processed BOOLEAN DEFAULT FALSE,
+                    codec TEXT NOT NULL DEFAULT 'json',
                     FOREIGN KEY (client_id) REFERENCES players(id)
                 )
             ''')
+            if "codec" not in await self._columns(cursor, "websocket_commands"):
+                # Journals written before the codec was stored held MessagePack frames as blobs
+                await cursor.execute("ALTER TABLE websocket_commands ADD COLUMN codec TEXT NOT NULL DEFAULT 'json'")
+                await cursor.execute("UPDATE websocket_commands SET codec = 'msgpack' WHERE typeof(payload) = 'blob'")
 
-            await self.conn.commit()
+            # Member lookups by lobby_id are covered by the (lobby_id, player_id) primary key index.
+            # Lobby browsing filters on status and pages by (created_at, id)
+            await cursor.execute('''
+                CREATE INDEX IF NOT EXISTS idx_lobbies_status_created
+                ON lobbies (status, created_at, id)
+            ''')
+            await cursor.execute('''
+                CREATE INDEX IF NOT EXISTS idx_lobbies_created
+                ON lobbies (created_at, id)
+            ''')
+            # Finished lobbies expire by when they finished
+            await cursor.execute('''
+                CREATE INDEX IF NOT EXISTS idx_lobbies_status_changed
+                ON lobbies (status, status_changed_at)
+            ''')
+            # Finding players without a lobby needs memberships by player_id
+            await cursor.execute('''
+                CREATE INDEX IF NOT EXISTS idx_lobby_players_player
+                ON lobby_players (player_id)
+            ''')
+            # Replay reads unprocessed commands and archival processed ones, both oldest first
+            await cursor.execute('''
+                CREATE INDEX IF NOT EXISTS idx_websocket_commands_processed
+                ON websocket_commands (processed, timestamp)
+            ''')
 
-    async def create_lobby(self, name: str, max_commanders: int, max_pawns: int) -> Dict[str, Any]:
-        """Create a new lobby"""
-        if not self.conn:
-            raise RuntimeError("Database not connected")
+            await self.conn.commit()
 
-        lobby_id = str(uuid4())
+    @staticmethod
+    async def _columns(cursor: aiosqlite.Cursor, table: str) -> Set[str]:
+        """Column names of a table, to add columns missing from databases created by older versions"""
+        await cursor.execute(f"PRAGMA table_info({table})")
+        return {row[1] for row in await cursor.fetchall()}
+
+    @timed
+    async def create_lobby(
+        self, name: str, max_commanders: int, max_pawns: int, lobby_id: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """Create a new lobby, with a generated ID unless one is given"""
+        lobby_id = lobby_id or str(uuid4())
         created_at = time.time()
 
-        async with self.conn.cursor() as cursor:
+        async with self._write() as cursor:
             await cursor.execute('''
-                INSERT INTO lobbies (id, name, max_commanders, max_pawns, created_at)
-                VALUES (?, ?, ?, ?, ?)
-            ''', (lobby_id, name, max_commanders, max_pawns, created_at))
-            await self.conn.commit()
-        logger.info(f"Lobby created: {lobby_id}")
+                INSERT INTO lobbies (id, name, max_commanders, max_pawns, created_at, status_changed_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+            ''', (lobby_id, name, max_commanders, max_pawns, created_at, created_at))
+        logger.debug("Lobby row created", lobby_id=lobby_id)
 
         return {
             "id": lobby_id,
@@ -112,137 +322,92 @@ class SQLiteDatabase(Database):
             "pawns": []
         }
 
+    @timed
     async def get_lobby(self, lobby_id: str) -> Optional[Dict[str, Any]]:
         """Get lobby by ID"""
-        if not self.conn:
-            raise RuntimeError("Database not connected")
-
-        async with self.conn.cursor() as cursor:
-            await cursor.execute('''
-                SELECT * FROM lobbies WHERE id = ?
-            ''', (lobby_id,))
+        async with self._reader() as conn, conn.cursor() as cursor:
+            await cursor.execute(_LOBBY_SUMMARY_QUERY.format(where="WHERE l.id = ?", limit=""), (lobby_id,))
             row = await cursor.fetchone()
 
             if not row:
                 return None
 
-            # Get players in the lobby
-            await cursor.execute('''
-                SELECT p.*, lp.joined_at
-                FROM players p
-                JOIN lobby_players lp ON p.id = lp.player_id
-                WHERE lp.lobby_id = ?
-            ''', (lobby_id,))
-            players = await cursor.fetchall()
-
-            commanders = []
-            pawns = []
-            for player in players:
-                if player[2] == "commander":
-                    commanders.append(player[0])
-                else:
-                    pawns.append(player[0])
-
-            return {
-                "id": row[0],
-                "name": row[1],
-                "max_commanders": row[2],
-                "max_pawns": row[3],
-                "status": row[4],
-                "created_at": row[5],
-                "commanders": commanders,
-                "pawns": pawns
-            }
-
-    async def list_lobbies(self) -> List[Dict[str, Any]]:
-        """List all lobbies"""
-        if not self.conn:
-            raise RuntimeError("Database not connected")
-
-        async with self.conn.cursor() as cursor:
-            await cursor.execute('SELECT * FROM lobbies')
-            rows = await cursor.fetchall()
-
-            lobbies = []
-            for row in rows:
-                lobby_id = row[0]
-                # Get players for each lobby
-                await cursor.execute('''
-                    SELECT p.*, lp.joined_at
-                    FROM players p
-                    JOIN lobby_players lp ON p.id = lp.player_id
-                    WHERE lp.lobby_id = ?
-                ''', (lobby_id,))
-                players = await cursor.fetchall()
-
-                commanders = []
-                pawns = []
-                for player in players:
-                    if player[2] == "commander":
-                        commanders.append(player[0])
-                    else:
-                        pawns.append(player[0])
-
-                lobbies.append({
-                    "id": row[0],
-                    "name": row[1],
-                    "max_commanders": row[2],
-                    "max_pawns": row[3],
-                    "status": row[4],
-                    "created_at": row[5],
-                    "commanders": commanders,
-                    "pawns": pawns
-                })
-
-            return lobbies
-
+            return _lobby_from_row(row)
+
+    @timed
+    async def list_lobbies(
+        self,
+        status: Optional[str] = None,
+        limit: Optional[int] = None,
+        cursor: Optional[str] = None,
+    ) -> List[Dict[str, Any]]:
+        """List lobbies with their commander and pawn IDs.
+
+        Lobbies are ordered by creation time. ``cursor`` is the ID of the last
+        lobby from a previous page; only lobbies after it are returned.
+        """
+        conditions = []
+        params: List[Any] = []
+        if status is not None:
+            conditions.append("l.status = ?")
+            params.append(status)
+        if cursor is not None:
+            conditions.append("(l.created_at, l.id) > (SELECT created_at, id FROM lobbies WHERE id = ?)")
+            params.append(cursor)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        limit_clause = ""
+        if limit is not None:
+            limit_clause = "LIMIT ?"
+            params.append(limit)
+
+        async with self._reader() as conn, conn.cursor() as db_cursor:
+            await db_cursor.execute(_LOBBY_SUMMARY_QUERY.format(where=where, limit=limit_clause), params)
+            rows = await db_cursor.fetchall()
+
+            return [_lobby_from_row(row) for row in rows]
+
+    @timed
     async def update_lobby(self, lobby_id: str, data: Dict[str, Any]) -> bool:
-        """Update lobby data"""
-        if not self.conn:
-            raise RuntimeError("Database not connected")
-
-        async with self.conn.cursor() as cursor:
+        """Update lobby data; a new status also records when it changed"""
+        async with self._write() as cursor:
+            # The SET expressions all see the row as it was before the update
             await cursor.execute('''
                 UPDATE lobbies
-                SET name = ?, max_commanders = ?, max_pawns = ?, status = ?
+                SET name = ?, max_commanders = ?, max_pawns = ?, status = ?,
+                    status_changed_at = CASE WHEN status = ? THEN status_changed_at ELSE ? END
                 WHERE id = ?
             ''', (
                 data.get("name"),
                 data.get("max_commanders"),
                 data.get("max_pawns"),
                 data.get("status"),
+                data.get("status"),
+                time.time(),
                 lobby_id
             ))
-            await self.conn.commit()
             return cursor.rowcount > 0
 
+    @timed
     async def delete_lobby(self, lobby_id: str) -> bool:
         """Delete a lobby"""
-        if not self.conn:
-            raise RuntimeError("Database not connected")
-
-        async with self.conn.cursor() as cursor:
+        async with self._write() as cursor:
             # First remove all player associations
             await cursor.execute('DELETE FROM lobby_players WHERE lobby_id = ?', (lobby_id,))
             # Then delete the lobby
             await cursor.execute('DELETE FROM lobbies WHERE id = ?', (lobby_id,))
-            await self.conn.commit()
             return cursor.rowcount > 0
 
-    async def create_player(self, name: str, role: str) -> Dict[str, Any]:
-        """Create a new player"""
-        if not self.conn:
-            raise RuntimeError("Database not connected")
-
-        player_id = str(uuid4())
+    @timed
+    async def create_player(self, name: str, role: str, player_id: Optional[str] = None) -> Dict[str, Any]:
+        """Create a new player, with a generated ID unless one is given"""
+        player_id = player_id or str(uuid4())
         created_at = time.time()
 
-        async with self.conn.cursor() as cursor:
+        async with self._write() as cursor:
             await cursor.execute('''
                 INSERT INTO players (id, name, role, created_at)
                 VALUES (?, ?, ?, ?)
             ''', (player_id, name, role, created_at))
-            await self.conn.commit()
 
         return {
             "id": player_id,
@@ -251,12 +416,27 @@ class SQLiteDatabase(Database):
             "created_at": created_at
         }
 
+    @timed
+    async def create_players(self, players: List[Tuple[Optional[str], str, str]]) -> List[Dict[str, Any]]:
+        """Create players from ``(id, name, role)`` tuples in one statement; None IDs are generated"""
+        created_at = time.time()
+        created = [
+            {"id": player_id or str(uuid4()), "name": name, "role": role, "created_at": created_at}
+            for player_id, name, role in players
+        ]
+
+        async with self._write() as cursor:
+            await cursor.executemany('''
+                INSERT INTO players (id, name, role, created_at)
+                VALUES (?, ?, ?, ?)
+            ''', [(p["id"], p["name"], p["role"], p["created_at"]) for p in created])
+
+        return created
+
+    @timed
     async def get_player(self, player_id: str) -> Optional[Dict[str, Any]]:
         """Get player by ID"""
-        if not self.conn:
-            raise RuntimeError("Database not connected")
-
-        async with self.conn.cursor() as cursor:
+        async with self._reader() as conn, conn.cursor() as cursor:
             await cursor.execute('SELECT * FROM players WHERE id = ?', (player_id,))
             row = await cursor.fetchone()
 
@@ -270,12 +450,10 @@ class SQLiteDatabase(Database):
                 "created_at": row[3]
             }
 
+    @timed
     async def update_player(self, player_id: str, data: Dict[str, Any]) -> bool:
         """Update player data"""
-        if not self.conn:
-            raise RuntimeError("Database not connected")
-
-        async with self.conn.cursor() as cursor:
+        async with self._write() as cursor:
             await cursor.execute('''
                 UPDATE players
                 SET name = ?, role = ?
@@ -285,57 +463,56 @@ class SQLiteDatabase(Database):
                 data.get("role"),
                 player_id
             ))
-            await self.conn.commit()
             return cursor.rowcount > 0
 
+    @timed
     async def delete_player(self, player_id: str) -> bool:
         """Delete a player"""
-        if not self.conn:
-            raise RuntimeError("Database not connected")
-
-        async with self.conn.cursor() as cursor:
+        async with self._write() as cursor:
             # First remove all lobby associations
             await cursor.execute('DELETE FROM lobby_players WHERE player_id = ?', (player_id,))
             # Then delete the player
             await cursor.execute('DELETE FROM players WHERE id = ?', (player_id,))
-            await self.conn.commit()
             return cursor.rowcount > 0
 
+    @timed
     async def add_player_to_lobby(self, player_id: str, lobby_id: str) -> bool:
         """Add a player to a lobby"""
-        if not self.conn:
-            raise RuntimeError("Database not connected")
-
-        async with self.conn.cursor() as cursor:
+        async with self._write() as cursor:
             try:
                 await cursor.execute('''
                     INSERT INTO lobby_players (lobby_id, player_id, joined_at)
                     VALUES (?, ?, ?)
                 ''', (lobby_id, player_id, time.time()))
-                await self.conn.commit()
                 return True
             except sqlite3.IntegrityError:
                 return False
 
+    @timed
+    async def add_players_to_lobby(self, player_ids: List[str], lobby_id: str) -> int:
+        """Add several players to a lobby with one statement; players already in it are skipped"""
+        joined_at = time.time()
+        async with self._write() as cursor:
+            await cursor.executemany('''
+                INSERT OR IGNORE INTO lobby_players (lobby_id, player_id, joined_at)
+                VALUES (?, ?, ?)
+            ''', [(lobby_id, player_id, joined_at) for player_id in player_ids])
+            return cursor.rowcount
+
+    @timed
     async def remove_player_from_lobby(self, player_id: str, lobby_id: str) -> bool:
         """Remove a player from a lobby"""
-        if not self.conn:
-            raise RuntimeError("Database not connected")
-
-        async with self.conn.cursor() as cursor:
+        async with self._write() as cursor:
             await cursor.execute('''
                 DELETE FROM lobby_players
                 WHERE lobby_id = ? AND player_id = ?
             ''', (lobby_id, player_id))
-            await self.conn.commit()
             return cursor.rowcount > 0
 
+    @timed
     async def get_lobby_players(self, lobby_id: str) -> List[Dict[str, Any]]:
         """Get all players in a lobby"""
-        if not self.conn:
-            raise RuntimeError("Database not connected")
-
-        async with self.conn.cursor() as cursor:
+        async with self._reader() as conn, conn.cursor() as cursor:
             await cursor.execute('''
                 SELECT p.*, lp.joined_at
                 FROM players p
@@ -352,58 +529,167 @@ class SQLiteDatabase(Database):
                 "joined_at": row[4]
             } for row in rows]
 
-    async def store_websocket_command(self, client_id: str, message_type: str, action: str, payload: Dict[str, Any]) -> str:
+    @timed
+    async def get_lobbies_players(self, lobby_ids: List[str]) -> Dict[str, List[Dict[str, Any]]]:
+        """Get the players of several lobbies with one query per chunk of IDs, keyed by lobby ID"""
+        players: Dict[str, List[Dict[str, Any]]] = {lobby_id: [] for lobby_id in lobby_ids}
+        async with self._reader() as conn, conn.cursor() as cursor:
+            # Stay well below SQLite's limit on bound parameters
+            for start in range(0, len(lobby_ids), 500):
+                chunk = lobby_ids[start:start + 500]
+                await cursor.execute(f'''
+                    SELECT lp.lobby_id, p.id, p.name, p.role, p.created_at, lp.joined_at
+                    FROM lobby_players lp
+                    JOIN players p ON p.id = lp.player_id
+                    WHERE lp.lobby_id IN ({",".join("?" * len(chunk))})
+                ''', chunk)
+                for row in await cursor.fetchall():
+                    players[row[0]].append({
+                        "id": row[1],
+                        "name": row[2],
+                        "role": row[3],
+                        "created_at": row[4],
+                        "joined_at": row[5]
+                    })
+        return players
+
+    @timed
+    async def store_websocket_command(
+        self,
+        client_id: str,
+        message_type: str,
+        action: str,
+        payload: Union[str, bytes, Dict[str, Any]],
+        codec: str = JSON.name,
+    ) -> str:
         """Store a WebSocket command in the database"""
-        if not self.conn:
-            raise RuntimeError("Database not connected")
-
         command_id = str(uuid4())
         timestamp = time.time()
-        payload_json = json.dumps(payload)
+        payload_json = _encode_payload(payload)
 
-        async with self.conn.cursor() as cursor:
+        async with self._write() as cursor:
             await cursor.execute('''
-                INSERT INTO websocket_commands (id, client_id, message_type, action, payload, timestamp)
-                VALUES (?, ?, ?, ?, ?, ?)
-            ''', (command_id, client_id, message_type, action, payload_json, timestamp))
-            await self.conn.commit()
+                INSERT INTO websocket_commands (id, client_id, message_type, action, payload, codec, timestamp)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            ''', (command_id, client_id, message_type, action, payload_json, codec, timestamp))
 
         return command_id
 
+    @timed
+    async def store_websocket_commands(self, commands: List[Tuple[str, str, str, str, Any, str, float]]) -> int:
+        """Store a batch of WebSocket commands in a single transaction.
+
+        Each command is an ``(id, client_id, message_type, action, payload, codec, timestamp)`` tuple.
+        """
+        rows = [
+            (command_id, client_id, message_type, action, _encode_payload(payload), codec, timestamp)
+            for command_id, client_id, message_type, action, payload, codec, timestamp in commands
+        ]
+
+        async with self._write() as cursor:
+            await cursor.executemany('''
+                INSERT INTO websocket_commands (id, client_id, message_type, action, payload, codec, timestamp)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            ''', rows)
+
+        return len(rows)
+
+    @timed
     async def get_unprocessed_commands(self, limit: int = 100) -> List[Dict[str, Any]]:
         """Get unprocessed WebSocket commands"""
-        if not self.conn:
-            raise RuntimeError("Database not connected")
-
-        async with self.conn.cursor() as cursor:
-            await cursor.execute('''
-                SELECT * FROM websocket_commands
+        async with self._reader() as conn, conn.cursor() as cursor:
+            await cursor.execute(f'''
+                SELECT {_COMMAND_COLUMNS} FROM websocket_commands
                 WHERE processed = FALSE
                 ORDER BY timestamp ASC
                 LIMIT ?
             ''', (limit,))
-            rows = await cursor.fetchall()
-
-            return [{
-                "id": row[0],
-                "client_id": row[1],
-                "message_type": row[2],
-                "action": row[3],
-                "payload": json.loads(row[4]),
-                "timestamp": row[5],
-                "processed": bool(row[6])
-            } for row in rows]
+            return [_command_from_row(row) for row in await cursor.fetchall()]
 
+    @timed
     async def mark_command_processed(self, command_id: str) -> bool:
         """Mark a WebSocket command as processed"""
-        if not self.conn:
-            raise RuntimeError("Database not connected")
-
-        async with self.conn.cursor() as cursor:
+        async with self._write() as cursor:
             await cursor.execute('''
                 UPDATE websocket_commands
                 SET processed = TRUE
                 WHERE id = ?
             ''', (command_id,))
-            await self.conn.commit()
-            return cursor.rowcount > 0 
\ No newline at end of file
+            return cursor.rowcount > 0
+
+    @timed
+    async def mark_commands_processed(self, command_ids: List[str]) -> int:
+        """Mark several WebSocket commands as processed with one statement"""
+        async with self._write() as cursor:
+            await cursor.executemany('''
+                UPDATE websocket_commands
+                SET processed = TRUE
+                WHERE id = ? AND processed = FALSE
+            ''', [(command_id,) for command_id in command_ids])
+            return cursor.rowcount
+
+    @timed
+    async def get_commands_before(self, before: float, processed: bool = True, limit: int = 1000) -> List[Dict[str, Any]]:
+        """Get the oldest commands journaled before a timestamp"""
+        async with self._reader() as conn, conn.cursor() as cursor:
+            await cursor.execute(f'''
+                SELECT {_COMMAND_COLUMNS} FROM websocket_commands
+                WHERE processed = ? AND timestamp < ?
+                ORDER BY timestamp, id
+                LIMIT ?
+            ''', (processed, before, limit))
+            return [_command_from_row(row) for row in await cursor.fetchall()]
+
+    @timed
+    async def delete_commands(self, command_ids: List[str]) -> int:
+        """Delete journaled commands"""
+        async with self._write() as cursor:
+            await cursor.executemany(
+                "DELETE FROM websocket_commands WHERE id = ?", [(command_id,) for command_id in command_ids]
+            )
+            return cursor.rowcount
+
+    @timed
+    async def get_expired_lobbies(self, finished_before: float, abandoned_before: float, limit: int = 500) -> List[str]:
+        """IDs of lobbies finished a while ago and of old lobbies nobody is in"""
+        async with self._reader() as conn, conn.cursor() as cursor:
+            await cursor.execute('''
+                SELECT id FROM lobbies
+                WHERE status = 'finished' AND status_changed_at < ?
+                UNION
+                SELECT l.id FROM lobbies l
+                WHERE l.status <> 'in_progress' AND l.status_changed_at < ?
+                  AND NOT EXISTS (SELECT 1 FROM lobby_players lp WHERE lp.lobby_id = l.id)
+                LIMIT ?
+            ''', (finished_before, abandoned_before, limit))
+            return [row[0] for row in await cursor.fetchall()]
+
+    @timed
+    async def delete_lobbies(self, lobby_ids: List[str]) -> int:
+        """Delete lobbies and their memberships"""
+        rows = [(lobby_id,) for lobby_id in lobby_ids]
+        async with self._write() as cursor:
+            await cursor.executemany("DELETE FROM lobby_players WHERE lobby_id = ?", rows)
+            await cursor.executemany("DELETE FROM lobbies WHERE id = ?", rows)
+            return cursor.rowcount
+
+    @timed
+    async def delete_orphan_players(self, before: float) -> int:
+        """Delete old players that are no longer in any lobby"""
+        async with self._write() as cursor:
+            await cursor.execute('''
+                DELETE FROM players
+                WHERE created_at < ?
+                  AND NOT EXISTS (SELECT 1 FROM lobby_players lp WHERE lp.player_id = players.id)
+            ''', (before,))
+            return cursor.rowcount
+
+    async def compact(self) -> None:
+        """Release free pages and truncate the WAL after a retention pass"""
+        if not self.conn:
+            raise RuntimeError("Database not connected")
+        async with self._write_lock:
+            # The vacuum frees one page per step, so its rows must be drained
+            async with self.conn.execute("PRAGMA incremental_vacuum") as cursor:
+                await cursor.fetchall()
+            await self.conn.execute("PRAGMA wal_checkpoint(TRUNCATE)") 
\ No newline at end of file
@@ -0,0 +1,10 @@
+from .event_log import EventLog
+from .lobby_cache import LobbyCache, lobby_summary
+from .matchmaking import Match, Matchmaker, OpenSlotIndex, Ticket
+from .board_store import BoardStore
+from .simulation import Board, MoveOrder, Simulation, TerritoryTable
+
+__all__ = [
+    'EventLog', 'LobbyCache', 'lobby_summary', 'Match', 'Matchmaker', 'OpenSlotIndex', 'Ticket',
+    'Board', 'BoardStore', 'MoveOrder', 'Simulation', 'TerritoryTable',
+]
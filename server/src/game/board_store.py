@@ -0,0 +1,209 @@
+from typing import Dict, List, Sequence, Tuple
+from uuid import UUID
+
+try:
+    import numpy as np
+except ImportError:  # optional: pip install riskier-server[numpy]
+    np = None
+
+class StoreTable:
+    """Territory columns of one board, as views into a BoardStore.
+
+    Views are taken on every access, so they stay valid when the store
+    grows or compacts its arrays.
+    """
+
+    __slots__ = ("store", "key")
+
+    def __init__(self, store: "BoardStore", key: UUID):
+        self.store = store
+        self.key = key
+
+    @property
+    def owner(self):
+        _, start, stop = self.store.ranges[self.key]
+        return self.store.owner[start:stop]
+
+    @property
+    def units(self):
+        _, start, stop = self.store.ranges[self.key]
+        return self.store.units[start:stop]
+
+    @property
+    def income(self):
+        _, start, stop = self.store.ranges[self.key]
+        return self.store.income[start:stop]
+
+    @property
+    def changed(self):
+        _, start, stop = self.store.ranges[self.key]
+        return self.store.changed[start:stop]
+
+    @property
+    def resources(self):
+        slot = self.store.ranges[self.key][0]
+        width = self.store.max_commanders
+        return self.store.resources[slot * width:(slot + 1) * width]
+
+    def __len__(self) -> int:
+        _, start, stop = self.store.ranges[self.key]
+        return stop - start
+
+    def changed_since(self, tick: int) -> List[int]:
+        return np.flatnonzero(self.changed > tick).tolist()
+
+class BoardStore:
+    """Territory and resource state of many boards in shared NumPy arrays.
+
+    Every board owns a contiguous range of territory rows and a slot of
+    ``max_commanders`` resource cells; owners are commander indexes within
+    their board, -1 for none. Resource accrual, ownership change detection
+    and the map control check then each run as one vectorized pass over the
+    territories of all boards. Rows of removed boards are reclaimed by
+    compacting once they make up half of the rows.
+    """
+
+    def __init__(self, max_commanders: int = 4, capacity: int = 4096, slots: int = 256):
+        if np is None:
+            raise RuntimeError("NumPy is not installed")
+        self.max_commanders = max_commanders
+        self.size = 0
+        self.dead = 0
+        self.owner = np.full(capacity, -1, dtype=np.int32)
+        self.units = np.zeros(capacity, dtype=np.int64)
+        self.income = np.zeros(capacity, dtype=np.float64)
+        self.changed = np.zeros(capacity, dtype=np.int64)
+        # Slot of the board each row belongs to, -1 for reclaimable rows
+        self.board = np.full(capacity, -1, dtype=np.int32)
+        self._previous_owner = np.full(capacity, -1, dtype=np.int32)
+        self.resources = np.zeros(slots * max_commanders, dtype=np.float64)
+        self.territories = np.zeros(slots, dtype=np.int64)
+        self.threshold = np.ones(slots, dtype=np.float64)
+        # key -> (slot, first row, row after the last)
+        self.ranges: Dict[UUID, Tuple[int, int, int]] = {}
+        self.keys: List[UUID] = []
+        self._free_slots: List[int] = []
+
+    def __len__(self) -> int:
+        return len(self.ranges)
+
+    def add(
+        self,
+        key: UUID,
+        owner: Sequence[int],
+        units: Sequence[int],
+        income: Sequence[float],
+        threshold: float,
+    ) -> StoreTable:
+        """Store a board's territories and return its columns"""
+        count = len(owner)
+        if self.size + count > len(self.owner):
+            self._grow_rows(self.size + count)
+        slot = self._free_slots.pop() if self._free_slots else self._new_slot()
+        start, stop = self.size, self.size + count
+        self.owner[start:stop] = owner
+        self._previous_owner[start:stop] = owner
+        self.units[start:stop] = units
+        self.income[start:stop] = income
+        self.changed[start:stop] = 0
+        self.board[start:stop] = slot
+        width = self.max_commanders
+        self.resources[slot * width:(slot + 1) * width] = 0.0
+        self.territories[slot] = count
+        self.threshold[slot] = threshold
+        self.keys[slot] = key
+        self.ranges[key] = (slot, start, stop)
+        self.size = stop
+        return StoreTable(self, key)
+
+    def remove(self, key: UUID) -> None:
+        entry = self.ranges.pop(key, None)
+        if entry is None:
+            return
+        slot, start, stop = entry
+        self.owner[start:stop] = -1
+        self._previous_owner[start:stop] = -1
+        self.income[start:stop] = 0.0
+        self.board[start:stop] = -1
+        self.territories[slot] = 0
+        self._free_slots.append(slot)
+        self.dead += stop - start
+        if self.dead * 2 > self.size:
+            self.compact()
+
+    def accrue(self, seconds: float) -> None:
+        """Credit every owned territory's income to its owner, across all boards"""
+        rows = self._owned_rows()
+        if rows is None:
+            return
+        cells, weights = rows
+        self.resources += np.bincount(cells, weights=weights, minlength=len(self.resources)) * seconds
+
+    def ownership_changes(self) -> List[UUID]:
+        """Boards with a territory that changed hands since the last call"""
+        n = self.size
+        changed = self.owner[:n] != self._previous_owner[:n]
+        if not changed.any():
+            return []
+        self._previous_owner[:n] = self.owner[:n]
+        return [self.keys[slot] for slot in np.unique(self.board[:n][changed]) if slot >= 0]
+
+    def leaders(self, keys: Sequence[UUID]) -> List[Tuple[UUID, int]]:
+        """Boards among ``keys`` where a commander controls at least their threshold share of the map"""
+        if not keys:
+            return []
+        rows = self._owned_rows()
+        if rows is None:
+            return []
+        cells, _ = rows
+        slots = np.array([self.ranges[key][0] for key in keys], dtype=np.int64)
+        width = self.max_commanders
+        counts = np.bincount(cells, minlength=len(self.resources)).reshape(-1, width)[slots]
+        share = counts / np.maximum(self.territories[slots], 1)[:, None]
+        hits = np.argwhere(share >= self.threshold[slots][:, None])
+        return [(keys[row], int(commander)) for row, commander in hits]
+
+    def compact(self) -> None:
+        """Move the rows of live boards together, dropping those of removed boards"""
+        n = self.size
+        keep = self.board[:n] >= 0
+        count = int(keep.sum())
+        for column in ("owner", "units", "income", "changed", "board", "_previous_owner"):
+            array = getattr(self, column)
+            array[:count] = array[:n][keep]
+            array[count:n] = -1 if column in ("owner", "board", "_previous_owner") else 0
+        offset = 0
+        for key, (slot, start, stop) in sorted(self.ranges.items(), key=lambda item: item[1][1]):
+            self.ranges[key] = (slot, offset, offset + stop - start)
+            offset += stop - start
+        self.size = count
+        self.dead = 0
+
+    def _owned_rows(self):
+        n = self.size
+        owner = self.owner[:n]
+        owned = owner >= 0
+        if not owned.any():
+            return None
+        cells = self.board[:n][owned].astype(np.int64) * self.max_commanders + owner[owned]
+        return cells, self.income[:n][owned]
+
+    def _new_slot(self) -> int:
+        slot = len(self.keys)
+        self.keys.append(None)
+        if slot >= len(self.territories):
+            slots = len(self.territories) * 2
+            self.resources = np.resize(self.resources, slots * self.max_commanders)
+            self.territories = np.resize(self.territories, slots)
+            self.threshold = np.resize(self.threshold, slots)
+        return slot
+
+    def _grow_rows(self, needed: int) -> None:
+        capacity = max(needed, len(self.owner) * 2)
+        for column, fill in (
+            ("owner", -1), ("units", 0), ("income", 0.0), ("changed", 0), ("board", -1), ("_previous_owner", -1)
+        ):
+            array = getattr(self, column)
+            grown = np.full(capacity, fill, dtype=array.dtype)
+            grown[:len(array)] = array
+            setattr(self, column, grown)
@@ -0,0 +1,292 @@
+import asyncio
+import gzip
+import itertools
+import os
+import time
+import zlib
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from src.log import get_logger
+from src.metrics import REGISTRY
+from src.models import GameState
+from src.models.codec import JSON
+
+logger = get_logger(__name__)
+
+EVENTS = REGISTRY.counter("risker_events_total", "Events appended to the event log", ("type",))
+EVENT_FSYNC_SECONDS = REGISTRY.histogram("risker_event_log_fsync_seconds", "Time to write and sync one batch of events")
+SNAPSHOT_SECONDS = REGISTRY.histogram("risker_snapshot_seconds", "Time to take and write one GameState snapshot")
+RECOVERY_SECONDS = REGISTRY.gauge("risker_recovery_seconds", "Time to load the latest snapshot and replay the log tail")
+
+SEGMENT_PREFIX = "events-"
+SNAPSHOT_PREFIX = "snapshot-"
+
+def _encode(event: Dict[str, Any]) -> bytes:
+    # One event per line, prefixed with a CRC so a torn write is detected on recovery
+    body = JSON.encode(event).encode()
+    return b"%08x %s\n" % (zlib.crc32(body), body)
+
+def _decode(line: bytes) -> Optional[Dict[str, Any]]:
+    if not line.endswith(b"\n") or len(line) < 10 or line[8:9] != b" ":
+        return None
+    body = line[9:-1]
+    try:
+        if int(line[:8], 16) != zlib.crc32(body):
+            return None
+        return JSON.decode(body)
+    except ValueError:
+        return None
+
+def _seq_of(path: Path) -> int:
+    # events-<first seq>.log and snapshot-<seq>.json.gz
+    return int(path.name.split("-", 1)[1].split(".", 1)[0])
+
+def _fsync_dir(directory: Path) -> None:
+    fd = os.open(directory, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+class EventLog:
+    """Append-only, segmented log of lobby events with periodic GameState snapshots.
+
+    Events are numbered, appended to the current segment file and synced by
+    a single writer in batches, so concurrent appends share one fsync; the
+    future returned by ``record`` resolves once its event is durable. Every
+    ``snapshot_interval`` seconds, or after ``snapshot_every`` events, the
+    whole GameState is written to a snapshot file tagged with the last event
+    number, and segments older than the oldest kept snapshot are deleted.
+    ``open`` rebuilds a GameState from the latest snapshot and the events
+    after it, cutting off a half-written last event left by a crash.
+    """
+
+    def __init__(
+        self,
+        directory: str = "events",
+        segment_bytes: int = 16 * 1024 * 1024,
+        snapshot_interval: float = 60.0,
+        snapshot_every: int = 10000,
+        keep_snapshots: int = 2,
+        fsync: bool = True,
+    ):
+        self.directory = Path(directory)
+        self.segment_bytes = segment_bytes
+        self.snapshot_interval = snapshot_interval
+        self.snapshot_every = snapshot_every
+        self.keep_snapshots = max(1, keep_snapshots)
+        self.fsync = fsync
+        self.seq = 0
+        self._state: Optional[GameState] = None
+        self._snapshot_seq = 0
+        self._segment = None
+        self._segment_size = 0
+        self._pending: List[Tuple[int, bytes, asyncio.Future]] = []
+        self._writer: Optional[asyncio.Task] = None
+        self._snapshotter: Optional[asyncio.Task] = None
+        self._snapshot_task: Optional[asyncio.Task] = None
+        self._snapshot_lock = asyncio.Lock()
+
+    async def open(self, state: GameState) -> int:
+        """Recover ``state`` from disk, start appending and return the number of events replayed"""
+        start = time.perf_counter()
+        self._state = state
+        replayed = await asyncio.to_thread(self._recover, state)
+        if REGISTRY.enabled:
+            RECOVERY_SECONDS.set(time.perf_counter() - start)
+        self._snapshotter = asyncio.create_task(self._snapshot_periodically())
+        logger.info(
+            "Event log opened",
+            directory=str(self.directory),
+            seq=self.seq,
+            snapshot_seq=self._snapshot_seq,
+            replayed=replayed,
+            seconds=round(time.perf_counter() - start, 3)
+        )
+        return replayed
+
+    async def close(self) -> None:
+        """Write pending events, take a final snapshot so the next start replays nothing, and close"""
+        if self._state is None:
+            return
+        if self._snapshotter:
+            self._snapshotter.cancel()
+            try:
+                await self._snapshotter
+            except asyncio.CancelledError:
+                pass
+            self._snapshotter = None
+        await self.flush()
+        await self.snapshot()
+        if self._segment:
+            self._segment.close()
+            self._segment = None
+        self._state = None
+
+    def record(self, event_type: str, **fields: Any) -> asyncio.Future:
+        """Append an event; await the returned future to wait until it is on disk"""
+        if self._state is None:
+            raise RuntimeError("Event log not open")
+        self.seq += 1
+        event = {"seq": self.seq, "ts": time.time(), "type": event_type, **fields}
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((self.seq, _encode(event), future))
+        if self._writer is None:
+            self._writer = asyncio.create_task(self._write_pending())
+        if REGISTRY.enabled:
+            EVENTS.inc(event_type)
+        if self.seq - self._snapshot_seq >= self.snapshot_every and (
+            self._snapshot_task is None or self._snapshot_task.done()
+        ):
+            self._snapshot_task = asyncio.create_task(self.snapshot())
+        return future
+
+    async def flush(self) -> None:
+        """Wait until every recorded event is on disk"""
+        while self._writer is not None:
+            await asyncio.shield(self._writer)
+
+    async def snapshot(self) -> None:
+        """Write the current GameState and drop the log segments it makes redundant"""
+        async with self._snapshot_lock:
+            if self._state is None or self.seq == self._snapshot_seq:
+                return
+            start = time.perf_counter()
+            # Taken in one step on the loop, so it holds every event up to ``seq``;
+            # later events already applied to it are skipped on replay
+            seq, sessions = self.seq, self._state.snapshot()
+            await asyncio.to_thread(self._write_snapshot, seq, sessions)
+            self._snapshot_seq = seq
+            if REGISTRY.enabled:
+                SNAPSHOT_SECONDS.observe(time.perf_counter() - start)
+            logger.debug("Snapshot written", seq=seq, sessions=len(sessions))
+
+    async def _snapshot_periodically(self) -> None:
+        while True:
+            await asyncio.sleep(self.snapshot_interval)
+            try:
+                await self.snapshot()
+            except Exception:
+                logger.error("Failed to write snapshot", exc_info=True)
+
+    async def _write_pending(self) -> None:
+        # Events recorded while a batch is being synced form the next batch
+        try:
+            while self._pending:
+                batch, self._pending = self._pending, []
+                start = time.perf_counter()
+                try:
+                    await asyncio.to_thread(self._append, [(seq, line) for seq, line, _ in batch])
+                except Exception as e:
+                    logger.error("Failed to append events", count=len(batch), exc_info=True)
+                    for _, _, future in batch:
+                        future.set_exception(e)
+                        # Callers that do not wait for durability have already moved on
+                        future.exception()
+                    continue
+                if REGISTRY.enabled:
+                    EVENT_FSYNC_SECONDS.observe(time.perf_counter() - start)
+                for _, _, future in batch:
+                    future.set_result(None)
+        finally:
+            self._writer = None
+
+    # The methods below do blocking file I/O and run in a worker thread
+
+    def _segments(self) -> List[Path]:
+        return sorted(self.directory.glob(f"{SEGMENT_PREFIX}*.log"), key=_seq_of)
+
+    def _snapshots(self) -> List[Path]:
+        return sorted(self.directory.glob(f"{SNAPSHOT_PREFIX}*.json.gz"), key=_seq_of)
+
+    def _recover(self, state: GameState) -> int:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        for path in reversed(self._snapshots()):
+            try:
+                with gzip.open(path, "rt", encoding="utf-8") as snapshot:
+                    data = JSON.decode(snapshot.read())
+            except (OSError, EOFError, ValueError) as e:
+                logger.warning("Skipping unreadable snapshot", path=str(path), error=str(e))
+                continue
+            for entry in data["sessions"]:
+                state.restore_session(entry["lobby"], entry["members"])
+            self._snapshot_seq = data["seq"]
+            break
+        self.seq = self._snapshot_seq
+
+        replayed = 0
+        segments = self._segments()
+        for index, path in enumerate(segments):
+            last = index == len(segments) - 1
+            if not last and _seq_of(segments[index + 1]) <= self._snapshot_seq + 1:
+                continue  # entirely covered by the snapshot
+            lines = path.read_bytes().splitlines(keepends=True)
+            offset = 0
+            for number, line in enumerate(lines):
+                event = _decode(line)
+                if event is None:
+                    if last and number == len(lines) - 1:
+                        # A crash cut the final write short; the event was never acknowledged
+                        with open(path, "r+b") as segment:
+                            segment.truncate(offset)
+                        logger.warning("Truncated torn event at end of log", path=str(path), offset=offset)
+                        break
+                    logger.error("Skipping corrupt event", path=str(path), offset=offset)
+                    offset += len(line)
+                    continue
+                offset += len(line)
+                if event["seq"] > self._snapshot_seq:
+                    state.apply(event)
+                    replayed += 1
+                self.seq = max(self.seq, event["seq"])
+
+        if segments:
+            self._segment = open(segments[-1], "ab")
+            self._segment_size = self._segment.tell()
+        return replayed
+
+    def _append(self, lines: List[Tuple[int, bytes]]) -> None:
+        for seq, line in lines:
+            if self._segment is None or self._segment_size >= self.segment_bytes:
+                self._rotate(seq)
+            self._segment.write(line)
+            self._segment_size += len(line)
+        self._segment.flush()
+        if self.fsync:
+            os.fsync(self._segment.fileno())
+
+    def _rotate(self, first_seq: int) -> None:
+        if self._segment:
+            self._segment.flush()
+            if self.fsync:
+                os.fsync(self._segment.fileno())
+            self._segment.close()
+        self._segment = open(self.directory / f"{SEGMENT_PREFIX}{first_seq:020d}.log", "ab")
+        self._segment_size = 0
+        if self.fsync:
+            _fsync_dir(self.directory)
+
+    def _write_snapshot(self, seq: int, sessions: List[Dict[str, Any]]) -> None:
+        path = self.directory / f"{SNAPSHOT_PREFIX}{seq:020d}.json.gz"
+        partial = path.with_suffix(".tmp")
+        with gzip.open(partial, "wt", encoding="utf-8") as snapshot:
+            snapshot.write(JSON.encode({"seq": seq, "sessions": sessions}))
+        if self.fsync:
+            with open(partial, "rb") as snapshot:
+                os.fsync(snapshot.fileno())
+        os.replace(partial, path)
+        if self.fsync:
+            _fsync_dir(self.directory)
+        self._compact()
+
+    def _compact(self) -> None:
+        snapshots = self._snapshots()
+        for path in snapshots[:-self.keep_snapshots]:
+            path.unlink()
+        oldest = _seq_of(snapshots[-self.keep_snapshots:][0])
+        # A segment ends just before the next one starts; the last one is being appended to
+        segments = self._segments()
+        for path, following in itertools.pairwise(segments):
+            if _seq_of(following) - 1 <= oldest:
+                path.unlink()
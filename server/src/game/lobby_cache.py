@@ -0,0 +1,115 @@
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional
+from uuid import UUID
+
+from src.models import GameSession, GameState, PlayerRole
+
+def lobby_summary(session: GameSession) -> Dict[str, Any]:
+    """Build the wire representation of a lobby"""
+    return {
+        "id": str(session.id),
+        "name": session.name,
+        "commanders": [str(player_id) for player_id in session.get_members(PlayerRole.COMMANDER)],
+        "pawns": [str(player_id) for player_id in session.get_members(PlayerRole.PAWN)],
+        "maxCommanders": session.max_commanders,
+        "maxPawns": session.max_pawns,
+        "status": session.status,
+        "created_at": session.created_at
+    }
+
+class LobbyCache:
+    """Versioned lobby summaries built from the in-memory GameState.
+
+    Every change bumps ``version`` and is recorded as a delta in a bounded
+    history, so clients that know their last version can catch up with only
+    the changes they missed instead of refetching the full list. Listings
+    may be asked to reuse the last ordered list even if lobbies changed
+    since, which ``ordered_version`` then reports.
+    """
+
+    def __init__(self, max_history: int = 1024):
+        self.version = 0
+        self._summaries: Dict[UUID, Dict[str, Any]] = {}
+        self._history: Deque[Dict[str, Any]] = deque(maxlen=max_history)
+        self._ordered: Optional[List[Dict[str, Any]]] = None
+        self._ordered_stale = False
+        # Version the ordered list was built at
+        self.ordered_version = 0
+
+    def rebuild(self, game_state: GameState) -> None:
+        """Replace the cache contents with every session in the game state"""
+        self._summaries = {
+            session_id: lobby_summary(session) for session_id, session in game_state.sessions.items()
+        }
+        self._history.clear()
+        self._ordered = None
+        self._ordered_stale = False
+        self.version += 1
+
+    def update(self, session: GameSession) -> Dict[str, Any]:
+        """Refresh one lobby and return the resulting delta"""
+        summary = lobby_summary(session)
+        self._summaries[session.id] = summary
+        return self._record({"op": "upsert", "lobby": summary})
+
+    def put(self, lobby: Dict[str, Any]) -> Dict[str, Any]:
+        """Store a summary built elsewhere, such as on another shard, and return the resulting delta"""
+        self._summaries[UUID(lobby["id"])] = lobby
+        return self._record({"op": "upsert", "lobby": lobby})
+
+    def remove(self, lobby_id: UUID) -> Optional[Dict[str, Any]]:
+        """Drop one lobby and return the resulting delta, if it was cached"""
+        if self._summaries.pop(lobby_id, None) is None:
+            return None
+        return self._record({"op": "remove", "lobby_id": str(lobby_id)})
+
+    def lobbies(
+        self,
+        status: Optional[str] = None,
+        limit: Optional[int] = None,
+        cursor: Optional[UUID] = None,
+        stale: bool = False,
+    ) -> List[Dict[str, Any]]:
+        """List cached lobbies ordered by creation time, with the same filters as Database.list_lobbies.
+
+        With ``stale`` the list is not re-sorted after changes as long as one
+        was built before.
+        """
+        if self._ordered is None or (self._ordered_stale and not stale):
+            self._ordered = sorted(self._summaries.values(), key=lambda s: (s["created_at"], s["id"]))
+            self._ordered_stale = False
+            self.ordered_version = self.version
+        lobbies = self._ordered
+        if cursor is not None:
+            after = self._summaries.get(cursor)
+            if after is None:
+                return []
+            key = (after["created_at"], after["id"])
+            lobbies = [s for s in lobbies if (s["created_at"], s["id"]) > key]
+        if status is not None:
+            lobbies = [s for s in lobbies if s["status"] == status]
+        if limit is not None:
+            lobbies = lobbies[:limit]
+        return list(lobbies)
+
+    def changes_since(self, version: int) -> Optional[List[Dict[str, Any]]]:
+        """Return the deltas after ``version``, or None if they are no longer retained"""
+        if version == self.version:
+            return []
+        if version > self.version or not self._history or self._history[0]["version"] > version + 1:
+            return None
+        # Only the latest delta per lobby matters to a client catching up
+        latest: Dict[str, Dict[str, Any]] = {}
+        for delta in self._history:
+            if delta["version"] > version:
+                lobby_id = delta["lobby"]["id"] if delta["op"] == "upsert" else delta["lobby_id"]
+                latest.pop(lobby_id, None)
+                latest[lobby_id] = delta
+        return list(latest.values())
+
+    def _record(self, delta: Dict[str, Any]) -> Dict[str, Any]:
+        self.version += 1
+        delta["version"] = self.version
+        self._history.append(delta)
+        self._ordered_stale = True
+        return delta
@@ -0,0 +1,214 @@
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+from uuid import UUID, uuid4
+
+from src.models import GameSession, GameState, PlayerRole
+
+@dataclass(slots=True, kw_only=True)
+class Ticket:
+    """A player waiting to be placed in a lobby; the ticket ID becomes their player ID"""
+    id: UUID = field(default_factory=uuid4)
+    name: str
+    role: PlayerRole
+    skill: int
+    # Connection the ticket came from, so the server can reply once it is placed
+    owner: Any = None
+    enqueued_at: float = field(default_factory=time.monotonic)
+
+@dataclass(slots=True)
+class Match:
+    """Tickets placed in one session by a matchmaking pass"""
+    session: GameSession
+    tickets: List[Ticket] = field(default_factory=list)
+    # The session was opened by this pass and is not stored anywhere yet
+    created: bool = False
+
+class OpenSlotIndex:
+    """Sessions with free slots, by role, skill bucket and number of free slots.
+
+    Lookups for a role walk the buckets nearest a player's skill and, within
+    a bucket, the sessions with the fewest free slots first, so lobbies fill
+    up before new ones are started. Sessions without a skill level sit in
+    the ``None`` bucket, which is tried last for every player.
+    """
+
+    def __init__(self):
+        # role -> skill bucket -> free slots -> session IDs, oldest first
+        self._open: Dict[PlayerRole, Dict[Optional[int], Dict[int, Dict[UUID, None]]]] = {
+            role: {} for role in PlayerRole
+        }
+        self._entries: Dict[UUID, Dict[PlayerRole, Tuple[Optional[int], int]]] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def update(self, session: GameSession, bucket: Optional[int]) -> None:
+        """Re-index a session after its members, reservations or status changed"""
+        self.remove(session.id)
+        if session.status != "waiting":
+            return
+        entries = {}
+        for role in PlayerRole:
+            free = session.get_role_capacity(role) - session.get_role_count(role)
+            if free > 0:
+                self._open[role].setdefault(bucket, {}).setdefault(free, {})[session.id] = None
+                entries[role] = (bucket, free)
+        if entries:
+            self._entries[session.id] = entries
+
+    def remove(self, session_id: UUID) -> None:
+        for role, (bucket, free) in self._entries.pop(session_id, {}).items():
+            by_free = self._open[role][bucket]
+            del by_free[free][session_id]
+            if not by_free[free]:
+                del by_free[free]
+                if not by_free:
+                    del self._open[role][bucket]
+
+    def candidates(self, role: PlayerRole, bucket: int, distance: int) -> Iterator[UUID]:
+        """Sessions with a free slot for ``role`` within ``distance`` buckets, best first"""
+        buckets = self._open[role]
+        order: List[Optional[int]] = [bucket]
+        for step in range(1, distance + 1):
+            order += [bucket - step, bucket + step]
+        order.append(None)
+        for key in order:
+            by_free = buckets.get(key)
+            if not by_free:
+                continue
+            for free in sorted(by_free):
+                yield from by_free[free]
+
+class Matchmaker:
+    """Queues players looking for a game and assigns them to lobbies in batches.
+
+    A session's skill level is the mean skill of the players matchmaking
+    placed in it; lobbies created by hand have none until matchmaking adds
+    someone. A ticket is first matched within its own skill bucket and the
+    search widens by one bucket for every ``widen_after`` seconds it waits.
+    Commanders with nowhere to go open a new lobby through ``new_session``;
+    pawns keep waiting for one, and tickets still queued after ``ticket_ttl``
+    seconds expire.
+
+    Slots are reserved on the sessions while a batch is assigned, so
+    concurrent joins cannot overfill a lobby while the matches are written.
+    Matched skills count towards a session's level only once ``placed``
+    confirms the match was written; ``release`` undoes a match that was not.
+    """
+
+    def __init__(
+        self,
+        bucket_width: int = 100,
+        widen_after: float = 10.0,
+        max_distance: int = 5,
+        ticket_ttl: float = 120.0,
+        max_batch: int = 500,
+    ):
+        self.bucket_width = bucket_width
+        self.widen_after = widen_after
+        self.max_distance = max_distance
+        self.ticket_ttl = ticket_ttl
+        self.max_batch = max_batch
+        self.index = OpenSlotIndex()
+        self.queue: Dict[UUID, Ticket] = {}
+        # Sum and count of the skills of players matched into each session
+        self._ratings: Dict[UUID, Tuple[int, int]] = {}
+
+    def bucket(self, skill: int) -> int:
+        return skill // self.bucket_width
+
+    def session_bucket(self, session_id: UUID, pending: Optional[Match] = None) -> Optional[int]:
+        """Skill bucket of a session, counting the tickets of a match not yet placed"""
+        total, count = self._ratings.get(session_id, (0, 0))
+        if pending:
+            total += sum(ticket.skill for ticket in pending.tickets)
+            count += len(pending.tickets)
+        return self.bucket(total // count) if count else None
+
+    def update(self, session: GameSession, pending: Optional[Match] = None) -> None:
+        self.index.update(session, self.session_bucket(session.id, pending))
+
+    def remove(self, session_id: UUID) -> None:
+        self.index.remove(session_id)
+        self._ratings.pop(session_id, None)
+
+    def enqueue(self, name: str, role: PlayerRole, skill: int, owner: Any = None) -> Ticket:
+        ticket = Ticket(name=name, role=role, skill=skill, owner=owner)
+        self.queue[ticket.id] = ticket
+        return ticket
+
+    def cancel(self, ticket_id: UUID) -> Optional[Ticket]:
+        return self.queue.pop(ticket_id, None)
+
+    def cancel_owner(self, owner: Any) -> List[Ticket]:
+        """Drop every queued ticket of a connection, e.g. when it closes"""
+        tickets = [ticket for ticket in self.queue.values() if ticket.owner is owner]
+        for ticket in tickets:
+            del self.queue[ticket.id]
+        return tickets
+
+    def assign(
+        self,
+        state: GameState,
+        new_session: Callable[[Ticket], GameSession],
+        now: Optional[float] = None,
+    ) -> Tuple[List[Match], List[Ticket]]:
+        """Place up to ``max_batch`` queued tickets, oldest first; return the matches and expired tickets"""
+        now = time.monotonic() if now is None else now
+        matches: Dict[UUID, Match] = {}
+        expired: List[Ticket] = []
+        for ticket in list(self.queue.values())[:self.max_batch]:
+            session = self._find_session(state, matches, ticket, now)
+            if session is None and ticket.role == PlayerRole.COMMANDER:
+                session = new_session(ticket)
+                matches[session.id] = Match(session, created=True)
+                session.try_reserve_slot(ticket.role)
+            if session is None:
+                if now - ticket.enqueued_at >= self.ticket_ttl:
+                    del self.queue[ticket.id]
+                    expired.append(ticket)
+                continue
+            del self.queue[ticket.id]
+            match = matches.setdefault(session.id, Match(session))
+            match.tickets.append(ticket)
+            self.update(session, match)
+        return list(matches.values()), expired
+
+    def placed(self, match: Match) -> None:
+        """Count a written match's skills towards its session's level"""
+        total, count = self._ratings.get(match.session.id, (0, 0))
+        self._ratings[match.session.id] = (
+            total + sum(ticket.skill for ticket in match.tickets), count + len(match.tickets)
+        )
+        self.update(match.session)
+
+    def release(self, match: Match, requeue: bool = False) -> None:
+        """Undo the reservations of a match that could not be written; with
+        ``requeue`` its tickets wait for the next pass, keeping their place"""
+        for ticket in match.tickets:
+            match.session.release_slot(ticket.role)
+        if match.created:
+            self.remove(match.session.id)
+        else:
+            self.update(match.session)
+        if requeue:
+            self.queue.update((ticket.id, ticket) for ticket in match.tickets)
+            # Oldest first again, as assign expects
+            self.queue = dict(sorted(self.queue.items(), key=lambda item: item[1].enqueued_at))
+
+    def _find_session(
+        self,
+        state: GameState,
+        matches: Dict[UUID, Match],
+        ticket: Ticket,
+        now: float,
+    ) -> Optional[GameSession]:
+        distance = min(self.max_distance, int((now - ticket.enqueued_at) / self.widen_after))
+        for session_id in self.index.candidates(ticket.role, self.bucket(ticket.skill), distance):
+            match = matches.get(session_id)
+            session = match.session if match else state.sessions.get(session_id)
+            # Reserving may fail if a join took the slot after the session was indexed
+            if session is not None and session.try_reserve_slot(ticket.role):
+                return session
+        return None
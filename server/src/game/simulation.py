@@ -0,0 +1,391 @@
+import asyncio
+import math
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+from uuid import UUID
+
+from src.log import get_logger
+from src.metrics import REGISTRY
+
+from .board_store import BoardStore, np
+
+logger = get_logger(__name__)
+
+TICK_SECONDS = REGISTRY.histogram("risker_tick_seconds", "Time to advance every board by one tick")
+TICK_LAG_SECONDS = REGISTRY.histogram("risker_tick_lag_seconds", "How late a tick started against its schedule")
+SKIPPED_TICKS = REGISTRY.counter("risker_skipped_ticks_total", "Ticks dropped after the loop fell too far behind")
+ACTIVE_BOARDS = REGISTRY.gauge("risker_active_boards", "Boards being simulated")
+
+class TerritoryTable:
+    """Territory columns of one board in Python lists, indexed by territory ID.
+
+    Owners are indexes into the board's commanders, -1 for none. BoardStore
+    provides the same columns as NumPy views when it is available.
+    """
+
+    __slots__ = ("owner", "units", "income", "changed", "resources")
+
+    def __init__(self, owner: List[int], units: List[int], income: List[float], commanders: int):
+        self.owner = owner
+        self.units = units
+        self.income = income
+        # Tick each territory last changed at, for deltas
+        self.changed = [0] * len(owner)
+        self.resources = [0.0] * commanders
+
+    def __len__(self) -> int:
+        return len(self.owner)
+
+    def changed_since(self, tick: int) -> List[int]:
+        return [territory for territory, changed in enumerate(self.changed) if changed > tick]
+
+@dataclass(slots=True, kw_only=True)
+class MoveOrder:
+    id: int
+    owner: UUID
+    source: int
+    target: int
+    units: int
+    issued: int
+    arrives: int
+    changed: int
+
+    def record(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "owner": str(self.owner),
+            "source": self.source,
+            "target": self.target,
+            "units": self.units,
+            "issued": self.issued,
+            "arrives": self.arrives
+        }
+
+@dataclass(slots=True, kw_only=True)
+class Board:
+    """Grand board of one game session, advanced in fixed ticks by Simulation.
+
+    Territory state is kept in columns (``table``), either Python lists or
+    views into a BoardStore shared by all boards. Every territory and order
+    remembers the tick it last changed at, and removed orders are kept for
+    ``history`` ticks, so ``delta`` can send a client only what changed since
+    the tick it last acknowledged. Changes made by commands between ticks
+    are stamped with the next tick. A commander holding ``victory_share`` of
+    the territories wins.
+    """
+    session_id: UUID
+    commanders: List[UUID]
+    neighbors: List[Tuple[int, ...]]
+    table: Any
+    # Ticks a movement order takes to reach a neighbouring territory
+    move_ticks: int = 20
+    unit_cost: float = 10.0
+    history: int = 100
+    victory_share: float = 0.6
+    tick: int = 0
+    winner: Optional[UUID] = None
+    orders: Dict[int, MoveOrder] = field(default_factory=dict)
+    # Last tick each player acknowledged; players without one get full snapshots
+    acks: Dict[UUID, int] = field(default_factory=dict)
+    _index: Dict[UUID, int] = field(default_factory=dict, repr=False)
+    _removed: Deque[Tuple[int, int]] = field(default_factory=deque, repr=False)
+    _next_order: int = field(default=1, repr=False)
+    _captured: bool = field(default=False, repr=False)
+
+    def __post_init__(self) -> None:
+        self._index = {commander: index for index, commander in enumerate(self.commanders)}
+
+    @classmethod
+    def generate(
+        cls,
+        session_id: UUID,
+        commanders: List[UUID],
+        territories_per_commander: int = 6,
+        units: int = 3,
+        store: Optional[Any] = None,
+        **options: Any,
+    ) -> "Board":
+        """Lay territories out on a grid and deal them out to the commanders in turn"""
+        count = max(1, len(commanders)) * territories_per_commander
+        width = math.ceil(math.sqrt(count))
+        neighbors = []
+        for index in range(count):
+            column = index % width
+            adjacent = []
+            if column > 0:
+                adjacent.append(index - 1)
+            if column < width - 1 and index + 1 < count:
+                adjacent.append(index + 1)
+            if index >= width:
+                adjacent.append(index - width)
+            if index + width < count:
+                adjacent.append(index + width)
+            neighbors.append(tuple(adjacent))
+        owner = [index % len(commanders) if commanders else -1 for index in range(count)]
+        if store is not None:
+            table = store.add(
+                session_id, owner, [units] * count, [1.0] * count, options.get("victory_share", 0.6)
+            )
+        else:
+            table = TerritoryTable(owner, [units] * count, [1.0] * count, len(commanders))
+        return cls(session_id=session_id, commanders=list(commanders), neighbors=neighbors, table=table, **options)
+
+    def step(self, seconds: float) -> None:
+        """Advance one tick of ``seconds`` on its own, as when no BoardStore is used"""
+        self.advance()
+        self.accrue(seconds)
+        if self._captured:
+            self.check_victory()
+
+    def advance(self) -> None:
+        """Move to the next tick and resolve the orders that arrive in it"""
+        self.tick += 1
+        for order in [order for order in self.orders.values() if order.arrives <= self.tick]:
+            self._arrive(order)
+        while self._removed and self._removed[0][0] <= self.tick - self.history:
+            self._removed.popleft()
+
+    def accrue(self, seconds: float) -> None:
+        """Credit each owned territory's income to its owner"""
+        # Summed per owner first, in the same order as BoardStore.accrue
+        gains = [0.0] * len(self.commanders)
+        for owner, income in zip(self.table.owner, self.table.income, strict=True):
+            if owner >= 0:
+                gains[owner] += income
+        resources = self.table.resources
+        for owner, gain in enumerate(gains):
+            resources[owner] += gain * seconds
+
+    def check_victory(self) -> Optional[UUID]:
+        """Set and return the winner if a commander holds ``victory_share`` of the map"""
+        self._captured = False
+        counts = [0] * len(self.commanders)
+        for owner in self.table.owner:
+            if owner >= 0:
+                counts[owner] += 1
+        for index, count in enumerate(counts):
+            if count >= self.victory_share * len(self.table):
+                self.winner = self.commanders[index]
+        return self.winner
+
+    def move(self, commander: UUID, source: int, target: int, units: int) -> MoveOrder:
+        """Send units from an owned territory to a neighbouring one; at least one unit stays behind"""
+        self._check_territory(source)
+        table = self.table
+        if table.owner[source] != self._index.get(commander):
+            raise ValueError("Territory not controlled")
+        if target not in self.neighbors[source]:
+            raise ValueError("Target is not adjacent")
+        if units >= table.units[source]:
+            raise ValueError("Not enough units")
+        stamp = self.tick + 1
+        table.units[source] -= units
+        table.changed[source] = stamp
+        order = MoveOrder(
+            id=self._next_order,
+            owner=commander,
+            source=source,
+            target=target,
+            units=units,
+            issued=self.tick,
+            arrives=self.tick + self.move_ticks,
+            changed=stamp
+        )
+        self._next_order += 1
+        self.orders[order.id] = order
+        return order
+
+    def deploy(self, commander: UUID, territory: int, units: int) -> Dict[str, Any]:
+        """Spend resources on new units in an owned territory and return its record"""
+        self._check_territory(territory)
+        table = self.table
+        index = self._index.get(commander)
+        if index is None or table.owner[territory] != index:
+            raise ValueError("Territory not controlled")
+        cost = units * self.unit_cost
+        if table.resources[index] < cost:
+            raise ValueError("Not enough resources")
+        table.resources[index] -= cost
+        table.units[territory] += units
+        table.changed[territory] = self.tick + 1
+        return self.territory_record(territory)
+
+    def acknowledge(self, player_id: UUID, tick: int) -> None:
+        # Acks only move forward and never past the current tick
+        if tick <= self.tick and tick > self.acks.get(player_id, -1):
+            self.acks[player_id] = tick
+
+    def territory_record(self, territory: int, full: bool = False) -> Dict[str, Any]:
+        owner = int(self.table.owner[territory])
+        data = {
+            "id": territory,
+            "owner": str(self.commanders[owner]) if owner >= 0 else None,
+            "units": int(self.table.units[territory]),
+            "income": float(self.table.income[territory])
+        }
+        if full:
+            data["neighbors"] = list(self.neighbors[territory])
+        return data
+
+    def delta(self, base: Optional[int]) -> Dict[str, Any]:
+        """Changes since tick ``base``, or the full state if that tick is unknown or too old"""
+        if base is None or base < self.tick - self.history or base > self.tick:
+            return {
+                "tick": self.tick,
+                "base": None,
+                "territories": [self.territory_record(territory, full=True) for territory in range(len(self.table))],
+                "orders": [order.record() for order in self.orders.values()],
+                "removed_orders": [],
+                "resources": self._resources()
+            }
+        return {
+            "tick": self.tick,
+            "base": base,
+            "territories": [self.territory_record(territory) for territory in self.table.changed_since(base)],
+            "orders": [order.record() for order in self.orders.values() if order.changed > base],
+            "removed_orders": [order_id for tick, order_id in self._removed if tick > base],
+            "resources": self._resources()
+        }
+
+    def _resources(self) -> Dict[str, float]:
+        resources = self.table.resources
+        return {str(commander): round(float(resources[index]), 2) for index, commander in enumerate(self.commanders)}
+
+    def _check_territory(self, territory: int) -> None:
+        if not 0 <= territory < len(self.table):
+            raise ValueError("Unknown territory")
+
+    def _arrive(self, order: MoveOrder) -> None:
+        # Reinforce an owned territory; otherwise the larger force keeps or takes it
+        table = self.table
+        target = order.target
+        attacker = self._index[order.owner]
+        if table.owner[target] == attacker:
+            table.units[target] += order.units
+        elif order.units > table.units[target]:
+            table.owner[target] = attacker
+            table.units[target] = order.units - table.units[target]
+            self._captured = True
+        else:
+            table.units[target] -= order.units
+        table.changed[target] = self.tick
+        del self.orders[order.id]
+        self._removed.append((self.tick, order.id))
+
+class Simulation:
+    """Advances every active board at a fixed tick rate from one task.
+
+    Tick ``n`` is due ``n / tick_rate`` seconds after the loop started, so a
+    slow tick delays the next one without shifting the schedule; ticks that
+    fall behind run back to back to catch up, and if the loop is more than
+    ``max_catchup`` ticks behind the missed ticks are skipped instead.
+    ``on_tick`` is called with each board after it has advanced.
+
+    With ``vectorized``, which defaults to whether NumPy is installed, new
+    boards keep their territories in one BoardStore, so income, captures and
+    map control are computed for all of them in a single pass per tick.
+    """
+
+    def __init__(
+        self,
+        tick_rate: float = 10.0,
+        on_tick: Optional[Callable[[Board], None]] = None,
+        max_catchup: int = 5,
+        vectorized: Optional[bool] = None,
+    ):
+        self.tick_rate = tick_rate
+        self.on_tick = on_tick
+        self.max_catchup = max_catchup
+        self.boards: Dict[UUID, Board] = {}
+        if vectorized is None:
+            vectorized = np is not None
+        self.store = BoardStore() if vectorized else None
+        self._task: Optional[asyncio.Task] = None
+        ACTIVE_BOARDS.set_function(lambda: len(self.boards))
+
+    @property
+    def tick_seconds(self) -> float:
+        return 1.0 / self.tick_rate
+
+    def new_board(self, session_id: UUID, commanders: List[UUID], **options: Any) -> Board:
+        """Generate a board for a session and start simulating it"""
+        store = self.store
+        if store is not None and len(commanders) > store.max_commanders:
+            store = None  # more commanders than a store slot holds; simulated on its own
+        board = Board.generate(session_id, commanders, store=store, **options)
+        self.add(board)
+        return board
+
+    def add(self, board: Board) -> None:
+        self.boards[board.session_id] = board
+
+    def get(self, session_id: UUID) -> Optional[Board]:
+        return self.boards.get(session_id)
+
+    def remove(self, session_id: UUID) -> Optional[Board]:
+        board = self.boards.pop(session_id, None)
+        if board is not None and not isinstance(board.table, TerritoryTable):
+            self.store.remove(session_id)
+        return board
+
+    async def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def close(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    def step(self) -> None:
+        """Advance every board by one tick"""
+        seconds = self.tick_seconds
+        boards = list(self.boards.values())
+        for board in boards:
+            try:
+                if isinstance(board.table, TerritoryTable):
+                    board.step(seconds)
+                else:
+                    board.advance()
+            except Exception:
+                logger.error("Failed to advance board", session_id=board.session_id, exc_info=True)
+        if self.store is not None and len(self.store):
+            # One pass over the territories of every stored board
+            self.store.accrue(seconds)
+            for session_id, commander in self.store.leaders(self.store.ownership_changes()):
+                board = self.boards[session_id]
+                board.winner = board.commanders[commander]
+        if self.on_tick:
+            for board in boards:
+                try:
+                    self.on_tick(board)
+                except Exception:
+                    logger.error("Failed to send board state", session_id=board.session_id, exc_info=True)
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        interval = self.tick_seconds
+        due = loop.time() + interval
+        while True:
+            await asyncio.sleep(max(0.0, due - loop.time()))
+            late = loop.time() - due
+            behind = int(late / interval)
+            if behind > self.max_catchup:
+                if REGISTRY.enabled:
+                    SKIPPED_TICKS.inc(amount=behind)
+                logger.warning("Simulation fell behind", skipped=behind, boards=len(self.boards))
+                due += behind * interval
+                late -= behind * interval
+            start = time.perf_counter()
+            self.step()
+            if REGISTRY.enabled:
+                TICK_SECONDS.observe(time.perf_counter() - start)
+                TICK_LAG_SECONDS.observe(late)
+            due += interval
@@ -0,0 +1,70 @@
+import logging
+import random
+import sys
+from dataclasses import dataclass, field
+from typing import Any, Dict, Mapping, Optional
+
+import structlog
+
+@dataclass(frozen=True)
+class LogProfile:
+    """How much the server logs and how it is rendered"""
+    level: int
+    json: bool
+    # Fraction of events kept, by event name; events not listed are always kept
+    sample_rates: Mapping[str, float] = field(default_factory=dict)
+
+PROFILES: Dict[str, LogProfile] = {
+    "development": LogProfile(level=logging.INFO, json=False),
+    # Per-message and payload events are logged at DEBUG, which this profile
+    # filters out before any event dict is built
+    "production": LogProfile(
+        level=logging.INFO,
+        json=True,
+        sample_rates={
+            "Player joined session": 0.01,
+            "Player left session": 0.01,
+            "Lobby created": 0.1,
+            "Connection closed": 0.01,
+        },
+    ),
+}
+
+def get_logger(name: str) -> Any:
+    """Module logger; configuration is applied lazily on first use"""
+    return structlog.get_logger(logger_name=name)
+
+def _sampler(sample_rates: Mapping[str, float]):
+    def sample(logger: Any, method_name: str, event_dict: Dict[str, Any]) -> Dict[str, Any]:
+        rate = sample_rates.get(event_dict.get("event"))
+        if rate is not None and random.random() >= rate:
+            raise structlog.DropEvent
+        return event_dict
+    return sample
+
+def configure_logging(profile: str = "development", level: Optional[str] = None) -> None:
+    """Configure structlog and the stdlib root logger for a named profile"""
+    settings = PROFILES[profile]
+    log_level = logging.getLevelName(level.upper()) if level else settings.level
+
+    # Third-party libraries (websockets, uvicorn, aiosqlite) log through stdlib logging
+    logging.basicConfig(format="%(levelname)s:%(name)s:%(message)s", level=log_level, stream=sys.stderr)
+
+    processors = [
+        structlog.contextvars.merge_contextvars,
+        structlog.processors.add_log_level,
+    ]
+    if settings.sample_rates:
+        processors.append(_sampler(settings.sample_rates))
+    processors.append(structlog.processors.TimeStamper(fmt="iso"))
+    if settings.json:
+        processors += [structlog.processors.format_exc_info, structlog.processors.JSONRenderer(default=str)]
+    else:
+        processors.append(structlog.dev.ConsoleRenderer())
+
+    structlog.configure(
+        processors=processors,
+        wrapper_class=structlog.make_filtering_bound_logger(log_level),
+        logger_factory=structlog.WriteLoggerFactory(file=sys.stderr),
+        cache_logger_on_first_use=True,
+    )
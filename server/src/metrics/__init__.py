@@ -0,0 +1,6 @@
+from .registry import Counter, Gauge, Histogram, MetricsRegistry
+
+# Process-wide registry; disabled until GameServer is started with a metrics port
+REGISTRY = MetricsRegistry()
+
+__all__ = ['Counter', 'Gauge', 'Histogram', 'MetricsRegistry', 'REGISTRY']
@@ -0,0 +1,45 @@
+import asyncio
+from typing import Optional
+
+import uvicorn
+from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
+
+from src.log import get_logger
+
+from .registry import MetricsRegistry
+
+logger = get_logger(__name__)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+def create_app(registry: MetricsRegistry) -> FastAPI:
+    app = FastAPI(title="Riskier metrics", docs_url=None, redoc_url=None, openapi_url=None)
+
+    @app.get("/metrics")
+    async def metrics() -> PlainTextResponse:
+        return PlainTextResponse(registry.render(), media_type=CONTENT_TYPE)
+
+    return app
+
+class MetricsServer:
+    """Serves the registry on a local HTTP endpoint from the game server's event loop"""
+
+    def __init__(self, registry: MetricsRegistry, host: str = "127.0.0.1", port: int = 9100):
+        self.host = host
+        self.port = port
+        config = uvicorn.Config(create_app(registry), host=host, port=port, log_level="warning")
+        self._server = uvicorn.Server(config)
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._server.serve())
+            logger.info("Metrics endpoint started", host=self.host, port=self.port)
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._server.should_exit = True
+        await self._task
+        self._task = None
@@ -1,3 +1,22 @@
 from .game import Player, PlayerRole, GameSession, GameState
+from .protocol import (
+    CreateLobbyRequest,
+    JoinLobbyRequest,
+    LeaveLobbyRequest,
+    ListLobbiesRequest,
+    ChatRequest,
+    ResumeRequest,
+    EnqueueRequest,
+    CancelMatchmakingRequest,
+    GameStartRequest,
+    MoveOrderRequest,
+    DeployRequest,
+    AckRequest,
+)
 
-__all__ = ['Player', 'PlayerRole', 'GameSession', 'GameState'] 
\ No newline at end of file
+__all__ = [
+    'Player', 'PlayerRole', 'GameSession', 'GameState',
+    'CreateLobbyRequest', 'JoinLobbyRequest', 'LeaveLobbyRequest', 'ListLobbiesRequest', 'ChatRequest',
+    'ResumeRequest', 'EnqueueRequest', 'CancelMatchmakingRequest',
+    'GameStartRequest', 'MoveOrderRequest', 'DeployRequest', 'AckRequest',
+]
@@ -0,0 +1,106 @@
+import json
+from abc import ABC, abstractmethod
+from typing import Any, Dict, List, Union
+
+try:
+    import orjson
+except ImportError:  # optional: pip install riskier-server[fast]
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # optional: pip install riskier-server[fast]
+    msgpack = None
+
+Frame = Union[str, bytes]
+
+class CodecError(ValueError):
+    """Raised when an inbound frame cannot be decoded"""
+
+class Codec(ABC):
+    """Encodes and decodes WebSocket frames for one wire format"""
+    name: str
+    label: str
+    subprotocol: str
+
+    @abstractmethod
+    def decode(self, frame: Frame) -> Dict[str, Any]:
+        """Decode one inbound frame, raising CodecError if it is malformed"""
+        pass
+
+    @abstractmethod
+    def encode(self, message: Dict[str, Any]) -> Frame:
+        """Encode one outbound message as a frame"""
+        pass
+
+class JsonCodec(Codec):
+    """JSON text frames, using orjson when it is installed"""
+    name = "json"
+    label = "JSON"
+    subprotocol = "risker.json"
+
+    def decode(self, frame: Frame) -> Dict[str, Any]:
+        try:
+            message = orjson.loads(frame) if orjson else json.loads(frame)
+        except ValueError as e:
+            raise CodecError(f"Invalid JSON: {e}") from e
+        if not isinstance(message, dict):
+            raise CodecError("Message must be a JSON object")
+        return message
+
+    def encode(self, message: Dict[str, Any]) -> Frame:
+        if orjson:
+            # orjson serializes UUIDs natively and returns bytes; keep text frames
+            return orjson.dumps(message).decode()
+        return json.dumps(message, default=str)
+
+class MsgPackCodec(Codec):
+    """MessagePack binary frames"""
+    name = "msgpack"
+    label = "MessagePack"
+    subprotocol = "risker.msgpack"
+
+    def decode(self, frame: Frame) -> Dict[str, Any]:
+        if msgpack is None:
+            raise CodecError("MessagePack support is not installed")
+        if isinstance(frame, str):
+            raise CodecError("Expected a binary MessagePack frame")
+        try:
+            message = msgpack.unpackb(frame)
+        except (ValueError, msgpack.ExtraData, msgpack.FormatError, msgpack.StackError) as e:
+            raise CodecError(f"Invalid MessagePack: {e}") from e
+        if not isinstance(message, dict):
+            raise CodecError("Message must be a MessagePack map")
+        return message
+
+    def encode(self, message: Dict[str, Any]) -> Frame:
+        return msgpack.packb(message, default=str)
+
+JSON = JsonCodec()
+MSGPACK = MsgPackCodec()
+
+# Codecs by the name stored with journaled commands
+CODECS_BY_NAME: Dict[str, Codec] = {JSON.name: JSON, MSGPACK.name: MSGPACK}
+
+# Codecs by WebSocket subprotocol, in order of preference
+CODECS: Dict[str, Codec] = {JSON.subprotocol: JSON}
+if msgpack:
+    CODECS = {MSGPACK.subprotocol: MSGPACK, **CODECS}
+
+def subprotocols() -> List[str]:
+    """Subprotocols offered at handshake, preferred first"""
+    return list(CODECS)
+
+def codec_for_subprotocol(subprotocol: Any) -> Codec:
+    """Codec for a negotiated subprotocol; connections without one use JSON"""
+    return CODECS.get(subprotocol, JSON)
+
+def decode_frame(frame: Frame, codec: str = JSON.name) -> Dict[str, Any]:
+    """Decode a stored raw frame with the codec of the connection it arrived on.
+
+    JSON connections may send binary frames too, so the frame type alone does
+    not tell the codec.
+    """
+    if codec not in CODECS_BY_NAME:
+        raise CodecError(f"Unknown codec: {codec}")
+    return CODECS_BY_NAME[codec].decode(frame)
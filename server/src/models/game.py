@@ -1,36 +1,74 @@
+from dataclasses import dataclass, field
 from enum import Enum
-from typing import Dict, Optional
+from typing import Any, Dict, List, Optional
 from uuid import UUID, uuid4
-from pydantic import BaseModel, Field
 import time
-import logging
 
-logger = logging.getLogger(__name__)
+from src.log import get_logger
+
+logger = get_logger(__name__)
 
 class PlayerRole(str, Enum):
     COMMANDER = "commander"
     PAWN = "pawn"
 
-class Player(BaseModel):
-    id: UUID = Field(default_factory=uuid4)
+# Runtime state is kept in slotted dataclasses since it is mutated on every
+# message; validation and serialization happen in the protocol models instead.
+
+@dataclass(slots=True, kw_only=True)
+class Player:
+    id: UUID = field(default_factory=uuid4)
     name: str
     role: PlayerRole
     session_id: Optional[UUID] = None
 
-class GameSession(BaseModel):
-    id: UUID = Field(default_factory=uuid4)
+    def record(self) -> Dict[str, Any]:
+        """Plain representation used by snapshots and the event log"""
+        return {"id": str(self.id), "name": self.name, "role": self.role.value}
+
+@dataclass(slots=True, kw_only=True)
+class GameSession:
+    id: UUID = field(default_factory=uuid4)
     name: str
-    players: Dict[UUID, Player] = Field(default_factory=dict)
-    max_commanders: int = Field(default=2)  # Minimum 2, maximum 4
-    max_pawns: int = Field(default=4)  # Default max pawns
+    players: Dict[UUID, Player] = field(default_factory=dict)
+    max_commanders: int = 2  # Minimum 2, maximum 4
+    max_pawns: int = 4  # Default max pawns
     is_active: bool = False
-    created_at: float = Field(default_factory=lambda: time.time())
+    status: str = "waiting"
+    created_at: float = field(default_factory=time.time)
+    # Per-role membership (insertion ordered) and slots reserved but not yet filled
+    _members: Dict[PlayerRole, Dict[UUID, Player]] = field(
+        default_factory=lambda: {role: {} for role in PlayerRole}, init=False, repr=False
+    )
+    _reserved: Dict[PlayerRole, int] = field(
+        default_factory=lambda: {role: 0 for role in PlayerRole}, init=False, repr=False
+    )
+
+    def record(self) -> Dict[str, Any]:
+        """Plain representation in the shape of a database lobby row"""
+        return {
+            "id": str(self.id),
+            "name": self.name,
+            "max_commanders": self.max_commanders,
+            "max_pawns": self.max_pawns,
+            "status": self.status,
+            "created_at": self.created_at
+        }
+
+    def get_role_count(self, role: PlayerRole) -> int:
+        return len(self._members[role]) + self._reserved[role]
+
+    def get_role_capacity(self, role: PlayerRole) -> int:
+        return self.max_commanders if role == PlayerRole.COMMANDER else self.max_pawns
 
     def get_commander_count(self) -> int:
-        return sum(1 for player in self.players.values() if player.role == PlayerRole.COMMANDER)
+        return self.get_role_count(PlayerRole.COMMANDER)
 
     def get_pawn_count(self) -> int:
-        return sum(1 for player in self.players.values() if player.role == PlayerRole.PAWN)
+        return self.get_role_count(PlayerRole.PAWN)
+
+    def get_members(self, role: PlayerRole) -> Dict[UUID, Player]:
+        return self._members[role]
 
     def can_join_as_commander(self) -> bool:
         return self.get_commander_count() < self.max_commanders
@@ -41,9 +79,35 @@ class GameSession(BaseModel):
     def is_full(self) -> bool:
         return not (self.can_join_as_commander() or self.can_join_as_pawn())
 
-class GameState(BaseModel):
-    sessions: Dict[UUID, GameSession] = Field(default_factory=dict)
-    players: Dict[UUID, Player] = Field(default_factory=dict)
+    def try_reserve_slot(self, role: PlayerRole) -> bool:
+        """Claim a slot for the role if one is free; fill it with add_player or undo with release_slot"""
+        if self.get_role_count(role) >= self.get_role_capacity(role):
+            return False
+        self._reserved[role] += 1
+        return True
+
+    def release_slot(self, role: PlayerRole) -> None:
+        """Give back a slot claimed with try_reserve_slot"""
+        if self._reserved[role] > 0:
+            self._reserved[role] -= 1
+
+    def add_player(self, player: Player, reserved: bool = False) -> None:
+        """Add a member; with ``reserved``, into a slot claimed with try_reserve_slot"""
+        if reserved:
+            self.release_slot(player.role)
+        self._members[player.role][player.id] = player
+        self.players[player.id] = player
+
+    def remove_player(self, player_id: UUID) -> Optional[Player]:
+        player = self.players.pop(player_id, None)
+        if player:
+            self._members[player.role].pop(player_id, None)
+        return player
+
+@dataclass(slots=True)
+class GameState:
+    sessions: Dict[UUID, GameSession] = field(default_factory=dict)
+    players: Dict[UUID, Player] = field(default_factory=dict)
 
     def create_session(self, name: str) -> GameSession:
         session = GameSession(name=name)
@@ -53,6 +117,70 @@ class GameState(BaseModel):
     def get_session(self, session_id: UUID) -> Optional[GameSession]:
         return self.sessions.get(session_id)
 
+    def restore_session(self, lobby: Dict[str, Any], members: List[Dict[str, Any]]) -> GameSession:
+        """Rebuild a stored lobby and its members from database rows"""
+        session = GameSession(
+            id=UUID(lobby["id"]),
+            name=lobby["name"],
+            max_commanders=lobby["max_commanders"],
+            max_pawns=lobby["max_pawns"],
+            status=lobby["status"],
+            created_at=lobby["created_at"]
+        )
+        for member in members:
+            self._restore_member(session, member)
+        self.sessions[session.id] = session
+        return session
+
+    def _restore_member(self, session: GameSession, member: Dict[str, Any]) -> None:
+        player_id = UUID(member["id"])
+        player = self.players.get(player_id)
+        if player is None:
+            player = self.players[player_id] = Player(
+                id=player_id, name=member["name"], role=PlayerRole(member["role"])
+            )
+        # Stored memberships were admitted when they were written, so no slot check here
+        player.session_id = session.id
+        session.add_player(player)
+
+    def snapshot(self) -> List[Dict[str, Any]]:
+        """Every session with its members, in the form restore_session takes"""
+        return [
+            {"lobby": session.record(), "members": [player.record() for player in session.players.values()]}
+            for session in self.sessions.values()
+        ]
+
+    def apply(self, event: Dict[str, Any]) -> None:
+        """Replay one event from the event log.
+
+        Events already reflected in the state are skipped, so replaying the
+        tail over a snapshot that raced with it is harmless. Events for
+        lobbies that are not in memory are skipped too; those lobbies are
+        loaded from the database when they are next used.
+        """
+        kind = event["type"]
+        if kind == "lobby_created":
+            if UUID(event["lobby"]["id"]) not in self.sessions:
+                self.restore_session(event["lobby"], [])
+            return
+        if kind not in ("player_joined", "player_left", "lobby_status", "lobby_removed"):
+            return
+        session = self.sessions.get(UUID(event["lobby_id"]))
+        if session is None:
+            return
+        if kind == "player_joined":
+            if UUID(event["player"]["id"]) not in session.players:
+                self._restore_member(session, event["player"])
+        elif kind == "player_left":
+            if UUID(event["player_id"]) in session.players:
+                self.leave_session(UUID(event["player_id"]))
+        elif kind == "lobby_status":
+            session.status = event["status"]
+        else:
+            del self.sessions[session.id]
+            for player_id in session.players:
+                self.players.pop(player_id, None)
+
     def create_player(self, name: str, role: PlayerRole) -> Player:
         player = Player(name=name, role=role)
         self.players[player.id] = player
@@ -62,28 +190,27 @@ class GameState(BaseModel):
         player = self.players.get(player_id)
         session = self.sessions.get(session_id)
 
-        logger.info(f"Attempting to join session {session_id} for player {player_id}")
-        logger.info(f"Player found: {player is not None}, Session found: {session is not None}")
-        
         if not player or not session:
-            logger.error(f"Join failed - Player exists: {player is not None}, Session exists: {session is not None}")
-            return False
-            
-        if session.is_full():
-            logger.error(f"Join failed - Session is full. Commander count: {session.get_commander_count()}/{session.max_commanders}, Pawn count: {session.get_pawn_count()}/{session.max_pawns}")
-            return False
-            
-        if player.role == PlayerRole.COMMANDER and not session.can_join_as_commander():
-            logger.error(f"Join failed - Cannot join as commander. Current commanders: {session.get_commander_count()}/{session.max_commanders}")
+            logger.warning(
+                "Join failed",
+                reason="unknown player or session",
+                player_id=player_id,
+                session_id=session_id
+            )
             return False
             
-        if player.role == PlayerRole.PAWN and not session.can_join_as_pawn():
-            logger.error(f"Join failed - Cannot join as pawn. Current pawns: {session.get_pawn_count()}/{session.max_pawns}")
+        if not session.try_reserve_slot(player.role):
+            logger.warning(
+                "Join failed",
+                reason="no slot available",
+                role=player.role.value,
+                session_id=session_id
+            )
             return False
             
         player.session_id = session_id
-        session.players[player_id] = player
-        logger.info(f"Successfully joined session {session_id} for player {player_id}")
+        session.add_player(player, reserved=True)
+        logger.info("Player joined session", player_id=player_id, session_id=session_id)
         return True
 
     def leave_session(self, player_id: UUID) -> bool:
@@ -93,7 +220,8 @@ class GameState(BaseModel):
             
         session = self.sessions.get(player.session_id)
         if session:
-            session.players.pop(player_id, None)
+            session.remove_player(player_id)
             player.session_id = None
+            logger.info("Player left session", player_id=player_id, session_id=session.id)
             return True
         return False 
\ No newline at end of file
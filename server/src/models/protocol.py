@@ -0,0 +1,72 @@
+from typing import Optional
+from uuid import UUID
+from pydantic import BaseModel, ConfigDict, Field
+
+from .game import PlayerRole
+
+# Inbound WebSocket messages. These are validated once at the protocol
+# boundary; handlers then work with the runtime models in game.py.
+
+class ProtocolMessage(BaseModel):
+    model_config = ConfigDict(populate_by_name=True, extra="ignore")
+
+class CreateLobbyRequest(ProtocolMessage):
+    name: str
+    max_commanders: int = Field(default=2, alias="maxCommanders", ge=1)
+    max_pawns: int = Field(default=4, alias="maxPawns", ge=0)
+    creator_name: str = "Host"
+
+class JoinLobbyRequest(ProtocolMessage):
+    lobby_id: UUID
+    role: PlayerRole
+    name: str
+
+class LeaveLobbyRequest(ProtocolMessage):
+    lobby_id: UUID
+    player_id: UUID
+
+class ResumeRequest(ProtocolMessage):
+    lobby_id: UUID
+    player_id: UUID
+    token: str
+
+class ListLobbiesRequest(ProtocolMessage):
+    status: Optional[str] = None
+    limit: Optional[int] = Field(default=None, ge=1)
+    cursor: Optional[UUID] = None
+    since: Optional[int] = None
+
+class EnqueueRequest(ProtocolMessage):
+    name: str
+    role: PlayerRole
+    skill: int = Field(default=1000, ge=0)
+
+class CancelMatchmakingRequest(ProtocolMessage):
+    ticket_id: UUID
+
+class GameStartRequest(ProtocolMessage):
+    lobby_id: UUID
+    player_id: UUID
+
+class MoveOrderRequest(ProtocolMessage):
+    lobby_id: UUID
+    player_id: UUID
+    source: int = Field(ge=0)
+    target: int = Field(ge=0)
+    units: int = Field(ge=1)
+
+class DeployRequest(ProtocolMessage):
+    lobby_id: UUID
+    player_id: UUID
+    territory: int = Field(ge=0)
+    units: int = Field(ge=1)
+
+class AckRequest(ProtocolMessage):
+    lobby_id: UUID
+    player_id: UUID
+    tick: int = Field(ge=0)
+
+class ChatRequest(ProtocolMessage):
+    lobby_id: UUID
+    sender: Optional[str] = None
+    message: str
@@ -0,0 +1,218 @@
+import asyncio
+from abc import ABC, abstractmethod
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+from urllib.parse import urlsplit
+
+import redis.asyncio as redis
+
+from src.log import get_logger
+from src.models.codec import JSON
+
+logger = get_logger(__name__)
+
+Callback = Callable[[str, Dict[str, Any]], None]
+
+REDIS_SCHEMES = ("redis", "rediss")
+
+def lobby_channel(lobby_id: Any) -> str:
+    return f"lobby:{lobby_id}"
+
+class Backplane(ABC):
+    """Publish/subscribe on named channels shared by every server process.
+
+    ``publish`` never waits: messages are queued and sent by a flush task
+    scheduled on the next loop iteration, so everything published while
+    handling one message goes out as a single batch of up to ``batch_size``.
+    Subscribers are plain callbacks and receive their own process's messages
+    too, so fan-out to local sockets happens in one place for every backend.
+    """
+
+    def __init__(self, batch_size: int = 256):
+        self.batch_size = batch_size
+        self._callbacks: Dict[str, Set[Callback]] = {}
+        self._outbox: List[Tuple[str, Dict[str, Any]]] = []
+        self._flusher: Optional[asyncio.Task] = None
+
+    @abstractmethod
+    async def start(self) -> None:
+        """Connect to the backend"""
+        pass
+
+    async def close(self) -> None:
+        """Send queued messages and disconnect"""
+        await self.flush()
+
+    def publish(self, channel: str, message: Dict[str, Any]) -> None:
+        self._outbox.append((channel, message))
+        if self._flusher is None:
+            self._flusher = asyncio.create_task(self._flush_soon())
+
+    async def flush(self) -> None:
+        """Send every queued message"""
+        while self._outbox:
+            pending, self._outbox = self._outbox, []
+            for start in range(0, len(pending), self.batch_size):
+                await self._send(pending[start:start + self.batch_size])
+
+    async def subscribe(self, channel: str, callback: Callback) -> None:
+        callbacks = self._callbacks.setdefault(channel, set())
+        if not callbacks:
+            await self._subscribe(channel)
+        callbacks.add(callback)
+
+    async def unsubscribe(self, channel: str, callback: Callback) -> None:
+        callbacks = self._callbacks.get(channel)
+        if not callbacks or callback not in callbacks:
+            return
+        callbacks.discard(callback)
+        if not callbacks:
+            del self._callbacks[channel]
+            await self._unsubscribe(channel)
+
+    def deliver(self, channel: str, message: Dict[str, Any]) -> None:
+        """Hand a received message to this process's subscribers"""
+        for callback in tuple(self._callbacks.get(channel, ())):
+            try:
+                callback(channel, message)
+            except Exception:
+                logger.error("Backplane subscriber failed", channel=channel, exc_info=True)
+
+    async def _flush_soon(self) -> None:
+        try:
+            await self.flush()
+        except Exception:
+            logger.error("Failed to publish to backplane", exc_info=True)
+        finally:
+            self._flusher = None
+
+    @abstractmethod
+    async def _send(self, batch: List[Tuple[str, Dict[str, Any]]]) -> None:
+        """Publish one batch of (channel, message) pairs"""
+        pass
+
+    @abstractmethod
+    async def _subscribe(self, channel: str) -> None:
+        """Start receiving a channel's messages from the backend"""
+        pass
+
+    @abstractmethod
+    async def _unsubscribe(self, channel: str) -> None:
+        """Stop receiving a channel's messages from the backend"""
+        pass
+
+class InProcessBackplane(Backplane):
+    """Backplane for a single process; also serves as the fake in tests"""
+
+    async def start(self) -> None:
+        """Nothing to connect to"""
+
+    async def _subscribe(self, channel: str) -> None:
+        """Messages never leave the process, so there is nothing to subscribe to"""
+
+    async def _unsubscribe(self, channel: str) -> None:
+        """Messages never leave the process, so there is nothing to unsubscribe from"""
+
+    async def _send(self, batch: List[Tuple[str, Dict[str, Any]]]) -> None:
+        for channel, message in batch:
+            self.deliver(channel, message)
+
+class RedisBackplane(Backplane):
+    """Backplane over Redis pub/sub.
+
+    Each batch is sent as one pipeline of PUBLISH commands, so a burst of
+    messages costs a single round trip. Messages are JSON encoded and channel
+    names are prefixed so several deployments can share one Redis.
+    """
+
+    def __init__(self, url: str = "redis://localhost:6379/0", prefix: str = "risker:", batch_size: int = 256):
+        super().__init__(batch_size)
+        self.url = url
+        self.prefix = prefix
+        self._client = None
+        self._pubsub = None
+        self._reader: Optional[asyncio.Task] = None
+
+    async def start(self) -> None:
+        if self._client is not None:
+            return
+        self._client = redis.from_url(self.url)
+        await self._open_pubsub()
+        self._reader = asyncio.create_task(self._read())
+        logger.info("Connected to Redis backplane", url=self.url)
+
+    async def close(self) -> None:
+        if self._client is None:
+            return
+        await super().close()
+        self._reader.cancel()
+        try:
+            await self._reader
+        except asyncio.CancelledError:
+            pass
+        await self._pubsub.aclose()
+        await self._client.aclose()
+        self._client = None
+
+    async def _send(self, batch: List[Tuple[str, Dict[str, Any]]]) -> None:
+        if self._client is None:
+            raise RuntimeError("Backplane not connected")
+        pipeline = self._client.pipeline(transaction=False)
+        for channel, message in batch:
+            pipeline.publish(self.prefix + channel, JSON.encode(message))
+        await pipeline.execute()
+
+    async def _subscribe(self, channel: str) -> None:
+        await self._pubsub.subscribe(self.prefix + channel)
+
+    async def _unsubscribe(self, channel: str) -> None:
+        await self._pubsub.unsubscribe(self.prefix + channel)
+
+    async def _open_pubsub(self) -> None:
+        """Open a subscriber connection to every channel that has local subscribers"""
+        self._pubsub = self._client.pubsub(ignore_subscribe_messages=True)
+        # Keeps the subscriber connection open while no lobby channel is subscribed
+        await self._pubsub.subscribe(
+            f"{self.prefix}backplane", *(self.prefix + channel for channel in self._callbacks)
+        )
+
+    async def _read(self) -> None:
+        while True:
+            try:
+                async for item in self._pubsub.listen():
+                    if item["type"] != "message":
+                        continue
+                    try:
+                        channel = item["channel"].decode()[len(self.prefix):]
+                        message = JSON.decode(item["data"])
+                    except ValueError as e:
+                        logger.warning("Dropped undecodable backplane message", error=str(e))
+                        continue
+                    self.deliver(channel, message)
+                # listen() only returns once nothing is subscribed, e.g. after a failed resubscribe
+                logger.warning("Redis backplane subscriber lost its channels, resubscribing")
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                # Without a reader nothing from other processes arrives, so start over on a new connection
+                logger.error("Redis backplane reader failed, resubscribing", exc_info=True)
+            await asyncio.sleep(1.0)
+            await self._resubscribe()
+
+    async def _resubscribe(self) -> None:
+        try:
+            await self._pubsub.aclose()
+        except Exception:
+            logger.debug("Failed to close the old backplane subscriber", exc_info=True)
+        try:
+            await self._open_pubsub()
+        except Exception:
+            # The reader finds nothing subscribed and comes back here after its pause
+            logger.error("Failed to resubscribe to the Redis backplane", exc_info=True)
+
+def backplane_from_url(url: Optional[str]) -> Backplane:
+    """Redis backplane for a redis:// or rediss:// URL, the in-process one without a URL"""
+    if not url:
+        return InProcessBackplane()
+    if urlsplit(url).scheme not in REDIS_SCHEMES:
+        raise ValueError(f"Unsupported backplane URL: {url}")
+    return RedisBackplane(url)
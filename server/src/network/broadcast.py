@@ -0,0 +1,240 @@
+import asyncio
+import time
+from collections import deque
+from enum import Enum
+from typing import Any, Deque, Dict, Hashable, Iterable, List, Optional
+
+import websockets
+from websockets.asyncio.server import ServerConnection
+
+from src.log import get_logger
+from src.metrics import REGISTRY
+from src.models.codec import Codec, Frame, codec_for_subprotocol
+
+logger = get_logger(__name__)
+
+SEND_SECONDS = REGISTRY.histogram("risker_ws_send_seconds", "Time to write one frame to a socket")
+FRAMES_DROPPED = REGISTRY.counter("risker_ws_frames_dropped_total", "Outbound frames dropped by the slow consumer policy")
+FRAMES_COALESCED = REGISTRY.counter("risker_ws_frames_coalesced_total", "Outbound frames superseded by a newer frame")
+
+def codec_for(websocket: ServerConnection) -> Codec:
+    """Codec negotiated for a connection at handshake"""
+    return codec_for_subprotocol(getattr(websocket, "subprotocol", None))
+
+def coalesce_key(message: Dict[str, Any]) -> Optional[Hashable]:
+    """Key under which a newer message supersedes a queued older one, if any"""
+    if message.get("type") == "lobby" and message.get("action") == "update" and "lobby" in message:
+        return ("lobby", message["lobby"]["id"])
+    if message.get("type") == "game" and message.get("action") == "state":
+        # Each state is a delta against a tick the client already has, so the latest is enough
+        return ("game", message["lobby_id"])
+    return None
+
+class SlowConsumerPolicy(str, Enum):
+    """What to do when a connection's outbound queue is full"""
+    DROP_OLDEST = "drop_oldest"
+    DROP_NEWEST = "drop_newest"
+    DISCONNECT = "disconnect"
+
+class ConnectionWriter:
+    """Bounded outbound queue for one connection, drained by its own task.
+
+    Enqueueing never waits on the socket, so a slow peer only ever delays its
+    own frames. Frames queued with a coalesce key replace a pending frame with
+    the same key in place, so only the latest state update is sent. Once
+    ``max_queue`` frames are pending, ``policy`` decides whether to drop a
+    frame or disconnect the peer. Only frames queued as ``droppable``
+    (broadcasts) are ever dropped; direct replies such as the join response
+    carrying a resume token always go out, and a peer whose queue holds
+    nothing but replies is disconnected.
+    """
+
+    def __init__(
+        self,
+        websocket: ServerConnection,
+        max_queue: int = 256,
+        policy: SlowConsumerPolicy = SlowConsumerPolicy.DROP_OLDEST,
+    ):
+        self.websocket = websocket
+        self.codec = codec_for(websocket)
+        self.max_queue = max_queue
+        self.policy = policy
+        self.dropped = 0
+        self.coalesced = 0
+        # Entries are [key, frame, droppable] so a pending frame can be superseded in place
+        self._queue: Deque[List[Any]] = deque()
+        self._pending: Dict[Hashable, List[Any]] = {}
+        self._ready = asyncio.Event()
+        self._closed = False
+        self._task: Optional[asyncio.Task] = None
+        self._close_task: Optional[asyncio.Task] = None
+
+    @property
+    def depth(self) -> int:
+        """Number of frames waiting to be sent"""
+        return len(self._queue)
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    def enqueue(self, frame: Frame, key: Optional[Hashable] = None, droppable: bool = False) -> bool:
+        """Queue a frame for sending; returns False if it was not accepted"""
+        if self._closed:
+            return False
+        if key is not None:
+            entry = self._pending.get(key)
+            if entry is not None:
+                entry[1] = frame
+                self.coalesced += 1
+                if REGISTRY.enabled:
+                    FRAMES_COALESCED.inc()
+                return True
+        if len(self._queue) >= self.max_queue:
+            if self.policy == SlowConsumerPolicy.DISCONNECT:
+                self._disconnect()
+                return False
+            if droppable and self.policy == SlowConsumerPolicy.DROP_NEWEST:
+                self._count_dropped()
+                return False
+            if not self._drop_oldest():
+                # Nothing but replies is queued, so the peer is not reading them
+                self._disconnect()
+                return False
+        entry = [key, frame, droppable]
+        self._queue.append(entry)
+        if key is not None:
+            self._pending[key] = entry
+        self._ready.set()
+        return True
+
+    async def close(self) -> None:
+        """Stop the writer task, discarding anything still queued"""
+        self._closed = True
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def _pop(self) -> Frame:
+        key, frame, _ = self._queue.popleft()
+        if key is not None:
+            del self._pending[key]
+        return frame
+
+    def _drop_oldest(self) -> bool:
+        """Drop the oldest droppable frame; returns False if there is none"""
+        for index, (key, _, droppable) in enumerate(self._queue):
+            if droppable:
+                del self._queue[index]
+                if key is not None:
+                    del self._pending[key]
+                self._count_dropped()
+                return True
+        return False
+
+    def _count_dropped(self) -> None:
+        self.dropped += 1
+        if REGISTRY.enabled:
+            FRAMES_DROPPED.inc()
+
+    def _disconnect(self) -> None:
+        logger.warning("Disconnecting slow consumer", remote_address=self.websocket.remote_address)
+        self._closed = True
+        self._clear()
+        self._close_task = asyncio.create_task(self.websocket.close(code=1013, reason="Slow consumer"))
+
+    def _clear(self) -> None:
+        self._queue.clear()
+        self._pending.clear()
+
+    async def _run(self) -> None:
+        try:
+            while True:
+                await self._ready.wait()
+                self._ready.clear()
+                while self._queue:
+                    if not REGISTRY.enabled:
+                        await self.websocket.send(self._pop())
+                        continue
+                    start = time.perf_counter()
+                    await self.websocket.send(self._pop())
+                    SEND_SECONDS.observe(time.perf_counter() - start)
+        except websockets.exceptions.ConnectionClosed:
+            self._closed = True
+            self._clear()
+        except Exception:
+            # Without its writer the connection would stay open but never hear from us again
+            logger.error(
+                "Failed to send to connection", remote_address=self.websocket.remote_address, exc_info=True
+            )
+            self._closed = True
+            self._clear()
+            try:
+                await self.websocket.close(code=1011, reason="Internal error")
+            except Exception:
+                logger.debug("Failed to close connection", exc_info=True)
+
+class Broadcaster:
+    """Owns the per-connection writers and fans messages out to them"""
+
+    def __init__(
+        self,
+        max_queue: int = 256,
+        policy: SlowConsumerPolicy = SlowConsumerPolicy.DROP_OLDEST,
+    ):
+        self.max_queue = max_queue
+        self.policy = policy
+        self.writers: Dict[ServerConnection, ConnectionWriter] = {}
+
+    def queue_depths(self) -> List[int]:
+        return [writer.depth for writer in self.writers.values()]
+
+    def writer_for(self, websocket: ServerConnection) -> ConnectionWriter:
+        writer = self.writers.get(websocket)
+        if writer is None:
+            writer = ConnectionWriter(websocket, self.max_queue, self.policy)
+            writer.start()
+            self.writers[websocket] = writer
+        return writer
+
+    def send(self, websocket: ServerConnection, message: Dict[str, Any]) -> bool:
+        """Serialize and queue a reply for one connection; replies are never dropped or superseded"""
+        writer = self.writer_for(websocket)
+        return writer.enqueue(writer.codec.encode(message))
+
+    def send_frame(
+        self,
+        websocket: ServerConnection,
+        frame: Frame,
+        key: Optional[Hashable] = None,
+        droppable: bool = False,
+    ) -> bool:
+        """Queue an already serialized frame for one connection"""
+        return self.writer_for(websocket).enqueue(frame, key, droppable)
+
+    def broadcast(self, recipients: Iterable[ServerConnection], message: Dict[str, Any]) -> int:
+        """Serialize once per codec and queue the frame for every distinct recipient; returns the fan-out size"""
+        frames: Dict[str, Frame] = {}
+        key = coalesce_key(message)
+        sent = 0
+        for websocket in set(recipients):
+            writer = self.writer_for(websocket)
+            frame = frames.get(writer.codec.name)
+            if frame is None:
+                frame = frames[writer.codec.name] = writer.codec.encode(message)
+            if writer.enqueue(frame, key, droppable=True):
+                sent += 1
+        return sent
+
+    async def remove(self, websocket: ServerConnection) -> None:
+        writer = self.writers.pop(websocket, None)
+        if writer:
+            await writer.close()
+
+    async def close(self) -> None:
+        for websocket in list(self.writers):
+            await self.remove(websocket)
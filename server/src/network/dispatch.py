@@ -0,0 +1,100 @@
+import asyncio
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional, Set, Tuple
+
+Handler = Callable[..., Awaitable[Optional[dict]]]
+
+@dataclass(frozen=True, slots=True)
+class Route:
+    """A registered message handler and what the server needs to know about it"""
+    message_type: str
+    action: Optional[str]
+    handler: Handler
+    # Whether the handler reads or writes the database
+    touches_db: bool = False
+    # Whether repeating the message leaves state unchanged
+    idempotent: bool = False
+    # Name of the rate-limit bucket the message is charged to
+    rate_limit: str = "default"
+    # Whether the message is recorded in the command journal
+    journal: bool = True
+    # Whether the handler leaves game state untouched, so it may run alongside anything
+    read_only: bool = False
+
+class MessageRouter:
+    """Registry of handlers keyed by ``(type, action)``.
+
+    Handlers are registered with the ``route`` decorator and resolved with a
+    single dict lookup. Messages without an ``action`` (such as chat) are
+    registered with ``action=None``.
+    """
+
+    def __init__(self):
+        self._routes: Dict[Tuple[str, Optional[str]], Route] = {}
+        self._types: Set[str] = set()
+
+    def route(
+        self,
+        message_type: str,
+        action: Optional[str] = None,
+        *,
+        touches_db: bool = False,
+        idempotent: bool = False,
+        rate_limit: str = "default",
+        journal: bool = True,
+        read_only: bool = False,
+    ) -> Callable[[Handler], Handler]:
+        def register(handler: Handler) -> Handler:
+            key = (message_type, action)
+            if key in self._routes:
+                raise ValueError(f"Handler already registered for {message_type}:{action}")
+            self._routes[key] = Route(
+                message_type, action, handler, touches_db, idempotent, rate_limit, journal, read_only
+            )
+            self._types.add(message_type)
+            return handler
+        return register
+
+    def resolve(self, message_type: Any, action: Any) -> Optional[Route]:
+        # Both fields come straight from the client and may be any JSON value
+        if not isinstance(message_type, str) or not isinstance(action, (str, type(None))):
+            return None
+        return self._routes.get((message_type, action))
+
+    def knows_type(self, message_type: Any) -> bool:
+        return isinstance(message_type, str) and message_type in self._types
+
+    def routes(self) -> Tuple[Route, ...]:
+        return tuple(self._routes.values())
+
+class KeyedExecutor:
+    """Runs calls one at a time per key, in the order they arrive.
+
+    Calls under different keys, and calls with no key, run concurrently.
+    Locks exist only while a key has calls running or waiting, so idle
+    lobbies cost nothing.
+    """
+
+    def __init__(self):
+        # key -> [lock, calls running or waiting]
+        self._keys: Dict[Hashable, List[Any]] = {}
+
+    @property
+    def active_keys(self) -> int:
+        return len(self._keys)
+
+    async def run(self, key: Optional[Hashable], call: Callable[..., Awaitable[Any]], *args: Any) -> Any:
+        if key is None:
+            return await call(*args)
+        entry = self._keys.get(key)
+        if entry is None:
+            entry = self._keys[key] = [asyncio.Lock(), 0]
+        entry[1] += 1
+        try:
+            # asyncio.Lock wakes waiters first in, first out
+            async with entry[0]:
+                return await call(*args)
+        finally:
+            entry[1] -= 1
+            if not entry[1]:
+                del self._keys[key]
@@ -0,0 +1,187 @@
+import asyncio
+import time
+from dataclasses import dataclass, field
+from typing import Dict, Mapping, Optional, Tuple
+
+from src.log import get_logger
+from src.network.dispatch import Route
+
+logger = get_logger(__name__)
+
+@dataclass(frozen=True, slots=True)
+class RateLimit:
+    """Sustained rate in messages per second and the burst allowed on top of it"""
+    rate: float
+    burst: float
+
+# Per connection, by route rate_limit class or by "type:action"
+DEFAULT_ROUTE_LIMITS: Dict[str, RateLimit] = {
+    "default": RateLimit(10, 20),
+    "read": RateLimit(10, 20),
+    "write": RateLimit(2, 5),
+    "chat": RateLimit(5, 10),
+    "game": RateLimit(20, 40),
+}
+# Shared by every connection; protects the database from many clients at once
+DEFAULT_SHARED_LIMITS: Dict[str, RateLimit] = {
+    "write": RateLimit(200, 400),
+}
+
+@dataclass(frozen=True, slots=True)
+class RateLimits:
+    """Token bucket limits applied at ingress.
+
+    Route limits are looked up by ``"type:action"`` (``"type"`` for routes
+    without an action) first and then by the route's ``rate_limit`` class;
+    a route matching neither is only subject to the ``connection`` limit.
+    """
+    connection: RateLimit = RateLimit(50, 100)
+    routes: Mapping[str, RateLimit] = field(default_factory=lambda: dict(DEFAULT_ROUTE_LIMITS))
+    shared: Mapping[str, RateLimit] = field(default_factory=lambda: dict(DEFAULT_SHARED_LIMITS))
+
+class TokenBucket:
+    """Holds up to ``burst`` tokens, refilled at ``rate`` per second; each message takes one"""
+
+    __slots__ = ("rate", "burst", "tokens", "updated")
+
+    def __init__(self, limit: RateLimit):
+        self.rate = limit.rate
+        self.burst = limit.burst
+        self.tokens = limit.burst
+        self.updated = time.monotonic()
+
+    def ready(self, now: float) -> bool:
+        """Refill for the time passed and tell whether a token is available, without taking it"""
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        return self.tokens >= 1
+
+    def take(self, now: float) -> bool:
+        if not self.ready(now):
+            return False
+        self.tokens -= 1
+        return True
+
+    def retry_after(self) -> float:
+        """Seconds until the next token is available"""
+        return max(0.0, (1 - self.tokens) / self.rate) if self.rate > 0 else float("inf")
+
+def _route_keys(route: Route) -> Tuple[str, str]:
+    name = f"{route.message_type}:{route.action}" if route.action else route.message_type
+    return name, route.rate_limit
+
+class RateLimiter:
+    """Server-wide buckets, plus a factory for each connection's own"""
+
+    def __init__(self, limits: Optional[RateLimits] = None):
+        self.limits = limits or RateLimits()
+        self._shared = {key: TokenBucket(limit) for key, limit in self.limits.shared.items()}
+
+    def limit_key(self, route: Route, limits: Mapping[str, object]) -> Optional[str]:
+        for key in _route_keys(route):
+            if key in limits:
+                return key
+        return None
+
+    def shared_bucket(self, route: Route) -> Optional[TokenBucket]:
+        key = self.limit_key(route, self._shared)
+        return self._shared[key] if key else None
+
+    def for_connection(self) -> "ConnectionLimiter":
+        return ConnectionLimiter(self)
+
+class ConnectionLimiter:
+    """Buckets of one connection; route buckets are created when first used"""
+
+    __slots__ = ("limiter", "_connection", "_routes")
+
+    def __init__(self, limiter: RateLimiter):
+        self.limiter = limiter
+        self._connection = TokenBucket(limiter.limits.connection)
+        self._routes: Dict[str, TokenBucket] = {}
+
+    def check(self, route: Optional[Route]) -> Optional[float]:
+        """None if the message may proceed, otherwise the seconds to wait before retrying"""
+        now = time.monotonic()
+        buckets = [self._connection]
+        if route is not None:
+            key = self.limiter.limit_key(route, self.limiter.limits.routes)
+            if key is not None:
+                bucket = self._routes.get(key)
+                if bucket is None:
+                    bucket = self._routes[key] = TokenBucket(self.limiter.limits.routes[key])
+                buckets.append(bucket)
+            shared = self.limiter.shared_bucket(route)
+            if shared is not None:
+                buckets.append(shared)
+        # A message refused by one bucket takes no token from the others
+        for bucket in buckets:
+            if not bucket.ready(now):
+                return bucket.retry_after()
+        for bucket in buckets:
+            bucket.tokens -= 1
+        return None
+
+class AdmissionControl:
+    """Decides when the server is too busy to take on more work.
+
+    The server counts as overloaded while the event loop lags behind by more
+    than ``max_lag`` seconds or more than ``max_in_flight`` messages are being
+    handled. Lag is sampled every ``interval`` seconds by a background task
+    and decays slowly, so a single stall keeps the server shedding load for a
+    few samples instead of flapping. ``max_connections`` caps the connections
+    of the whole server and ``max_connections_per_host`` those from one
+    remote address.
+    """
+
+    def __init__(
+        self,
+        max_lag: float = 0.1,
+        max_in_flight: int = 2000,
+        max_connections: Optional[int] = None,
+        interval: float = 0.1,
+        max_connections_per_host: Optional[int] = None,
+    ):
+        self.max_lag = max_lag
+        self.max_in_flight = max_in_flight
+        self.max_connections = max_connections
+        self.max_connections_per_host = max_connections_per_host
+        self.interval = interval
+        self.lag = 0.0
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._measure_lag())
+
+    async def close(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    def overloaded(self, in_flight: int) -> bool:
+        return self.lag > self.max_lag or in_flight > self.max_in_flight
+
+    def admits(self, connections: int, in_flight: int, host_connections: int = 0) -> bool:
+        """Whether a new connection should be accepted, given those already open from its host"""
+        if self.max_connections is not None and connections >= self.max_connections:
+            return False
+        if self.max_connections_per_host is not None and host_connections >= self.max_connections_per_host:
+            return False
+        return not self.overloaded(in_flight)
+
+    async def _measure_lag(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            start = loop.time()
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, loop.time() - start - self.interval)
+            was_overloaded = self.lag > self.max_lag
+            self.lag = lag if lag > self.lag else (self.lag + lag) / 2
+            if (self.lag > self.max_lag) != was_overloaded:
+                logger.warning("Event loop lag", lag=round(self.lag, 3), overloaded=not was_overloaded)
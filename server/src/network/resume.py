@@ -0,0 +1,49 @@
+import base64
+import hashlib
+import hmac
+import secrets
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Optional
+from uuid import UUID
+
+class ResumeTokens:
+    """Signs and checks the tokens that let a player reattach to a new connection.
+
+    A token is an HMAC of the player and lobby IDs, so nothing is stored and
+    any process sharing ``secret`` can check it, including after a restart.
+    Without a secret a random one is used and tokens only work until the
+    process exits.
+    """
+
+    def __init__(self, secret: Optional[str] = None):
+        self._key = secret.encode() if secret else secrets.token_bytes(32)
+
+    def issue(self, player_id: UUID, lobby_id: UUID) -> str:
+        digest = hmac.new(self._key, f"{player_id}:{lobby_id}".encode(), hashlib.sha256).digest()
+        return base64.urlsafe_b64encode(digest[:24]).decode()
+
+    def verify(self, token: str, player_id: UUID, lobby_id: UUID) -> bool:
+        # compare_digest only takes ASCII str, and the token comes from the client;
+        # surrogatepass also encodes the lone surrogates a JSON string can carry
+        expected = self.issue(player_id, lobby_id).encode()
+        return hmac.compare_digest(token.encode("utf-8", "surrogatepass"), expected)
+
+class ReplayBuffer:
+    """Messages for a player whose connection dropped, kept until they resume or are evicted.
+
+    Holds at most ``size`` messages; older ones are dropped first and counted
+    so the client can tell it has to resynchronize.
+    """
+
+    __slots__ = ("messages", "dropped", "detached_at")
+
+    def __init__(self, size: int):
+        self.messages: Deque[Dict[str, Any]] = deque(maxlen=size)
+        self.dropped = 0
+        self.detached_at = time.monotonic()
+
+    def append(self, message: Dict[str, Any]) -> None:
+        if len(self.messages) == self.messages.maxlen:
+            self.dropped += 1
+        self.messages.append(message)
@@ -0,0 +1,227 @@
+import asyncio
+import dataclasses
+import itertools
+import multiprocessing
+import os
+import secrets
+import signal
+from typing import Any, Dict, List, Optional, Set
+from uuid import UUID
+
+import websockets
+from websockets.asyncio.server import ServerConnection
+
+from src.database.factory import database_from_url
+from src.database.retention import RetentionPolicy
+from src.game import EventLog
+from src.log import configure_logging, get_logger
+from src.models.codec import JSON, CodecError, subprotocols
+from src.network.backplane import backplane_from_url
+from src.network.broadcast import codec_for
+from src.network.limits import AdmissionControl
+from src.network.server import GameServer, select_subprotocol
+from src.network.shard import ClusterConfig, HashRing, Shard
+
+logger = get_logger(__name__)
+
+class SummaryHub:
+    """Relays lobby deltas between shard workers.
+
+    Keeps the latest summary of every lobby in the cluster so a worker that
+    (re)connects can be brought up to date with a single snapshot.
+    """
+
+    def __init__(self, host: str, port: int):
+        self.host = host
+        self.port = port
+        self.lobbies: Dict[str, Dict[str, Any]] = {}
+        self.workers: Set[ServerConnection] = set()
+        self.server = None
+
+    async def start(self) -> None:
+        self.server = await websockets.serve(self.handle_worker, self.host, self.port)
+
+    async def stop(self) -> None:
+        if self.server:
+            self.server.close()
+            await self.server.wait_closed()
+
+    async def handle_worker(self, websocket: ServerConnection) -> None:
+        self.workers.add(websocket)
+        try:
+            await websocket.send(JSON.encode({
+                "changes": [{"op": "upsert", "lobby": lobby} for lobby in self.lobbies.values()]
+            }))
+            async for frame in websocket:
+                changes = JSON.decode(frame)["changes"]
+                self.apply(changes)
+                websockets.broadcast(
+                    [worker for worker in self.workers if worker is not websocket],
+                    JSON.encode({"changes": changes})
+                )
+        except websockets.exceptions.ConnectionClosed:
+            pass
+        finally:
+            self.workers.discard(websocket)
+
+    def apply(self, changes: List[Dict[str, Any]]) -> None:
+        for change in changes:
+            if change["op"] == "upsert":
+                self.lobbies[change["lobby"]["id"]] = change["lobby"]
+            else:
+                self.lobbies.pop(change["lobby_id"], None)
+
+class ShardRouter:
+    """Front WebSocket endpoint that forwards each message to the shard owning its lobby.
+
+    Messages naming a ``lobby_id`` go to that lobby's owner; everything else,
+    including lobby creation and the cluster-wide lobby list, goes to the
+    connection's home shard, assigned round-robin. Upstream connections are
+    opened lazily, negotiate the client's subprotocol and are relayed frame
+    for frame, so only the routing fields of inbound messages are decoded.
+    """
+
+    def __init__(self, config: ClusterConfig, ring: HashRing):
+        self.config = config
+        self.ring = ring
+        self.server = None
+        self._home = itertools.cycle(range(ring.shards))
+
+    async def start(self) -> None:
+        self.server = await websockets.serve(
+            self.handle_client,
+            self.config.host,
+            self.config.port,
+            subprotocols=subprotocols(),
+            select_subprotocol=select_subprotocol
+        )
+        logger.info("Shard router started", host=self.config.host, port=self.config.port, shards=self.ring.shards)
+
+    async def stop(self) -> None:
+        if self.server:
+            self.server.close()
+            await self.server.wait_closed()
+
+    def shard_for(self, data: Dict[str, Any], home: int) -> int:
+        lobby_id = data.get("lobby_id")
+        if not isinstance(lobby_id, str):
+            return home
+        # Workers key lobbies by str(UUID), so any spelling of an ID must hash the same
+        try:
+            return self.ring.owner(UUID(lobby_id))
+        except ValueError:
+            # The home shard replies that the message is invalid
+            return home
+
+    async def handle_client(self, websocket: ServerConnection) -> None:
+        codec = codec_for(websocket)
+        home = next(self._home)
+        upstreams: Dict[int, Any] = {}
+        relays: List[asyncio.Task] = []
+        subprotocol = [websocket.subprotocol] if websocket.subprotocol else None
+        try:
+            async for frame in websocket:
+                try:
+                    shard = self.shard_for(codec.decode(frame), home)
+                except CodecError:
+                    # The home shard replies with the usual decode error
+                    shard = home
+                upstream = upstreams.get(shard)
+                if upstream is None:
+                    upstream = await websockets.connect(self.config.worker_uri(shard), subprotocols=subprotocol)
+                    upstreams[shard] = upstream
+                    relays.append(asyncio.create_task(self._relay(upstream, websocket, shard)))
+                await upstream.send(frame)
+        except websockets.exceptions.ConnectionClosed:
+            pass
+        except websockets.exceptions.InvalidStatus as e:
+            # The worker's admission control refused the upstream connection
+            logger.warning("Shard refused connection", status=e.response.status_code)
+            await websocket.close(1013, "Try again later")
+        except OSError as e:
+            logger.error("Shard unavailable", error=str(e))
+            await websocket.close(1011, "Shard unavailable")
+        finally:
+            for upstream in upstreams.values():
+                await upstream.close()
+            for relay in relays:
+                relay.cancel()
+
+    async def _relay(self, upstream, websocket: ServerConnection, shard: int) -> None:
+        try:
+            async for frame in upstream:
+                await websocket.send(frame)
+        except websockets.exceptions.ConnectionClosed:
+            pass
+        if upstream.close_code not in (None, 1000):
+            # The worker went away; let the client reconnect and be routed again
+            logger.warning("Shard connection lost", shard=shard, code=upstream.close_code)
+            await websocket.close(1012, "Shard restarting")
+
+def run_worker(
+    config: ClusterConfig,
+    shard_id: int,
+    log_profile: str,
+    log_level: Optional[str],
+    metrics_port: Optional[int],
+) -> None:
+    """Entry point of a shard worker process"""
+    configure_logging(log_profile, log_level)
+    shard = Shard(shard_id, HashRing(config.shards), config)
+    server = GameServer(
+        host=config.internal_host,
+        port=config.worker_port(shard_id),
+        metrics_port=metrics_port + shard_id if metrics_port else None,
+        shard=shard,
+        backplane=backplane_from_url(config.backplane_url),
+        db=database_from_url(config.database_url),
+        retention=RetentionPolicy(archive_dir=config.archive_dir),
+        event_log=EventLog(os.path.join(config.event_log_dir, f"shard-{shard_id}")),
+        resume_secret=config.resume_secret,
+        admission=AdmissionControl(max_connections=config.max_connections)
+    )
+    try:
+        asyncio.run(server.start())
+    except KeyboardInterrupt:
+        pass
+
+async def run_cluster(
+    config: ClusterConfig,
+    log_profile: str = "development",
+    log_level: Optional[str] = None,
+    metrics_port: Optional[int] = None,
+) -> None:
+    """Run the router and summary hub in this process and one worker process per shard"""
+    if config.resume_secret is None:
+        # Any worker must accept a token issued by another, e.g. after a lobby moves
+        config = dataclasses.replace(config, resume_secret=secrets.token_hex(32))
+    context = multiprocessing.get_context("spawn")
+    workers = [
+        context.Process(
+            target=run_worker,
+            args=(config, shard_id, log_profile, log_level, metrics_port),
+            name=f"risker-shard-{shard_id}",
+            daemon=True
+        )
+        for shard_id in range(config.shards)
+    ]
+    hub = SummaryHub(config.internal_host, config.internal_port)
+    router = ShardRouter(config, HashRing(config.shards))
+    await hub.start()
+    for worker in workers:
+        worker.start()
+    await router.start()
+    try:
+        await asyncio.Future()  # run forever
+    finally:
+        await router.stop()
+        await hub.stop()
+        # SIGINT lets each worker stop cleanly and flush its journal
+        for worker in workers:
+            if worker.is_alive():
+                os.kill(worker.pid, signal.SIGINT)
+        for worker in workers:
+            await asyncio.to_thread(worker.join, 10)
+            if worker.is_alive():
+                worker.terminate()
+        logger.info("Cluster stopped")
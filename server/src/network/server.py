@@ -1,26 +1,197 @@
 import asyncio
-import json
-import logging
-from typing import Dict, Optional
-from uuid import UUID
+import time
+from http import HTTPStatus
+from typing import Any, Dict, List, Optional, Sequence, Set
+from uuid import UUID, uuid4
 import websockets
+from pydantic import ValidationError
 from websockets.server import WebSocketServerProtocol
 
-from src.models import GameState, Player, PlayerRole, GameSession
+from src.models import (
+    GameState, Player, PlayerRole, GameSession,
+    CreateLobbyRequest, JoinLobbyRequest, LeaveLobbyRequest, ListLobbiesRequest, ChatRequest, ResumeRequest,
+    EnqueueRequest, CancelMatchmakingRequest, GameStartRequest, MoveOrderRequest, DeployRequest, AckRequest,
+)
+from src.models.codec import CodecError, subprotocols
+from src.game import Board, EventLog, LobbyCache, Match, Matchmaker, Simulation, Ticket, lobby_summary
+from src.network.backplane import Backplane, InProcessBackplane, lobby_channel
+from src.network.broadcast import Broadcaster, SlowConsumerPolicy, codec_for
+from src.network.dispatch import KeyedExecutor, MessageRouter, Route
+from src.network.limits import AdmissionControl, RateLimiter, RateLimits
+from src.network.resume import ReplayBuffer, ResumeTokens
+from src.network.shard import Shard, SummaryChannel
+from src.database.base import Database
 from src.database.sqlite import SQLiteDatabase
+from src.database.journal import CommandJournal
+from src.database.retention import Maintenance, RetentionPolicy
+from src.metrics import REGISTRY
+from src.metrics.http import MetricsServer
+from src.log import get_logger
 
-logging.basicConfig(level=logging.INFO)
-logger = logging.getLogger(__name__)
+logger = get_logger(__name__)
+
+routes = MessageRouter()
+
+HANDLER_SECONDS = REGISTRY.histogram(
+    "risker_handler_seconds", "Time spent handling a message", ("type", "action")
+)
+CONNECTIONS = REGISTRY.gauge("risker_connections", "Open WebSocket connections")
+PLAYER_CONNECTIONS = REGISTRY.gauge("risker_player_connections", "Players bound to a connection")
+QUEUE_DEPTH_TOTAL = REGISTRY.gauge("risker_outbound_queue_depth_total", "Frames queued across all connections")
+QUEUE_DEPTH_MAX = REGISTRY.gauge("risker_outbound_queue_depth_max", "Deepest per-connection outbound queue")
+JOURNAL_PENDING = REGISTRY.gauge("risker_journal_pending", "Commands waiting to be journaled")
+CHAT_FANOUT = REGISTRY.histogram(
+    "risker_chat_fanout", "Recipients per chat broadcast", buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024)
+)
+CHAT_BROADCAST_SECONDS = REGISTRY.histogram("risker_chat_broadcast_seconds", "Time to fan out one chat message")
+DETACHED_PLAYERS = REGISTRY.gauge("risker_detached_players", "Players whose connection dropped and who may still resume")
+RESUMES = REGISTRY.counter("risker_resumes_total", "Resume attempts", ("result",))
+EVICTIONS = REGISTRY.counter("risker_evicted_players_total", "Players removed after not resuming in time")
+IN_FLIGHT = REGISTRY.gauge("risker_messages_in_flight", "Messages read but not yet fully handled")
+STARTUP_SECONDS = REGISTRY.gauge(
+    "risker_startup_seconds", "Seconds from start() until the server was listening or had preloaded sessions", ("phase",)
+)
+SESSIONS_HYDRATED = REGISTRY.counter(
+    "risker_sessions_hydrated_total", "Sessions loaded from the database", ("source",)
+)
+RATE_LIMITED = REGISTRY.counter(
+    "risker_rate_limited_total", "Messages rejected by a rate limit", ("type", "action")
+)
+CONNECTIONS_REJECTED = REGISTRY.counter(
+    "risker_connections_rejected_total", "Connections refused by admission control"
+)
+STALE_LISTS = REGISTRY.counter(
+    "risker_overloaded_lobby_lists_total", "Lobby lists served from the last sorted copy while overloaded"
+)
+EVENT_LOOP_LAG = REGISTRY.gauge("risker_event_loop_lag_seconds", "Smoothed event loop lag seen by admission control")
+OVERLOADED = REGISTRY.gauge("risker_overloaded", "1 while the server sheds load")
+MATCHMAKING_QUEUE = REGISTRY.gauge("risker_matchmaking_queue", "Tickets waiting to be matched")
+OPEN_SESSIONS = REGISTRY.gauge("risker_matchmaking_open_sessions", "Sessions indexed with a free slot")
+MATCHMAKING_WAIT = REGISTRY.histogram(
+    "risker_matchmaking_wait_seconds", "Time from enqueue until a ticket was placed", ("role",)
+)
+MATCHMAKING_BATCH_SECONDS = REGISTRY.histogram("risker_matchmaking_batch_seconds", "Time to assign and write one batch")
+MATCHMAKING_TICKETS = REGISTRY.counter("risker_matchmaking_tickets_total", "Tickets by outcome", ("result",))
+
+# Lobbies worth having in memory before anyone asks for them
+PRELOAD_STATUSES = ("waiting", "in_progress")
+# Commanders needed before a game can start
+MIN_COMMANDERS = 2
+
+def select_subprotocol(connection, offered: Sequence[str]) -> Optional[str]:
+    """Pick the preferred codec the client offered; clients offering none fall back to JSON"""
+    for subprotocol in subprotocols():
+        if subprotocol in offered:
+            return subprotocol
+    return None
+
+def remote_host(connection) -> Any:
+    """Remote IP address of a connection, None if it has none (e.g. a Unix socket)"""
+    address = connection.remote_address
+    return address[0] if address else None
 
 class GameServer:
-    def __init__(self, host: str = "localhost", port: int = 8000):
+    def __init__(
+        self,
+        host: str = "localhost",
+        port: int = 8000,
+        outbound_queue_size: int = 256,
+        slow_consumer_policy: SlowConsumerPolicy = SlowConsumerPolicy.DROP_OLDEST,
+        metrics_port: Optional[int] = None,
+        metrics_host: str = "127.0.0.1",
+        shard: Optional[Shard] = None,
+        backplane: Optional[Backplane] = None,
+        db: Optional[Database] = None,
+        retention: Optional[RetentionPolicy] = None,
+        event_log: Optional[EventLog] = None,
+        resume_secret: Optional[str] = None,
+        resume_grace: float = 60.0,
+        replay_buffer_size: int = 256,
+        ping_interval: Optional[float] = 20.0,
+        ping_timeout: Optional[float] = 20.0,
+        max_in_flight: int = 32,
+        rate_limits: Optional[RateLimits] = None,
+        admission: Optional[AdmissionControl] = None,
+        matchmaker: Optional[Matchmaker] = None,
+        matchmaking_interval: float = 0.25,
+        tick_rate: float = 10.0,
+    ):
         self.host = host
         self.port = port
         self.game_state = GameState()
         self.connections: Dict[UUID, WebSocketServerProtocol] = {}
-        self.db = SQLiteDatabase()
+        # Players created, joined or resumed over each connection
+        self.bound_players: Dict[WebSocketServerProtocol, Set[UUID]] = {}
+        # Players in a lobby whose connection dropped; evicted after resume_grace seconds
+        self.detached: Dict[UUID, ReplayBuffer] = {}
+        self.resume_tokens = ResumeTokens(resume_secret)
+        self.resume_grace = resume_grace
+        self.replay_buffer_size = replay_buffer_size
+        # Keepalive pings close connections whose peer vanished without a close frame
+        self.ping_interval = ping_interval
+        self.ping_timeout = ping_timeout
+        self._reaper: Optional[asyncio.Task] = None
+        # Messages that change a lobby run one at a time per lobby; each connection
+        # reads ahead by at most max_in_flight messages
+        self.executor = KeyedExecutor()
+        self.max_in_flight = max_in_flight
+        self.in_flight = 0
+        # Each connection gets its own token buckets; some are shared server-wide
+        self.rate_limiter = RateLimiter(rate_limits or RateLimits())
+        # While overloaded new connections are refused and lobby lists may be stale
+        self.admission = admission or AdmissionControl()
+        self.broadcaster = Broadcaster(outbound_queue_size, slow_consumer_policy)
+        self.lobby_cache = LobbyCache()
+        # Sessions this process holds are indexed by free slots; queued players
+        # are placed in batches every matchmaking_interval seconds
+        self.matchmaker = matchmaker or Matchmaker()
+        self.matchmaking_interval = matchmaking_interval
+        self._matchmaking: Optional[asyncio.Task] = None
+        # Boards of games in progress, advanced at tick_rate; board state is not persisted
+        self.simulation = Simulation(tick_rate, on_tick=self.send_board_state)
+        self._game_tasks: Set[asyncio.Task] = set()
+        self.lobby_subscribers: Set[WebSocketServerProtocol] = set()
+        # Chat and lobby updates fan out through the backplane so members
+        # connected to other server processes receive them too
+        self.backplane = backplane or InProcessBackplane()
+        self.db = db or SQLiteDatabase()
+        self.journal = CommandJournal(self.db)
+        # Lobby events and snapshots that GameState is rebuilt from on restart
+        self.event_log = event_log or EventLog()
         self.server = None
         self._running = False
+        self._preload_task: Optional[asyncio.Task] = None
+        self.connection_count = 0
+        # Open connections by remote host, for the admission per-host cap
+        self.host_connections: Dict[Any, int] = {}
+        self.metrics_server = MetricsServer(REGISTRY, metrics_host, metrics_port) if metrics_port else None
+        # In sharded mode this worker owns only the lobbies hashed to it and
+        # learns about the rest of the cluster's lobbies from the summary hub
+        self.shard = shard
+        self.summary_channel = SummaryChannel(
+            shard.config.hub_uri, self.owned_lobby_snapshot, self.apply_remote_lobby_changes
+        ) if shard else None
+        self.maintenance = Maintenance(
+            self.db,
+            retention or RetentionPolicy(),
+            select_lobbies=self.expirable_lobbies,
+            on_lobbies_deleted=self.drop_lobbies,
+            # Commands and players are not partitioned, so the first shard looks after them
+            shared=shard is None or shard.id == 0,
+            # Deletions take their turn with the lobby's joins and other writes
+            run_for_lobby=self.executor.run
+        )
+        CONNECTIONS.set_function(lambda: self.connection_count)
+        PLAYER_CONNECTIONS.set_function(lambda: len(self.connections))
+        QUEUE_DEPTH_TOTAL.set_function(lambda: sum(self.broadcaster.queue_depths()))
+        QUEUE_DEPTH_MAX.set_function(lambda: max(self.broadcaster.queue_depths(), default=0))
+        JOURNAL_PENDING.set_function(lambda: self.journal.pending)
+        DETACHED_PLAYERS.set_function(lambda: len(self.detached))
+        IN_FLIGHT.set_function(lambda: self.in_flight)
+        EVENT_LOOP_LAG.set_function(lambda: self.admission.lag)
+        OVERLOADED.set_function(lambda: int(self.admission.overloaded(self.in_flight)))
+        MATCHMAKING_QUEUE.set_function(lambda: len(self.matchmaker.queue))
+        OPEN_SESSIONS.set_function(lambda: len(self.matchmaker.index))
         logger.info("GameServer initialized")
         
     async def start(self):
@@ -28,29 +199,54 @@ class GameServer:
             return
             
         self._running = True
+        started = time.monotonic()
+        if self.metrics_server:
+            REGISTRY.enabled = True
+            await self.metrics_server.start()
         # Initialize database connection
         try:
             await self.db.connect()
+            await self.journal.start()
+            await self.maintenance.start()
+            await self.backplane.start()
             logger.info("Database connection established")
-            
-            # Load existing sessions from database
-            db_sessions = await self.db.list_lobbies()
-            for session_data in db_sessions:
-                session = GameSession(
-                    id=UUID(session_data["id"]),
-                    name=session_data["name"],
-                    max_commanders=session_data["max_commanders"],
-                    max_pawns=session_data["max_pawns"]
-                )
-                self.game_state.sessions[session.id] = session
-                logger.info(f"Loaded existing session from database: {session.id}")
-                
-        except Exception as e:
-            logger.error(f"Failed to connect to database: {str(e)}", exc_info=True)
+            await self.event_log.open(self.game_state)
+            self.lobby_cache.rebuild(self.game_state)
+            # Recovered members have until the grace period ends to resume
+            for session in self.game_state.sessions.values():
+                self.detach_members(session)
+                self.matchmaker.update(session)
+        except Exception:
+            logger.error("Failed to connect to database", exc_info=True)
             raise
         try:
-            self.server = await websockets.serve(self.handle_connection, self.host, self.port)
-            logger.info(f"Game server started on ws://{self.host}:{self.port}")
+            self.server = await websockets.serve(
+                self.handle_connection,
+                self.host,
+                self.port,
+                subprotocols=subprotocols(),
+                select_subprotocol=select_subprotocol,
+                process_request=self.admit,
+                ping_interval=self.ping_interval,
+                ping_timeout=self.ping_timeout
+            )
+            self._reaper = asyncio.create_task(self.reap_detached())
+            self._matchmaking = asyncio.create_task(self.run_matchmaking())
+            await self.simulation.start()
+            await self.admission.start()
+            if self.summary_channel:
+                await self.summary_channel.start()
+            # Sessions load on first access; active lobbies are preloaded behind the listener
+            if REGISTRY.enabled:
+                STARTUP_SECONDS.set(time.monotonic() - started, "listening")
+            self._preload_task = asyncio.create_task(self.preload_sessions(started))
+            logger.info(
+                "Game server started",
+                host=self.host,
+                port=self.port,
+                shard=self.shard and self.shard.id,
+                startup_seconds=round(time.monotonic() - started, 3)
+            )
             await asyncio.Future()  # run forever
         finally:
             await self.stop()
@@ -60,11 +256,32 @@ class GameServer:
             return
             
         self._running = False
+        if self._preload_task:
+            self._preload_task.cancel()
+            self._preload_task = None
+        if self._reaper:
+            self._reaper.cancel()
+            self._reaper = None
+        if self._matchmaking:
+            self._matchmaking.cancel()
+            self._matchmaking = None
+        await self.simulation.close()
+        await self.admission.close()
         if self.server:
             self.server.close()
             await self.server.wait_closed()
+        if self.summary_channel:
+            await self.summary_channel.close()
+        await self.backplane.close()
+        await self.broadcaster.close()
+        await self.maintenance.close()
+        # Flush journaled commands before closing the database
+        await self.journal.close()
+        await self.event_log.close()
         # Clean up database connection
         await self.db.disconnect()
+        if self.metrics_server:
+            await self.metrics_server.stop()
         # Clear all connections
         self.connections.clear()
         logger.info("Server stopped")
@@ -74,204 +291,889 @@ class GameServer:
         await self.stop()
         await self.start()
         
+    async def preload_sessions(self, started: float, page_size: int = 500) -> None:
+        """Load the lobbies still in play in the background, one page and one member query at a time"""
+        loaded = 0
+        try:
+            for status in PRELOAD_STATUSES:
+                cursor = None
+                while True:
+                    rows = await self.db.list_lobbies(status=status, limit=page_size, cursor=cursor)
+                    if not rows:
+                        break
+                    cursor = rows[-1]["id"]
+                    sessions = await self.restore_sessions(rows)
+                    loaded += len(sessions)
+                    if REGISTRY.enabled:
+                        SESSIONS_HYDRATED.inc("preload", amount=len(sessions))
+                    await self.publish_lobby_changes([self.cache_lobby(session) for session in sessions])
+                    if len(rows) < page_size:
+                        break
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.error("Failed to preload sessions", exc_info=True)
+            return
+        if REGISTRY.enabled:
+            STARTUP_SECONDS.set(time.monotonic() - started, "preloaded")
+        logger.info("Preloaded sessions", count=loaded, seconds=round(time.monotonic() - started, 3))
+
+    async def restore_sessions(self, rows: List[Dict[str, Any]]) -> List[GameSession]:
+        """Hydrate the given lobby rows that are not in memory yet"""
+        rows = [row for row in rows if self.wants_session(UUID(row["id"]))]
+        if not rows:
+            return []
+        members = await self.db.get_lobbies_players([row["id"] for row in rows])
+        # A join may have loaded a lobby while the members were being fetched
+        sessions = [
+            self.game_state.restore_session(row, members.get(row["id"], []))
+            for row in rows if self.wants_session(UUID(row["id"]))
+        ]
+        for session in sessions:
+            self.detach_members(session)
+        return sessions
+
+    def wants_session(self, lobby_id: UUID) -> bool:
+        return lobby_id not in self.game_state.sessions and (self.shard is None or self.shard.owns(lobby_id))
+
+    async def get_session(self, lobby_id: UUID) -> Optional[GameSession]:
+        """Return a lobby's session, loading it from the database on first access"""
+        session = self.game_state.get_session(lobby_id)
+        if session or not self.wants_session(lobby_id):
+            return session
+        row = await self.db.get_lobby(str(lobby_id))
+        if row is None:
+            return self.game_state.get_session(lobby_id)
+        sessions = await self.restore_sessions([row])
+        if sessions:
+            if REGISTRY.enabled:
+                SESSIONS_HYDRATED.inc("lazy")
+            await self.publish_lobby_changes([self.cache_lobby(sessions[0])])
+        return self.game_state.get_session(lobby_id)
+
+    def expirable_lobbies(self, lobby_ids: List[str]) -> List[str]:
+        """Expired lobbies this process may delete: owned here, with no member connected and no join underway"""
+        selected = []
+        for lobby_id in lobby_ids:
+            if self.shard and not self.shard.owns(lobby_id):
+                continue
+            session = self.game_state.get_session(UUID(lobby_id))
+            if session and (
+                any(player_id in self.connections or player_id in self.detached for player_id in session.players)
+                or session.get_commander_count() + session.get_pawn_count() > len(session.players)
+            ):
+                continue
+            selected.append(lobby_id)
+        return selected
+
+    async def drop_lobbies(self, lobby_ids: List[str]) -> None:
+        """Forget lobbies deleted by retention and tell lobby list subscribers"""
+        deltas = []
+        for lobby_id in map(UUID, lobby_ids):
+            session = self.game_state.sessions.pop(lobby_id, None)
+            if session:
+                self.event_log.record("lobby_removed", lobby_id=str(lobby_id))
+                for player_id in session.players:
+                    self.game_state.players.pop(player_id, None)
+                    self.detached.pop(player_id, None)
+                await self.unwatch_lobby(session)
+            self.matchmaker.remove(lobby_id)
+            self.simulation.remove(lobby_id)
+            delta = self.lobby_cache.remove(lobby_id)
+            if delta:
+                deltas.append(delta)
+        await self.publish_lobby_changes(deltas)
+
+    def bind_player(self, websocket: WebSocketServerProtocol, player_id: UUID) -> None:
+        """Route a player's messages to this connection"""
+        self.connections[player_id] = websocket
+        self.bound_players.setdefault(websocket, set()).add(player_id)
+
+    def unbind_player(self, player_id: UUID) -> None:
+        websocket = self.connections.pop(player_id, None)
+        if websocket is not None and websocket in self.bound_players:
+            self.bound_players[websocket].discard(player_id)
+
+    def handle_disconnect(self, player_id: UUID, websocket: WebSocketServerProtocol) -> None:
+        """Keep a disconnected lobby member around for a while so they can resume"""
+        if self.connections.get(player_id) is not websocket:
+            return  # already resumed on another connection
+        del self.connections[player_id]
+        player = self.game_state.players.get(player_id)
+        if player is None or player.session_id is None:
+            self.game_state.players.pop(player_id, None)
+            return
+        self.forget_ack(player_id, player.session_id)
+        self.detached[player_id] = ReplayBuffer(self.replay_buffer_size)
+        logger.info("Player detached", player_id=player_id, lobby_id=player.session_id)
+
+    def detach_members(self, session: GameSession) -> None:
+        """Start the resume grace period for members loaded without a connection"""
+        for player_id in session.players:
+            if player_id not in self.connections and player_id not in self.detached:
+                self.detached[player_id] = ReplayBuffer(self.replay_buffer_size)
+
+    async def reap_detached(self) -> None:
+        """Evict detached players whose grace period has run out"""
+        while True:
+            await asyncio.sleep(min(5.0, self.resume_grace / 2))
+            deadline = time.monotonic() - self.resume_grace
+            for player_id, buffer in list(self.detached.items()):
+                if buffer.detached_at > deadline or self.detached.get(player_id) is not buffer:
+                    continue
+                player = self.game_state.players.get(player_id)
+                try:
+                    if player and player.session_id and await self.executor.run(
+                        str(player.session_id), self.remove_from_lobby, player_id, player.session_id
+                    ):
+                        if REGISTRY.enabled:
+                            EVICTIONS.inc()
+                        logger.info("Evicted detached player", player_id=player_id)
+                except Exception:
+                    logger.error("Failed to evict detached player", player_id=player_id, exc_info=True)
+                    continue
+                self.detached.pop(player_id, None)
+                self.game_state.players.pop(player_id, None)
+
+    def admit(self, connection, request):
+        """Refuse the handshake while overloaded, so players already connected keep their latency"""
+        host = remote_host(connection)
+        if self.admission.admits(self.connection_count, self.in_flight, self.host_connections.get(host, 0)):
+            return None
+        if REGISTRY.enabled:
+            CONNECTIONS_REJECTED.inc()
+        logger.warning(
+            "Refused connection", host=host, connections=self.connection_count, lag=round(self.admission.lag, 3)
+        )
+        return connection.respond(HTTPStatus.SERVICE_UNAVAILABLE, "Server overloaded, try again later\n")
+
     async def handle_connection(self, websocket: WebSocketServerProtocol):
         player_id = None
+        codec = codec_for(websocket)
+        self.connection_count += 1
+        host = remote_host(websocket)
+        self.host_connections[host] = self.host_connections.get(host, 0) + 1
+        bound = self.bound_players.setdefault(websocket, set())
+        # Frames keep being read while earlier messages are handled; once
+        # max_in_flight are pending, reading pauses and TCP pushes back
+        in_flight = asyncio.Semaphore(self.max_in_flight)
+        limiter = self.rate_limiter.for_connection()
+        tasks: Set[asyncio.Task] = set()
         try:
             async for message in websocket:
                 try:
-                    data = json.loads(message)
-                    logger.debug(f"Received message: {data}")
-                    
-                    # Store the WebSocket command if we have a player_id
-                    if player_id:
-                        try:
-                            await self.db.store_websocket_command(
-                                client_id=str(player_id),
-                                message_type=data.get("type", "unknown"),
-                                action=data.get("action", "unknown"),
-                                payload=data
-                            )
-                        except Exception as e:
-                            logger.error(f"Failed to store WebSocket command: {e}")
-                    
-                    response = await self.handle_message(data, websocket)
-                    if response:
-                        await websocket.send(json.dumps(response))
-                except json.JSONDecodeError as e:
-                    logger.error(f"Failed to parse message: {e}")
-                    await websocket.send(json.dumps({"type": "error", "message": "Invalid JSON"}))
-                except Exception as e:
-                    logger.error(f"Error handling message: {e}")
-                    await websocket.send(json.dumps({"type": "error", "message": "Internal server error"}))
+                    data = codec.decode(message)
+                except CodecError as e:
+                    logger.warning("Failed to parse message", codec=codec.name, error=str(e))
+                    self.broadcaster.send(websocket, {"type": "error", "message": f"Invalid {codec.label}"})
+                    continue
+                logger.debug("Received message", payload=data)
+
+                # Store the WebSocket command if a player is bound to this connection
+                route = routes.resolve(data.get("type"), data.get("action"))
+                # Rejected before journaling, so a flood never reaches the database
+                retry_after = limiter.check(route)
+                if retry_after is not None:
+                    if REGISTRY.enabled and route:
+                        RATE_LIMITED.inc(route.message_type, route.action or "")
+                    elif REGISTRY.enabled:
+                        RATE_LIMITED.inc("unknown", "")
+                    self.broadcaster.send(websocket, {
+                        "type": "error",
+                        "message": "Rate limit exceeded",
+                        "retry_after": round(retry_after, 3)
+                    })
+                    continue
+                player_id = next(iter(bound), None)
+                command_id = None
+                if player_id and route and route.journal:
+                    try:
+                        command_id = await self.journal.record(
+                            client_id=str(player_id),
+                            message_type=data.get("type", "unknown"),
+                            action=data.get("action", "unknown"),
+                            payload=message,
+                            codec=codec.name
+                        )
+                    except Exception as e:
+                        logger.error("Failed to journal WebSocket command", error=str(e))
+
+                await in_flight.acquire()
+                self.in_flight += 1
+                task = asyncio.create_task(self.process(route, data, websocket, in_flight, command_id))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
         except websockets.exceptions.ConnectionClosed:
-            logger.info(f"Connection closed for player {player_id}")
+            logger.info("Connection closed", player_id=player_id)
         except Exception as e:
-            logger.error(f"Connection error: {e}")
+            logger.error("Connection error", error=str(e))
+        finally:
+            # Let handlers already started finish, so their state changes are not cut in half
+            if tasks:
+                await asyncio.gather(*tasks, return_exceptions=True)
+            self.connection_count -= 1
+            self.host_connections[host] -= 1
+            if not self.host_connections[host]:
+                del self.host_connections[host]
+            self.lobby_subscribers.discard(websocket)
+            self.matchmaker.cancel_owner(websocket)
+            await self.broadcaster.remove(websocket)
+            for player_id in self.bound_players.pop(websocket, ()):
+                self.handle_disconnect(player_id, websocket)
+
+    def ordering_key(self, route: Optional[Route], data: dict, websocket: WebSocketServerProtocol) -> Any:
+        """Executor key a message is serialized under, or None if it can run at once"""
+        if route is None or route.read_only:
+            return None
+        lobby_id = data.get("lobby_id")
+        if isinstance(lobby_id, str):
+            # The key the reaper, retention and placement use, for any spelling pydantic accepts
+            try:
+                return str(UUID(lobby_id))
+            except ValueError:
+                pass
+        # Writes outside any lobby (create), and invalid lobby IDs, keep their order per connection
+        return websocket
+
+    async def process(
+        self,
+        route: Optional[Route],
+        data: dict,
+        websocket: WebSocketServerProtocol,
+        in_flight: asyncio.Semaphore,
+        command_id: Optional[str] = None,
+    ) -> None:
+        """Handle one message in its lobby's turn, queue the reply and mark its journaled command processed"""
+        try:
+            response = await self.executor.run(
+                self.ordering_key(route, data, websocket), self.dispatch, route, data, websocket
+            )
+            if response:
+                self.broadcaster.send(websocket, response)
+        except ValidationError as e:
+            logger.warning("Invalid message", errors=e.error_count())
+            self.broadcaster.send(websocket, {"type": "error", "message": "Invalid message"})
+        except Exception:
+            logger.error("Error handling message", exc_info=True)
+            self.broadcaster.send(websocket, {"type": "error", "message": "Internal server error"})
         finally:
-            if player_id:
-                self.handle_disconnect(player_id)
+            self.in_flight -= 1
+            in_flight.release()
+        # A command that failed has been answered too; running it again would not help
+        if command_id:
+            await self.journal.processed(command_id)
 
     async def handle_message(self, data: dict, websocket: WebSocketServerProtocol) -> Optional[dict]:
-        message_type = data.get("type")
-        
-        if message_type == "lobby":
-            return await self.handle_lobby(data, websocket)
-        elif message_type == "chat":
-            return await self.handle_chat(data)
-        else:
-            return {"type": "error", "message": "Unknown message type"}
+        return await self.dispatch(routes.resolve(data.get("type"), data.get("action")), data, websocket)
 
-    async def handle_lobby(self, data: dict, websocket: WebSocketServerProtocol) -> dict:
-        action = data.get("action")
-        logger.info(f"Handling lobby action: {action} with data: {data}")
-        
-        if action == "create":
-            try:
-                name = data.get("name")
-                max_commanders = data.get("maxCommanders", 2)
-                max_pawns = data.get("maxPawns", 4)
-                creator_name = data.get("creator_name", "Host")
-                
-                logger.info(f"Creating lobby with name: {name}, max_commanders: {max_commanders}, max_pawns: {max_pawns}")
-                
-                # Create session in database
-                db_session = await self.db.create_lobby(name, max_commanders, max_pawns)
-                logger.info(f"Database session created: {db_session}")
-                
-                session = GameSession(
-                    id=UUID(db_session["id"]),
-                    name=name,
-                    max_commanders=max_commanders,
-                    max_pawns=max_pawns
-                )
-                self.game_state.sessions[session.id] = session
-                logger.info(f"Game session created and added to state: {session.id}")
+    async def dispatch(self, route: Optional[Route], data: dict, websocket: WebSocketServerProtocol) -> Optional[dict]:
+        if route is None:
+            message_type = data.get("type")
+            if routes.knows_type(message_type):
+                return {"type": "error", "message": f"Unknown {message_type} action"}
+            return {"type": "error", "message": "Unknown message type"}
+        if not REGISTRY.enabled:
+            return await route.handler(self, data, websocket)
+        start = time.perf_counter()
+        try:
+            return await route.handler(self, data, websocket)
+        finally:
+            HANDLER_SECONDS.observe(time.perf_counter() - start, route.message_type, route.action or "")
 
-                # Create and join creator as commander
-                db_player = await self.db.create_player(creator_name, PlayerRole.COMMANDER.value)
-                player = Player(id=UUID(db_player["id"]), name=creator_name, role=PlayerRole.COMMANDER)
-                self.game_state.players[player.id] = player
-                self.connections[player.id] = websocket
-                
-                if self.game_state.join_session(player.id, session.id):
-                    await self.db.add_player_to_lobby(str(player.id), str(session.id))
-                    logger.info(f"Creator joined as commander: {player.id}")
-                else:
-                    logger.error(f"Failed to join creator as commander: {player.id}")
-                    return {"type": "error", "message": "Failed to join as commander"}
-                
-                return {
-                    "type": "lobby",
-                    "action": "update",
-                    "lobby": {
-                        "id": str(session.id),
-                        "name": session.name,
-                        "commanders": [str(p.id) for p in session.players.values() if p.role == PlayerRole.COMMANDER],
-                        "pawns": [str(p.id) for p in session.players.values() if p.role == PlayerRole.PAWN],
-                        "maxCommanders": session.max_commanders,
-                        "maxPawns": session.max_pawns,
-                        "status": "waiting",
-                        "created_at": session.created_at
-                    }
-                }
-            except Exception as e:
-                logger.error(f"Error creating lobby: {str(e)}", exc_info=True)
-                return {"type": "error", "message": f"Failed to create lobby: {str(e)}"}
+    @routes.route("lobby", "create", touches_db=True, rate_limit="write")
+    async def handle_lobby_create(self, data: dict, websocket: WebSocketServerProtocol) -> dict:
+        logger.debug("Handling lobby action", action="create", payload=data)
+        try:
+            request = CreateLobbyRequest.model_validate(data)
+            name = request.name
+            max_commanders = request.max_commanders
+            max_pawns = request.max_pawns
+            creator_name = request.creator_name
             
-        elif action == "join":
-            lobby_id = UUID(data.get("lobby_id"))
-            role = PlayerRole(data.get("role"))
-            name = data.get("name")
+            # The lobby, its creator and the membership are written in one atomic commit;
+            # a shard only creates lobbies it owns
+            lobby_id = str(self.shard.ring.new_id(self.shard.id)) if self.shard else None
+            async with self.db.transaction():
+                db_session = await self.db.create_lobby(name, max_commanders, max_pawns, lobby_id=lobby_id)
+                db_player = await self.db.create_player(creator_name, PlayerRole.COMMANDER.value)
+                await self.db.add_player_to_lobby(db_player["id"], db_session["id"])
             
-            logger.info(f"Attempting to join lobby - lobby_id: {lobby_id}, role: {role}, name: {name}")
+            session = GameSession(
+                id=UUID(db_session["id"]),
+                name=name,
+                max_commanders=max_commanders,
+                max_pawns=max_pawns,
+                created_at=db_session["created_at"]
+            )
+            self.game_state.sessions[session.id] = session
+            logger.info(
+                "Lobby created",
+                lobby_id=session.id,
+                max_commanders=max_commanders,
+                max_pawns=max_pawns
+            )
+
+            # Join creator as commander
+            player = Player(id=UUID(db_player["id"]), name=creator_name, role=PlayerRole.COMMANDER)
+            self.game_state.players[player.id] = player
+            self.bind_player(websocket, player.id)
             
-            # Create player in database
-            try:
-                db_player = await self.db.create_player(name, role.value)
-                logger.info(f"Player created in database: {db_player}")
-                player = Player(id=UUID(db_player["id"]), name=name, role=role)
-            except Exception as e:
-                logger.error(f"Failed to create player in database: {str(e)}", exc_info=True)
-                return {"type": "error", "message": f"Failed to create player: {str(e)}"}
+            if self.game_state.join_session(player.id, session.id):
+                self.event_log.record("lobby_created", lobby=session.record())
+                await self.event_log.record("player_joined", lobby_id=str(session.id), player=player.record())
+                await self.watch_lobby(session.id)
+                logger.debug("Creator joined as commander", player_id=player.id, lobby_id=session.id)
+            else:
+                logger.error("Failed to join creator as commander", player_id=player.id, lobby_id=session.id)
+                return {"type": "error", "message": "Failed to join as commander"}
             
-            # Add player to game state
+            delta = self.cache_lobby(session)
+            await self.publish_lobby_changes([delta])
+            return {
+                "type": "lobby",
+                "action": "update",
+                "lobby": delta["lobby"],
+                "player_id": str(player.id),
+                "resume_token": self.resume_tokens.issue(player.id, session.id)
+            }
+        except Exception as e:
+            logger.error("Error creating lobby", exc_info=True)
+            return {"type": "error", "message": f"Failed to create lobby: {str(e)}"}
+
+    @routes.route("lobby", "join", touches_db=True, rate_limit="write")
+    async def handle_lobby_join(self, data: dict, websocket: WebSocketServerProtocol) -> dict:
+        logger.debug("Handling lobby action", action="join", payload=data)
+        request = JoinLobbyRequest.model_validate(data)
+        lobby_id = request.lobby_id
+        role = request.role
+        name = request.name
+        
+        if not await self.get_session(lobby_id):
+            return {"type": "error", "message": "Lobby not found"}
+        # Reserve the slot in memory first so a full lobby costs no database writes
+        player = Player(name=name, role=role)
+        self.game_state.players[player.id] = player
+        self.bind_player(websocket, player.id)
+        
+        if self.game_state.join_session(player.id, lobby_id):
             try:
-                self.game_state.players[player.id] = player
-                self.connections[player.id] = websocket
-                logger.info(f"Player added to game state and connections: {player.id}")
-            except Exception as e:
-                logger.error(f"Failed to add player to game state: {str(e)}", exc_info=True)
-                return {"type": "error", "message": f"Failed to add player to game state: {str(e)}"}
-            
-            if self.game_state.join_session(player.id, lobby_id):
-                try:
-                    # Add player to lobby in database - convert UUIDs to strings
+                # The player and the membership are written in one atomic commit
+                async with self.db.transaction():
+                    await self.db.create_player(name, role.value, player_id=str(player.id))
                     await self.db.add_player_to_lobby(str(player.id), str(lobby_id))
-                    logger.info(f"Player added to lobby in database: {player.id} -> {lobby_id}")
-                    session = self.game_state.get_session(lobby_id)
-                    if not session:
-                        logger.error(f"Session not found after join: {lobby_id}")
-                        return {"type": "error", "message": "Session not found after join"}
-                        
-                    return {
-                        "type": "lobby",
-                        "action": "update",
-                        "lobby": {
-                            "id": str(session.id),
-                            "name": session.name,
-                            "commanders": [str(p.id) for p in session.players.values() if p.role == PlayerRole.COMMANDER],
-                            "pawns": [str(p.id) for p in session.players.values() if p.role == PlayerRole.PAWN],
-                            "maxCommanders": session.max_commanders,
-                            "maxPawns": session.max_pawns,
-                            "status": "waiting",
-                            "created_at": session.created_at
-                        }
-                    }
-                except Exception as e:
-                    logger.error(f"Failed to add player to lobby in database: {str(e)}", exc_info=True)
-                    return {"type": "error", "message": f"Failed to add player to lobby: {str(e)}"}
-            else:
-                logger.error(f"Failed to join session in game state: {player.id} -> {lobby_id}")
-            return {"type": "error", "message": "Failed to join lobby"}
-            
-        elif action == "leave":
-            lobby_id = UUID(data.get("lobby_id"))
-            player_id = UUID(data.get("player_id"))
-            if player_id:
-                # Remove player from lobby in database - convert UUIDs to strings
-                await self.db.remove_player_from_lobby(str(player_id), str(lobby_id))
-                if self.game_state.leave_session(player_id):
-                    return {"type": "lobby", "action": "update", "lobby_id": str(lobby_id)}
-            return {"type": "error", "message": "Failed to leave lobby"}
-            
-        elif action == "list":
-            # Get lobbies from database
-            db_lobbies = await self.db.list_lobbies()
+            except Exception as e:
+                logger.error("Failed to add player to lobby in database", exc_info=True)
+                self.game_state.leave_session(player.id)
+                self.game_state.players.pop(player.id, None)
+                self.unbind_player(player.id)
+                return {"type": "error", "message": f"Failed to add player to lobby: {str(e)}"}
+            await self.event_log.record("player_joined", lobby_id=str(lobby_id), player=player.record())
+            session = self.game_state.get_session(lobby_id)
+            await self.watch_lobby(lobby_id)
+            delta = self.cache_lobby(session)
+            await self.publish_lobby_changes([delta])
+            self.broadcast_lobby_update(session, delta["lobby"], exclude=(player.id,))
+            return {
+                "type": "lobby",
+                "action": "update",
+                "lobby": delta["lobby"],
+                "player_id": str(player.id),
+                "resume_token": self.resume_tokens.issue(player.id, lobby_id)
+            }
+        logger.warning("Failed to join session in game state", player_id=player.id, lobby_id=lobby_id)
+        self.game_state.players.pop(player.id, None)
+        self.unbind_player(player.id)
+        return {"type": "error", "message": "Failed to join lobby"}
+
+    @routes.route("lobby", "leave", touches_db=True, idempotent=True, rate_limit="write")
+    async def handle_lobby_leave(self, data: dict, websocket: WebSocketServerProtocol) -> dict:
+        logger.debug("Handling lobby action", action="leave", payload=data)
+        request = LeaveLobbyRequest.model_validate(data)
+        lobby_id = request.lobby_id
+        player_id = request.player_id
+        # Only the connection a player is bound to may take them out
+        if player_id not in self.bound_players.get(websocket, ()):
+            return {"type": "error", "message": "Player not bound to this connection"}
+        if await self.remove_from_lobby(player_id, lobby_id):
+            return {"type": "lobby", "action": "update", "lobby_id": str(lobby_id)}
+        return {"type": "error", "message": "Failed to leave lobby"}
+
+    async def remove_from_lobby(self, player_id: UUID, lobby_id: UUID) -> bool:
+        """Take a player out of a lobby and forget them; the remaining members are told"""
+        # Load the lobby before the database row goes, so the player is found in it
+        await self.get_session(lobby_id)
+        await self.db.remove_player_from_lobby(str(player_id), str(lobby_id))
+        if not self.game_state.leave_session(player_id):
+            return False
+        await self.event_log.record("player_left", lobby_id=str(lobby_id), player_id=str(player_id))
+        self.game_state.players.pop(player_id, None)
+        self.detached.pop(player_id, None)
+        self.unbind_player(player_id)
+        session = self.game_state.get_session(lobby_id)
+        if session:
+            if not session.players:
+                self.simulation.remove(session.id)
+            delta = self.cache_lobby(session)
+            await self.publish_lobby_changes([delta])
+            self.broadcast_lobby_update(session, delta["lobby"], exclude=(player_id,))
+            await self.unwatch_lobby(session)
+        return True
+
+    @routes.route("lobby", "resume", idempotent=True, rate_limit="write")
+    async def handle_lobby_resume(self, data: dict, websocket: WebSocketServerProtocol) -> Optional[dict]:
+        """Reattach an existing player to this connection and replay what they missed"""
+        request = ResumeRequest.model_validate(data)
+        player_id = request.player_id
+        lobby_id = request.lobby_id
+        if not self.resume_tokens.verify(request.token, player_id, lobby_id):
+            if REGISTRY.enabled:
+                RESUMES.inc("invalid")
+            return {"type": "error", "message": "Invalid resume token"}
+        session = await self.get_session(lobby_id)
+        if not session or player_id not in session.players:
+            if REGISTRY.enabled:
+                RESUMES.inc("expired")
+            return {"type": "error", "message": "Session expired"}
+        # A client that resumes while its old socket still looks open has moved to this one
+        self.unbind_player(player_id)
+        self.bind_player(websocket, player_id)
+        self.forget_ack(player_id, lobby_id)
+        buffer = self.detached.pop(player_id, None)
+        await self.watch_lobby(lobby_id)
+        if REGISTRY.enabled:
+            RESUMES.inc("ok")
+        logger.info("Player resumed", player_id=player_id, lobby_id=lobby_id)
+        self.broadcaster.send(websocket, {
+            "type": "lobby",
+            "action": "resume",
+            "lobby": lobby_summary(session),
+            "player_id": str(player_id),
+            "missed": len(buffer.messages) if buffer else 0,
+            "dropped": buffer.dropped if buffer else 0
+        })
+        if buffer:
+            for message in buffer.messages:
+                self.broadcaster.send(websocket, message)
+        return None
+
+    @routes.route("lobby", "list", idempotent=True, rate_limit="read", journal=False, read_only=True)
+    async def handle_lobby_list(self, data: dict, websocket: WebSocketServerProtocol) -> dict:
+        # Served from the in-memory cache; clients passing "since" get only the deltas
+        request = ListLobbiesRequest.model_validate(data)
+        if request.since is not None:
+            return self.lobby_changes_response(request.since)
+        # While overloaded the last sorted list is reused; its version lets the
+        # client catch up on what it missed with "since" later
+        stale = self.admission.overloaded(self.in_flight)
+        lobbies = self.lobby_cache.lobbies(
+            status=request.status,
+            limit=request.limit,
+            cursor=request.cursor,
+            stale=stale
+        )
+        if stale and REGISTRY.enabled:
+            STALE_LISTS.inc()
+        return {
+            "type": "lobby",
+            "action": "list",
+            "version": self.lobby_cache.ordered_version,
+            "lobbies": lobbies
+        }
+
+    @routes.route("lobby", "subscribe", idempotent=True, rate_limit="read", journal=False, read_only=True)
+    async def handle_lobby_subscribe(self, data: dict, websocket: WebSocketServerProtocol) -> dict:
+        request = ListLobbiesRequest.model_validate(data)
+        self.lobby_subscribers.add(websocket)
+        return self.lobby_changes_response(request.since)
+
+    @routes.route("lobby", "unsubscribe", idempotent=True, rate_limit="read", journal=False, read_only=True)
+    async def handle_lobby_unsubscribe(self, data: dict, websocket: WebSocketServerProtocol) -> dict:
+        self.lobby_subscribers.discard(websocket)
+        return {"type": "lobby", "action": "unsubscribe", "status": "ok"}
+
+    def cache_lobby(self, session: GameSession) -> Dict[str, Any]:
+        """Refresh a changed lobby in the list cache and the matchmaking index and return its delta"""
+        self.matchmaker.update(session)
+        return self.lobby_cache.update(session)
+
+    def lobby_changes_response(self, since: Optional[int]) -> dict:
+        """Deltas since a client's last known version, or the full list if they have expired"""
+        changes = self.lobby_cache.changes_since(since) if since is not None else None
+        if changes is None:
             return {
                 "type": "lobby",
                 "action": "list",
-                "lobbies": db_lobbies
+                "version": self.lobby_cache.version,
+                "lobbies": self.lobby_cache.lobbies()
             }
-            
-        return {"type": "error", "message": "Unknown lobby action"}
+        return {
+            "type": "lobby",
+            "action": "delta",
+            "version": self.lobby_cache.version,
+            "changes": changes
+        }
+
+    async def publish_lobby_changes(self, changes: List[Dict[str, Any]]) -> None:
+        """Push lobby deltas to every subscribed connection and, when sharded, to the other shards"""
+        if self.summary_channel:
+            await self.summary_channel.publish(changes)
+        self.notify_lobby_subscribers(changes)
+
+    def owned_lobby_snapshot(self) -> List[Dict[str, Any]]:
+        """Upserts for every lobby this shard owns, sent to the summary hub on connect"""
+        return [{"op": "upsert", "lobby": lobby_summary(session)} for session in self.game_state.sessions.values()]
+
+    def apply_remote_lobby_changes(self, changes: List[Dict[str, Any]]) -> None:
+        """Merge lobby deltas from other shards into the cache and pass them on to subscribers"""
+        deltas = []
+        for change in changes:
+            if change["op"] == "upsert":
+                if self.shard.owns(change["lobby"]["id"]):
+                    # The hub's copy of our own lobbies may be stale
+                    continue
+                deltas.append(self.lobby_cache.put(change["lobby"]))
+            else:
+                delta = self.lobby_cache.remove(UUID(change["lobby_id"]))
+                if delta:
+                    deltas.append(delta)
+        self.notify_lobby_subscribers(deltas)
+
+    def notify_lobby_subscribers(self, changes: List[Dict[str, Any]]) -> None:
+        if not self.lobby_subscribers or not changes:
+            return
+        self.broadcaster.broadcast(self.lobby_subscribers, {
+            "type": "lobby",
+            "action": "delta",
+            "version": self.lobby_cache.version,
+            "changes": changes
+        })
+
+    def broadcast_lobby_update(
+        self,
+        session: GameSession,
+        lobby: Dict[str, Any],
+        exclude: Sequence[UUID] = (),
+    ) -> None:
+        """Send the current lobby state to its members; queued older updates are superseded"""
+        self.backplane.publish(lobby_channel(session.id), {
+            "message": {"type": "lobby", "action": "update", "lobby": lobby},
+            "exclude": [str(player_id) for player_id in exclude]
+        })
+
+    async def watch_lobby(self, lobby_id: UUID) -> None:
+        """Receive a lobby's backplane messages while it has members connected here"""
+        await self.backplane.subscribe(lobby_channel(lobby_id), self.deliver_lobby_message)
+
+    async def unwatch_lobby(self, session: GameSession) -> None:
+        if not any(player_id in self.connections or player_id in self.detached for player_id in session.players):
+            await self.backplane.unsubscribe(lobby_channel(session.id), self.deliver_lobby_message)
+
+    def deliver_lobby_message(self, channel: str, envelope: Dict[str, Any]) -> None:
+        """Fan a backplane message out to the lobby members connected to this process"""
+        session = self.game_state.get_session(UUID(channel.split(":", 1)[1]))
+        if not session:
+            return
+        message = envelope["message"]
+        exclude = envelope["exclude"]
+        start = time.perf_counter() if REGISTRY.enabled else 0.0
+        recipients = []
+        for player_id in session.players:
+            if str(player_id) in exclude:
+                continue
+            websocket = self.connections.get(player_id)
+            if websocket is not None:
+                recipients.append(websocket)
+            elif player_id in self.detached:
+                self.detached[player_id].append(message)
+        fanout = self.broadcaster.broadcast(recipients, message)
+        if REGISTRY.enabled and message["type"] == "chat":
+            CHAT_BROADCAST_SECONDS.observe(time.perf_counter() - start)
+            CHAT_FANOUT.observe(fanout)
+
+    @routes.route("matchmaking", "enqueue", rate_limit="write")
+    async def handle_matchmaking_enqueue(self, data: dict, websocket: WebSocketServerProtocol) -> dict:
+        """Queue the player for the next matchmaking pass; a matched message follows once they are placed"""
+        request = EnqueueRequest.model_validate(data)
+        ticket = self.matchmaker.enqueue(request.name, request.role, request.skill, owner=websocket)
+        return {
+            "type": "matchmaking",
+            "action": "queued",
+            "ticket_id": str(ticket.id),
+            "queued": len(self.matchmaker.queue)
+        }
+
+    @routes.route("matchmaking", "cancel", idempotent=True, rate_limit="write")
+    async def handle_matchmaking_cancel(self, data: dict, websocket: WebSocketServerProtocol) -> dict:
+        request = CancelMatchmakingRequest.model_validate(data)
+        ticket = self.matchmaker.queue.get(request.ticket_id)
+        if ticket is None or ticket.owner is not websocket:
+            return {"type": "error", "message": "Ticket not queued"}
+        self.matchmaker.cancel(ticket.id)
+        if REGISTRY.enabled:
+            MATCHMAKING_TICKETS.inc("cancelled")
+        return {"type": "matchmaking", "action": "cancelled", "ticket_id": str(ticket.id)}
+
+    async def run_matchmaking(self) -> None:
+        """Assign queued tickets in batches and write each lobby's matches in its turn"""
+        while True:
+            await asyncio.sleep(self.matchmaking_interval)
+            if not self.matchmaker.queue:
+                continue
+            start = time.perf_counter()
+            try:
+                matches, expired = self.matchmaker.assign(self.game_state, self.new_match_session)
+            except Exception:
+                logger.error("Matchmaking pass failed", exc_info=True)
+                continue
+            for ticket in expired:
+                if REGISTRY.enabled:
+                    MATCHMAKING_TICKETS.inc("expired")
+                self.notify_ticket(ticket, {
+                    "type": "matchmaking",
+                    "action": "expired",
+                    "ticket_id": str(ticket.id)
+                })
+            # Lobbies are written concurrently, each under its own ordering key
+            await asyncio.gather(*(
+                self.executor.run(str(match.session.id), self.place_match, match) for match in matches
+            ), return_exceptions=True)
+            if REGISTRY.enabled:
+                MATCHMAKING_BATCH_SECONDS.observe(time.perf_counter() - start)
+            logger.debug("Matchmaking pass", matches=len(matches), expired=len(expired))
+
+    def notify_ticket(self, ticket: Ticket, message: Dict[str, Any]) -> None:
+        # The connection may have closed since the ticket was queued
+        if ticket.owner in self.broadcaster.writers:
+            self.broadcaster.send(ticket.owner, message)
+
+    def new_match_session(self, ticket: Ticket) -> GameSession:
+        """Lobby opened for a commander no existing lobby had room for; a shard only opens lobbies it owns"""
+        lobby_id = self.shard.ring.new_id(self.shard.id) if self.shard else uuid4()
+        return GameSession(id=lobby_id, name=f"{ticket.name}'s game")
+
+    async def place_match(self, match: Match) -> None:
+        """Write the players of one match, then tell them and the lobby's other members"""
+        session = match.session
+        # The game may have started, or the lobby expired, since the batch was assigned;
+        # the tickets then wait for the next pass
+        if not match.created and (
+            session.status != "waiting" or self.game_state.get_session(session.id) is not session
+        ):
+            self.matchmaker.release(match, requeue=True)
+            logger.debug("Lobby left waiting before its matches were placed", lobby_id=session.id)
+            return
+        players = [Player(id=ticket.id, name=ticket.name, role=ticket.role) for ticket in match.tickets]
+        try:
+            # The lobby, if new, the players and the memberships are written in one atomic commit
+            async with self.db.transaction():
+                if match.created:
+                    row = await self.db.create_lobby(
+                        session.name, session.max_commanders, session.max_pawns, lobby_id=str(session.id)
+                    )
+                    session.created_at = row["created_at"]
+                await self.db.create_players(
+                    [(str(player.id), player.name, player.role.value) for player in players]
+                )
+                await self.db.add_players_to_lobby([str(player.id) for player in players], str(session.id))
+        except Exception:
+            logger.error("Failed to write matches", lobby_id=session.id, count=len(players), exc_info=True)
+            self.matchmaker.release(match)
+            for ticket in match.tickets:
+                if REGISTRY.enabled:
+                    MATCHMAKING_TICKETS.inc("failed")
+                self.notify_ticket(ticket, {
+                    "type": "error",
+                    "message": "Matchmaking failed",
+                    "ticket_id": str(ticket.id)
+                })
+            return
+
+        self.matchmaker.placed(match)
+        if match.created:
+            self.game_state.sessions[session.id] = session
+            self.event_log.record("lobby_created", lobby=session.record())
+        recorded = None
+        for player, ticket in zip(players, match.tickets, strict=True):
+            self.game_state.players[player.id] = player
+            player.session_id = session.id
+            session.add_player(player, reserved=True)
+            recorded = self.event_log.record("player_joined", lobby_id=str(session.id), player=player.record())
+            if ticket.owner in self.bound_players:
+                self.bind_player(ticket.owner, player.id)
+        await recorded
+        # Players whose connection closed while they were being placed may still resume
+        self.detach_members(session)
+        await self.watch_lobby(session.id)
+        delta = self.cache_lobby(session)
+        await self.publish_lobby_changes([delta])
+        self.broadcast_lobby_update(session, delta["lobby"], exclude=[player.id for player in players])
+        now = time.monotonic()
+        for player, ticket in zip(players, match.tickets, strict=True):
+            if REGISTRY.enabled:
+                MATCHMAKING_TICKETS.inc("matched")
+                MATCHMAKING_WAIT.observe(now - ticket.enqueued_at, ticket.role.value)
+            self.notify_ticket(ticket, {
+                "type": "matchmaking",
+                "action": "matched",
+                "ticket_id": str(ticket.id),
+                "lobby": delta["lobby"],
+                "player_id": str(player.id),
+                "resume_token": self.resume_tokens.issue(player.id, session.id)
+            })
+
+    def commander_in(self, session: GameSession, player_id: UUID, websocket: WebSocketServerProtocol) -> bool:
+        """Whether a player bound to this connection commands in the session"""
+        return (
+            player_id in self.bound_players.get(websocket, ())
+            and player_id in session.get_members(PlayerRole.COMMANDER)
+        )
+
+    @routes.route("game", "start", touches_db=True, rate_limit="write")
+    async def handle_game_start(self, data: dict, websocket: WebSocketServerProtocol) -> dict:
+        """Deal the board out to the commanders and start simulating it"""
+        request = GameStartRequest.model_validate(data)
+        lobby_id = request.lobby_id
+        session = await self.get_session(lobby_id)
+        if not session:
+            return {"type": "error", "message": "Lobby not found"}
+        if not self.commander_in(session, request.player_id, websocket):
+            return {"type": "error", "message": "Only a commander can start the game"}
+        if self.simulation.get(lobby_id):
+            return {"type": "error", "message": "Game already started"}
+        # A game left in progress by a restart is dealt out again, as boards are not persisted
+        if session.status not in ("waiting", "in_progress"):
+            return {"type": "error", "message": "Game already finished"}
+        # A lone commander owns every territory, so nothing is ever captured and the game never ends
+        if len(session.get_members(PlayerRole.COMMANDER)) < MIN_COMMANDERS:
+            return {"type": "error", "message": f"At least {MIN_COMMANDERS} commanders are needed to start"}
+        if session.status != "in_progress":
+            await self.set_lobby_status(session, "in_progress")
+        board = self.simulation.new_board(
+            lobby_id,
+            list(session.get_members(PlayerRole.COMMANDER)),
+            move_ticks=max(1, round(2.0 * self.simulation.tick_rate))
+        )
+        logger.info("Game started", lobby_id=lobby_id, territories=len(board.table))
+        # The full board follows with the next tick
+        return {"type": "game", "action": "started", "lobby_id": str(lobby_id), "tick": board.tick}
+
+    async def game_command(self, lobby_id: UUID, player_id: UUID, websocket: WebSocketServerProtocol) -> Optional[Board]:
+        """Board a commander's order applies to, if they may give one"""
+        session = await self.get_session(lobby_id)
+        if not session or not self.commander_in(session, player_id, websocket):
+            return None
+        return self.simulation.get(lobby_id)
+
+    @routes.route("game", "move", rate_limit="game")
+    async def handle_game_move(self, data: dict, websocket: WebSocketServerProtocol) -> dict:
+        request = MoveOrderRequest.model_validate(data)
+        board = await self.game_command(request.lobby_id, request.player_id, websocket)
+        if board is None:
+            return {"type": "error", "message": "No game to command"}
+        try:
+            order = board.move(request.player_id, request.source, request.target, request.units)
+        except ValueError as e:
+            return {"type": "error", "message": str(e)}
+        return {"type": "game", "action": "move", "order": order.record()}
+
+    @routes.route("game", "deploy", rate_limit="game")
+    async def handle_game_deploy(self, data: dict, websocket: WebSocketServerProtocol) -> dict:
+        request = DeployRequest.model_validate(data)
+        board = await self.game_command(request.lobby_id, request.player_id, websocket)
+        if board is None:
+            return {"type": "error", "message": "No game to command"}
+        try:
+            territory = board.deploy(request.player_id, request.territory, request.units)
+        except ValueError as e:
+            return {"type": "error", "message": str(e)}
+        return {"type": "game", "action": "deploy", "territory": territory}
+
+    @routes.route("game", "ack", idempotent=True, rate_limit="game", journal=False, read_only=True)
+    async def handle_game_ack(self, data: dict, websocket: WebSocketServerProtocol) -> None:
+        """Record the last state a client applied; later states are deltas against it"""
+        request = AckRequest.model_validate(data)
+        board = self.simulation.get(request.lobby_id)
+        if board and request.player_id in self.bound_players.get(websocket, ()):
+            board.acknowledge(request.player_id, request.tick)
+
+    def forget_ack(self, player_id: UUID, lobby_id: UUID) -> None:
+        # A new connection may hold none of the old one's state
+        board = self.simulation.get(lobby_id)
+        if board:
+            board.acks.pop(player_id, None)
 
-    async def handle_chat(self, data: dict) -> dict:
-        lobby_id = UUID(data.get("lobby_id"))
-        sender = data.get("sender")
-        message = data.get("message")
+    def send_board_state(self, board: Board) -> None:
+        """After each tick, send every member connected here the changes since the tick they acknowledged"""
+        session = self.game_state.get_session(board.session_id)
+        if session is None:
+            self.simulation.remove(board.session_id)
+            return
+        by_base: Dict[Optional[int], List[WebSocketServerProtocol]] = {}
+        for player_id in session.players:
+            websocket = self.connections.get(player_id)
+            if websocket is not None:
+                by_base.setdefault(board.acks.get(player_id), []).append(websocket)
+        # Members that acknowledged the same tick share one delta and one encoding
+        for base, recipients in by_base.items():
+            self.broadcaster.broadcast(recipients, {
+                "type": "game",
+                "action": "state",
+                "lobby_id": str(board.session_id),
+                **board.delta(base)
+            })
+        if board.winner is not None:
+            self.simulation.remove(board.session_id)
+            self.backplane.publish(lobby_channel(board.session_id), {
+                "message": {
+                    "type": "game",
+                    "action": "finished",
+                    "lobby_id": str(board.session_id),
+                    "winner": str(board.winner),
+                    "tick": board.tick
+                },
+                "exclude": []
+            })
+            task = asyncio.create_task(self.finish_game(session))
+            self._game_tasks.add(task)
+            task.add_done_callback(self._game_tasks.discard)
+
+    async def finish_game(self, session: GameSession) -> None:
+        """Mark a won game finished; retention deletes it once finished_lobby_ttl has passed"""
+        try:
+            await self.executor.run(str(session.id), self.set_lobby_status, session, "finished")
+        except Exception:
+            logger.error("Failed to finish game", lobby_id=session.id, exc_info=True)
+
+    async def set_lobby_status(self, session: GameSession, status: str) -> None:
+        """Store a lobby's new status and tell its members and the lobby list"""
+        await self.db.update_lobby(str(session.id), {**session.record(), "status": status})
+        session.status = status
+        self.event_log.record("lobby_status", lobby_id=str(session.id), status=status)
+        delta = self.cache_lobby(session)
+        await self.publish_lobby_changes([delta])
+        self.broadcast_lobby_update(session, delta["lobby"])
+
+    @routes.route("chat", rate_limit="chat")
+    async def handle_chat(self, data: dict, websocket: WebSocketServerProtocol) -> dict:
+        request = ChatRequest.model_validate(data)
+        lobby_id = request.lobby_id
+        sender = request.sender
+        message = request.message
         
-        session = self.game_state.get_session(lobby_id)
+        session = await self.get_session(lobby_id)
         if not session:
             return {"type": "error", "message": "Lobby not found"}
             
+        self.event_log.record("chat", lobby_id=str(lobby_id), sender=sender, message=message)
         # Broadcast the message to all players in the lobby
-        for player_id in session.players:
-            if player_id in self.connections:
-                await self.connections[player_id].send(json.dumps({
-                    "type": "chat",
-                    "lobby_id": str(lobby_id),
-                    "sender": sender,
-                    "message": message
-                }))
+        self.backplane.publish(lobby_channel(lobby_id), {
+            "message": {
+                "type": "chat",
+                "lobby_id": str(lobby_id),
+                "sender": sender,
+                "message": message
+            },
+            "exclude": []
+        })
                 
         return {"type": "chat", "status": "sent"}
\ No newline at end of file
@@ -0,0 +1,149 @@
+import asyncio
+import hashlib
+from bisect import bisect
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional
+from uuid import UUID, uuid4
+
+import websockets
+
+from src.log import get_logger
+from src.models.codec import JSON
+
+logger = get_logger(__name__)
+
+def _hash(key: str) -> int:
+    return int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), "big")
+
+class HashRing:
+    """Consistent hash ring mapping lobby IDs to shards.
+
+    Each shard is placed on the ring at ``replicas`` points so lobbies spread
+    evenly, and changing the shard count only moves the lobbies whose nearest
+    point changed owner.
+    """
+
+    def __init__(self, shards: int, replicas: int = 64):
+        if shards < 1:
+            raise ValueError("A hash ring needs at least one shard")
+        self.shards = shards
+        points = sorted(
+            (_hash(f"shard-{shard}-{replica}"), shard) for shard in range(shards) for replica in range(replicas)
+        )
+        self._keys = [key for key, _ in points]
+        self._owners = [shard for _, shard in points]
+
+    def owner(self, lobby_id: Any) -> int:
+        """Shard that owns a lobby"""
+        index = bisect(self._keys, _hash(str(lobby_id))) % len(self._keys)
+        return self._owners[index]
+
+    def new_id(self, shard: int) -> UUID:
+        """Mint a lobby ID owned by ``shard``; takes ``shards`` attempts on average"""
+        while True:
+            lobby_id = uuid4()
+            if self.owner(lobby_id) == shard:
+                return lobby_id
+
+@dataclass(frozen=True, slots=True)
+class ClusterConfig:
+    """Addresses used by the router, the summary hub and the shard workers"""
+    shards: int
+    host: str = "localhost"
+    port: int = 8000
+    # The summary hub listens on internal_port and shard N on internal_port + 1 + N
+    internal_host: str = "127.0.0.1"
+    internal_port: int = 9000
+    # Redis URL for the chat and lobby update backplane; None keeps it in-process
+    backplane_url: Optional[str] = None
+    # Database URL; None keeps the default SQLite file
+    database_url: Optional[str] = None
+    # Where retention writes archived commands
+    archive_dir: str = "archive"
+    # Each shard keeps its event log in a shard-<id> directory below this one
+    event_log_dir: str = "events"
+    # Key for resume tokens; run_cluster picks a random one shared by the workers if unset
+    resume_secret: Optional[str] = None
+    # Connections each worker accepts before refusing more; None only refuses while overloaded
+    max_connections: Optional[int] = None
+
+    def worker_port(self, shard: int) -> int:
+        return self.internal_port + 1 + shard
+
+    def worker_uri(self, shard: int) -> str:
+        return f"ws://{self.internal_host}:{self.worker_port(shard)}"
+
+    @property
+    def hub_uri(self) -> str:
+        return f"ws://{self.internal_host}:{self.internal_port}"
+
+@dataclass(frozen=True, slots=True)
+class Shard:
+    """A worker's place in the cluster"""
+    id: int
+    ring: HashRing
+    config: ClusterConfig
+
+    def owns(self, lobby_id: Any) -> bool:
+        return self.ring.owner(lobby_id) == self.id
+
+class SummaryChannel:
+    """A worker's connection to the cluster's lobby summary hub.
+
+    Lobby deltas produced by this worker are published to the hub, which
+    forwards them to every other worker, so each worker can serve the lobby
+    list for the whole cluster. On every (re)connect the worker sends a
+    snapshot of the lobbies it owns and receives the hub's current view.
+    """
+
+    def __init__(
+        self,
+        uri: str,
+        snapshot: Callable[[], List[Dict[str, Any]]],
+        on_changes: Callable[[List[Dict[str, Any]]], None],
+        retry_interval: float = 0.5,
+    ):
+        self.uri = uri
+        self.snapshot = snapshot
+        self.on_changes = on_changes
+        self.retry_interval = retry_interval
+        self._connection = None
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def close(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def publish(self, changes: List[Dict[str, Any]]) -> None:
+        """Send local lobby deltas to the hub; dropped while disconnected, as the next snapshot covers them"""
+        if self._connection is None or not changes:
+            return
+        try:
+            await self._connection.send(JSON.encode({"changes": changes}))
+        except websockets.exceptions.ConnectionClosed:
+            pass
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                async with websockets.connect(self.uri) as connection:
+                    await connection.send(JSON.encode({"changes": self.snapshot()}))
+                    self._connection = connection
+                    logger.info("Connected to summary hub", uri=self.uri)
+                    async for frame in connection:
+                        self.on_changes(JSON.decode(frame)["changes"])
+            except (OSError, websockets.exceptions.WebSocketException) as e:
+                logger.warning("Summary hub unavailable", uri=self.uri, error=str(e))
+            finally:
+                self._connection = None
+            await asyncio.sleep(self.retry_interval)
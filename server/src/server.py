@@ -1,16 +1,61 @@
 import asyncio
-import logging
+import os
+from src.database.factory import database_from_url
+from src.database.retention import RetentionPolicy
+from src.game import EventLog
+from src.log import configure_logging, get_logger
+from src.network.backplane import backplane_from_url
+from src.network.limits import AdmissionControl
 from src.network.server import GameServer
 
-logging.basicConfig(level=logging.INFO)
-logger = logging.getLogger(__name__)
+logger = get_logger(__name__)
 
 async def main():
-    server = GameServer()
+    log_profile = os.environ.get("LOG_PROFILE", "development")
+    log_level = os.environ.get("LOG_LEVEL")
+    configure_logging(log_profile, log_level)
+    metrics_port = int(os.environ["METRICS_PORT"]) if os.environ.get("METRICS_PORT") else None
+    redis_url = os.environ.get("REDIS_URL")
+    database_url = os.environ.get("DATABASE_URL")
+    archive_dir = os.environ.get("ARCHIVE_DIR", "archive")
+    event_log_dir = os.environ.get("EVENT_LOG_DIR", "events")
+    resume_secret = os.environ.get("RESUME_SECRET")
+    max_connections = int(os.environ["MAX_CONNECTIONS"]) if os.environ.get("MAX_CONNECTIONS") else None
+    max_connections_per_host = (
+        int(os.environ["MAX_CONNECTIONS_PER_HOST"]) if os.environ.get("MAX_CONNECTIONS_PER_HOST") else None
+    )
+    shards = int(os.environ.get("SHARDS", "1"))
+    if shards > 1:
+        # Imported here so single-process runs never load multiprocessing
+        from src.network.router import run_cluster
+        from src.network.shard import ClusterConfig
+        config = ClusterConfig(
+            shards=shards,
+            internal_port=int(os.environ.get("SHARD_BASE_PORT", "9000")),
+            backplane_url=redis_url,
+            database_url=database_url,
+            archive_dir=archive_dir,
+            event_log_dir=event_log_dir,
+            resume_secret=resume_secret,
+            max_connections=max_connections
+        )
+        await run_cluster(config, log_profile, log_level, metrics_port)
+        return
+    server = GameServer(
+        metrics_port=metrics_port,
+        backplane=backplane_from_url(redis_url),
+        db=database_from_url(database_url),
+        retention=RetentionPolicy(archive_dir=archive_dir),
+        event_log=EventLog(event_log_dir),
+        resume_secret=resume_secret,
+        admission=AdmissionControl(
+            max_connections=max_connections, max_connections_per_host=max_connections_per_host
+        )
+    )
     try:
         await server.start()
     except KeyboardInterrupt:
         logger.info("Server shutting down...")
 
 if __name__ == "__main__":
-    asyncio.run(main()) 
\ No newline at end of file
+    asyncio.run(main()) 
@@ -0,0 +1,35 @@
+import asyncio
+import contextlib
+
+import pytest
+
+from src.database.retention import RetentionPolicy
+from src.database.sqlite import SQLiteDatabase
+from src.game import EventLog
+from src.network.server import GameServer
+
+
+@pytest.fixture
+async def game_server(tmp_path):
+    """A GameServer on a free local port, backed by a fresh SQLite database"""
+    server = GameServer(
+        port=0,
+        db=SQLiteDatabase(str(tmp_path / "risker.db")),
+        retention=RetentionPolicy(archive_dir=str(tmp_path / "archive")),
+        event_log=EventLog(str(tmp_path / "events"), fsync=False),
+        ping_interval=None,
+        ping_timeout=None
+    )
+    task = asyncio.create_task(server.start())
+    while server.server is None:
+        if task.done():
+            task.result()
+        await asyncio.sleep(0.01)
+    port = next(iter(server.server.sockets)).getsockname()[1]
+    server.uri = f"ws://127.0.0.1:{port}"
+    try:
+        yield server
+    finally:
+        task.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await task
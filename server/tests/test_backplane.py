@@ -0,0 +1,98 @@
+import asyncio
+
+import pytest
+
+from src.network import backplane as backplane_module
+from src.network.backplane import (
+    InProcessBackplane,
+    RedisBackplane,
+    backplane_from_url,
+    lobby_channel,
+)
+
+
+@pytest.fixture
+def fakeredis():
+    return pytest.importorskip("fakeredis")
+
+@pytest.fixture
+def redis_server(monkeypatch, fakeredis):
+    server = fakeredis.FakeServer()
+    monkeypatch.setattr(
+        backplane_module.redis, "from_url", lambda url: fakeredis.FakeAsyncRedis(server=server)
+    )
+    return server
+
+async def wait_for(received, count):
+    for _ in range(200):
+        if len(received) >= count:
+            return
+        await asyncio.sleep(0.01)
+    raise AssertionError(f"expected {count} messages, got {received}")
+
+def test_backplane_from_url_checks_scheme():
+    assert isinstance(backplane_from_url(None), InProcessBackplane)
+    assert isinstance(backplane_from_url(""), InProcessBackplane)
+    assert isinstance(backplane_from_url("redis://localhost:6379/0"), RedisBackplane)
+    assert isinstance(backplane_from_url("rediss://cache.example:6380/1"), RedisBackplane)
+    for url in ("http://localhost:6379", "localhost:6379", "memory://"):
+        with pytest.raises(ValueError, match="Unsupported backplane URL"):
+            backplane_from_url(url)
+
+async def test_in_process_fan_out():
+    backplane = InProcessBackplane()
+    await backplane.start()
+    received = []
+    await backplane.subscribe(
+        "lobby:1", lambda channel, message: received.append((channel, message))
+    )
+    backplane.publish("lobby:1", {"n": 1})
+    backplane.publish("lobby:2", {"n": 2})
+    await backplane.close()
+    assert received == [("lobby:1", {"n": 1})]
+
+async def test_redis_fan_out_between_processes(redis_server):
+    sender, receiver = RedisBackplane(), RedisBackplane()
+    await sender.start()
+    await receiver.start()
+    try:
+        first, second = [], []
+        await receiver.subscribe(lobby_channel(1), lambda channel, message: first.append(message))
+        await receiver.subscribe(lobby_channel(1), lambda channel, message: second.append(message))
+        await receiver.subscribe(lobby_channel(2), lambda channel, message: first.append(message))
+        for n in range(3):
+            sender.publish(lobby_channel(1), {"n": n})
+        await sender.flush()
+        await wait_for(second, 3)
+        assert first == second == [{"n": 0}, {"n": 1}, {"n": 2}]
+    finally:
+        await sender.close()
+        await receiver.close()
+
+async def test_redis_reader_survives_bad_messages_and_errors(
+    redis_server, fakeredis
+):
+    receiver = RedisBackplane()
+    await receiver.start()
+    # The reader has not run yet; its first listen() fails
+    async def failing_listen():
+        raise TimeoutError("read timed out")
+        yield
+    failed = receiver._pubsub
+    failed.listen = failing_listen
+    try:
+        received = []
+        await receiver.subscribe(
+            lobby_channel(1), lambda channel, message: received.append(message)
+        )
+        publisher = fakeredis.FakeAsyncRedis(server=redis_server)
+        # The reader starts over on a new subscriber after a pause
+        while receiver._pubsub is failed or not receiver._pubsub.subscribed:
+            await asyncio.sleep(0.05)
+        await publisher.publish("risker:" + lobby_channel(1), b"not json")
+        await publisher.publish("risker:" + lobby_channel(1), b'{"n": 1}')
+        await wait_for(received, 1)
+        assert received == [{"n": 1}]
+        await publisher.aclose()
+    finally:
+        await receiver.close()
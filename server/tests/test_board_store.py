@@ -0,0 +1,70 @@
+import random
+from uuid import uuid4
+
+import pytest
+
+from src.game import BoardStore, Simulation, TerritoryTable
+
+pytest.importorskip("numpy")
+
+CAPTURE_CHANCE = 0.5
+# Captures favour the first commander so some boards are won
+FAVOURITE_CHANCE = 0.7
+
+
+def capture(board, territory: int, commander: int) -> None:
+    # What an arriving order that takes the territory does
+    board.table.owner[territory] = commander
+    board._captured = True
+
+def assert_same(lists: Simulation, store: Simulation) -> None:
+    assert lists.boards.keys() == store.boards.keys()
+    for session_id, expected in lists.boards.items():
+        board = store.boards[session_id]
+        assert isinstance(expected.table, TerritoryTable)
+        assert not isinstance(board.table, TerritoryTable)
+        assert board.winner == expected.winner
+        assert board.delta(None)["territories"] == expected.delta(None)["territories"]
+        assert board._resources() == pytest.approx(expected._resources())
+
+def test_store_matches_territory_tables():
+    rng = random.Random(7)
+    lists = Simulation(vectorized=False)
+    store = Simulation(vectorized=True)
+    # Small enough that adding boards grows both the rows and the slots
+    store.store = BoardStore(capacity=16, slots=2)
+
+    def add_board(commanders: int) -> None:
+        session_id, players = uuid4(), [uuid4() for _ in range(commanders)]
+        lists.new_board(session_id, players)
+        store.new_board(session_id, players)
+
+    def play(ticks: int) -> None:
+        for _ in range(ticks):
+            for session_id, board in lists.boards.items():
+                if rng.random() < CAPTURE_CHANCE:
+                    territory = rng.randrange(len(board.table))
+                    favourite = rng.random() < FAVOURITE_CHANCE
+                    commander = 0 if favourite else rng.randrange(len(board.commanders))
+                    capture(board, territory, commander)
+                    capture(store.boards[session_id], territory, commander)
+            lists.step()
+            store.step()
+            assert_same(lists, store)
+
+    for commanders in (2, 3, 4, 2, 3):
+        add_board(commanders)
+    play(40)
+    assert any(board.winner for board in lists.boards.values())
+
+    # Removing most boards compacts the store; new boards reuse the freed slots
+    rows = store.store.size
+    for session_id in list(lists.boards)[:4]:
+        lists.remove(session_id)
+        store.remove(session_id)
+    assert store.store.size < rows
+    live = sum(len(board.table) for board in store.boards.values())
+    assert store.store.size - store.store.dead == live
+    for commanders in (4, 2, 3):
+        add_board(commanders)
+    play(40)
@@ -0,0 +1,61 @@
+import asyncio
+import json
+
+from src.network.broadcast import Broadcaster, ConnectionWriter, SlowConsumerPolicy
+
+
+class FakeSocket:
+    """Collects sent frames; ``fail`` makes the next send raise"""
+
+    def __init__(self, fail: bool = False):
+        self.subprotocol = None
+        self.remote_address = ("127.0.0.1", 0)
+        self.sent = []
+        self.closed = None
+        self.fail = fail
+
+    async def send(self, frame):
+        if self.fail:
+            raise RuntimeError("send failed")
+        self.sent.append(frame)
+
+    async def close(self, code=1000, reason=""):
+        self.closed = code
+
+def lobby_update(lobby_id, n):
+    return {"type": "lobby", "action": "update", "lobby": {"id": lobby_id, "n": n}}
+
+async def test_replies_are_not_dropped_or_superseded():
+    socket = FakeSocket()
+    broadcaster = Broadcaster(max_queue=2, policy=SlowConsumerPolicy.DROP_OLDEST)
+    # The join reply has the shape of a lobby update but carries the resume token
+    reply = {**lobby_update("a", 0), "resume_token": "token"}
+    assert broadcaster.send(socket, reply)
+    broadcaster.broadcast([socket], lobby_update("a", 1))
+    broadcaster.broadcast([socket], lobby_update("b", 2))
+    broadcaster.broadcast([socket], lobby_update("c", 3))
+    writer = broadcaster.writers[socket]
+    assert writer.dropped == 2
+    await asyncio.sleep(0)
+    await asyncio.sleep(0)
+    assert [json.loads(frame) for frame in socket.sent] == [reply, lobby_update("c", 3)]
+    await broadcaster.close()
+
+async def test_queue_full_of_replies_disconnects():
+    socket = FakeSocket()
+    writer = ConnectionWriter(socket, max_queue=1, policy=SlowConsumerPolicy.DROP_OLDEST)
+    assert writer.enqueue("reply 1")
+    assert not writer.enqueue("reply 2")
+    await asyncio.sleep(0)
+    assert socket.closed == 1013
+
+async def test_send_error_closes_the_connection():
+    socket = FakeSocket(fail=True)
+    writer = ConnectionWriter(socket)
+    writer.start()
+    writer.enqueue("frame")
+    await asyncio.sleep(0)
+    await asyncio.sleep(0)
+    assert socket.closed == 1011
+    assert not writer.enqueue("later")
+    await writer.close()
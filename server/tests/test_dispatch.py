@@ -0,0 +1,30 @@
+import json
+from uuid import uuid4
+
+import websockets
+
+from src.network.server import routes
+
+
+async def test_non_string_type_is_answered_and_keeps_the_connection(game_server):
+    async with websockets.connect(game_server.uri) as websocket:
+        await websocket.send(json.dumps({"type": ["lobby"], "action": "list"}))
+        reply = json.loads(await websocket.recv())
+        assert reply == {"type": "error", "message": "Unknown message type"}
+
+        await websocket.send(json.dumps({"type": "lobby", "action": {"list": True}}))
+        reply = json.loads(await websocket.recv())
+        assert reply == {"type": "error", "message": "Unknown lobby action"}
+
+        await websocket.send(json.dumps({"type": "lobby", "action": "list"}))
+        assert json.loads(await websocket.recv())["type"] == "lobby"
+
+
+def test_lobby_ids_share_one_ordering_key_whatever_their_spelling(game_server):
+    route = routes.resolve("lobby", "join")
+    lobby_id = uuid4()
+    spellings = (str(lobby_id), str(lobby_id).upper(), lobby_id.hex, f"{{{lobby_id}}}")
+    keys = {game_server.ordering_key(route, {"lobby_id": value}, "socket") for value in spellings}
+    assert keys == {str(lobby_id)}
+    assert game_server.ordering_key(route, {"lobby_id": "not-a-uuid"}, "socket") == "socket"
+    assert game_server.ordering_key(route, {"lobby_id": ["x"]}, "socket") == "socket"
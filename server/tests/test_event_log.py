@@ -0,0 +1,127 @@
+import asyncio
+import contextlib
+from uuid import uuid4
+
+from src.game import EventLog
+from src.models import GameState
+from src.models.game import Player, PlayerRole
+
+
+def make_log(tmp_path, **kwargs) -> EventLog:
+    return EventLog(str(tmp_path / "events"), snapshot_interval=3600, fsync=False, **kwargs)
+
+async def crash(log: EventLog) -> None:
+    """Stop a log the way a killed process would: no final flush or snapshot"""
+    log._snapshotter.cancel()
+    with contextlib.suppress(asyncio.CancelledError):
+        await log._snapshotter
+    log._segment.close()
+
+def record(log: EventLog, state: GameState, event_type: str, **fields) -> None:
+    """Change the state and log the change, as the server does"""
+    state.apply({"type": event_type, **fields})
+    log.record(event_type, **fields)
+
+def lobby(name: str) -> dict:
+    return {
+        "id": str(uuid4()), "name": name, "max_commanders": 2, "max_pawns": 4,
+        "status": "waiting", "created_at": 0.0,
+    }
+
+def join(lobby_id: str, name: str) -> dict:
+    player = Player(name=name, role=PlayerRole.PAWN)
+    return {"lobby_id": lobby_id, "player": player.record()}
+
+def segment_lines(tmp_path) -> list:
+    [segment] = (tmp_path / "events").glob("events-*.log")
+    return segment, segment.read_bytes().splitlines(keepends=True)
+
+async def test_recovers_from_snapshot_and_tail(tmp_path):
+    log, live = make_log(tmp_path), GameState()
+    await log.open(live)
+    first, second = lobby("First"), lobby("Second")
+    record(log, live, "lobby_created", lobby=first)
+    record(log, live, "player_joined", **join(first["id"], "Early"))
+    await log.snapshot()
+    record(log, live, "player_joined", **join(first["id"], "Late"))
+    record(log, live, "lobby_created", lobby=second)
+    await log.flush()
+    await crash(log)
+
+    state = GameState()
+    recovered = make_log(tmp_path)
+    assert await recovered.open(state) == 2
+    assert recovered.seq == 4
+    sessions = {session.name: session for session in state.sessions.values()}
+    assert sorted(player.name for player in sessions["First"].players.values()) == ["Early", "Late"]
+    assert "Second" in sessions
+    await recovered.close()
+
+async def test_torn_write_is_cut_off(tmp_path):
+    log = make_log(tmp_path)
+    await log.open(GameState())
+    created = lobby("Torn")
+    log.record("lobby_created", lobby=created)
+    await log.flush()
+    await crash(log)
+    segment, [line] = segment_lines(tmp_path)
+    with open(segment, "ab") as torn:
+        torn.write(line[:len(line) // 2])
+
+    state = GameState()
+    recovered = make_log(tmp_path)
+    assert await recovered.open(state) == 1
+    assert segment.read_bytes() == line
+    # Appends continue after the cut, and the next recovery reads them
+    recovered.record("player_joined", **join(created["id"], "After"))
+    await recovered.flush()
+    await crash(recovered)
+
+    state = GameState()
+    assert await make_log(tmp_path).open(state) == 2
+    [session] = state.sessions.values()
+    assert [player.name for player in session.players.values()] == ["After"]
+
+async def test_corrupt_event_mid_log_is_skipped(tmp_path):
+    log = make_log(tmp_path)
+    await log.open(GameState())
+    created = lobby("Corrupt")
+    log.record("lobby_created", lobby=created)
+    for name in ("Lost", "Kept"):
+        log.record("player_joined", **join(created["id"], name))
+    await log.flush()
+    await crash(log)
+    segment, lines = segment_lines(tmp_path)
+    lines[1] = lines[1].replace(b"Lost", b"Lust")
+    segment.write_bytes(b"".join(lines))
+
+    state = GameState()
+    recovered = make_log(tmp_path)
+    assert await recovered.open(state) == 2
+    assert recovered.seq == len(lines)
+    [session] = state.sessions.values()
+    assert [player.name for player in session.players.values()] == ["Kept"]
+    await recovered.close()
+
+async def test_compaction_drops_covered_segments_and_old_snapshots(tmp_path):
+    log, live = make_log(tmp_path, segment_bytes=1, keep_snapshots=2), GameState()
+    await log.open(live)
+    created = lobby("Compacted")
+    record(log, live, "lobby_created", lobby=created)
+    for number in range(3):
+        record(log, live, "player_joined", **join(created["id"], f"Player {number}"))
+        await log.flush()
+        await log.snapshot()
+    directory = tmp_path / "events"
+    # One event per segment; of the snapshots at 2, 3 and 4 the last two are kept,
+    # and every segment up to the older one is covered by it
+    assert sorted(path.name for path in directory.glob("snapshot-*")) == [
+        f"snapshot-{seq:020d}.json.gz" for seq in (3, 4)
+    ]
+    assert [path.name for path in directory.glob("events-*")] == [f"events-{4:020d}.log"]
+    await log.close()
+
+    state = GameState()
+    assert await make_log(tmp_path).open(state) == 0
+    [session] = state.sessions.values()
+    assert len(session.players) == 3
@@ -0,0 +1,35 @@
+import json
+
+import websockets
+
+
+async def test_game_needs_two_commanders(game_server):
+    async with (
+        websockets.connect(game_server.uri) as host,
+        websockets.connect(game_server.uri) as guest,
+    ):
+        await host.send(json.dumps({"type": "lobby", "action": "create", "name": "Duel"}))
+        created = json.loads(await host.recv())
+        start = {
+            "type": "game",
+            "action": "start",
+            "lobby_id": created["lobby"]["id"],
+            "player_id": created["player_id"]
+        }
+        await host.send(json.dumps(start))
+        assert json.loads(await host.recv()) == {
+            "type": "error", "message": "At least 2 commanders are needed to start"
+        }
+
+        await guest.send(json.dumps({
+            "type": "lobby",
+            "action": "join",
+            "lobby_id": created["lobby"]["id"],
+            "role": "commander",
+            "name": "Guest",
+        }))
+        assert json.loads(await guest.recv())["lobby"]["commanders"]
+        await host.send(json.dumps(start))
+        while (reply := json.loads(await host.recv()))["type"] != "game":
+            pass
+        assert reply["action"] == "started"
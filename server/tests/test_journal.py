@@ -0,0 +1,25 @@
+import json
+import time
+
+import websockets
+
+
+async def test_binary_frame_on_json_connection_is_journaled(game_server):
+    async with websockets.connect(game_server.uri) as ws:
+        assert ws.subprotocol is None
+        await ws.send(json.dumps({"type": "lobby", "action": "create", "name": "Binary"}))
+        created = json.loads(await ws.recv())
+        lobby_id = created["lobby"]["id"]
+        # A JSON connection may send its messages as binary frames
+        await ws.send(json.dumps({"type": "chat", "lobby_id": lobby_id, "message": "hi"}).encode())
+        replies = [json.loads(await ws.recv()) for _ in range(2)]
+        assert {"type": "chat", "status": "sent"} in replies
+
+    await game_server.journal.flush()
+    # Handled commands are marked processed
+    assert await game_server.db.get_unprocessed_commands() == []
+    commands = await game_server.db.get_commands_before(time.time() + 1, processed=True)
+    chat = [command for command in commands if command["message_type"] == "chat"]
+    assert [command["payload"]["message"] for command in chat] == ["hi"]
+    stats = await game_server.maintenance.run_once(now=chat[0]["timestamp"] + 30 * 86400)
+    assert stats["commands"] >= 1
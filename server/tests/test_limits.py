@@ -0,0 +1,71 @@
+import asyncio
+from http import HTTPStatus
+
+import pytest
+import websockets
+
+from src.network.dispatch import Route
+from src.network.limits import AdmissionControl, RateLimit, RateLimiter, RateLimits, TokenBucket
+
+
+async def handler(*args):
+    return None
+
+WRITE = Route("lobby", "create", handler, rate_limit="write")
+
+def test_bucket_allows_a_burst_then_refills_at_its_rate():
+    bucket = TokenBucket(RateLimit(rate=2, burst=3))
+    now = bucket.updated
+    assert [bucket.take(now) for _ in range(4)] == [True, True, True, False]
+    assert bucket.retry_after() == pytest.approx(0.5)
+    assert not bucket.take(now + 0.25)
+    assert bucket.take(now + 0.5)
+    # Idle time refills no further than the burst
+    later = now + 60
+    assert [bucket.take(later) for _ in range(4)] == [True, True, True, False]
+
+def test_route_limit_rejects_with_retry_after():
+    limiter = RateLimiter(RateLimits(
+        connection=RateLimit(100, 100), routes={"lobby:create": RateLimit(1, 2)}, shared={}
+    )).for_connection()
+    assert limiter.check(WRITE) is None
+    assert limiter.check(WRITE) is None
+    retry_after = limiter.check(WRITE)
+    assert 0 < retry_after <= 1
+    # Other routes are only held to the connection limit
+    assert limiter.check(Route("chat", None, handler, rate_limit="chat")) is None
+
+def test_refused_message_takes_no_token_from_other_buckets():
+    rate_limiter = RateLimiter(RateLimits(
+        connection=RateLimit(0, 10),
+        routes={"write": RateLimit(0, 5)},
+        shared={"write": RateLimit(0, 1)},
+    ))
+    first, second = rate_limiter.for_connection(), rate_limiter.for_connection()
+    assert first.check(WRITE) is None
+    # The shared bucket is empty now, so the second connection's own buckets are left full
+    for _ in range(3):
+        assert second.check(WRITE) == float("inf")
+    assert second._connection.tokens == 10
+    assert second._routes["write"].tokens == 5
+
+def test_admission_caps_connections_overall_and_per_host():
+    admission = AdmissionControl(max_connections=10, max_connections_per_host=2)
+    assert admission.admits(connections=3, in_flight=0, host_connections=1)
+    assert not admission.admits(connections=3, in_flight=0, host_connections=2)
+    assert not admission.admits(connections=10, in_flight=0, host_connections=0)
+    assert not admission.admits(connections=0, in_flight=admission.max_in_flight + 1)
+    admission.lag = admission.max_lag * 2
+    assert not admission.admits(connections=0, in_flight=0)
+
+async def test_server_refuses_connections_over_the_per_host_cap(game_server):
+    game_server.admission.max_connections_per_host = 1
+    async with websockets.connect(game_server.uri):
+        with pytest.raises(websockets.exceptions.InvalidStatus) as refused:
+            await websockets.connect(game_server.uri)
+        assert refused.value.response.status_code == HTTPStatus.SERVICE_UNAVAILABLE
+    # The slot is given back once the first connection is gone
+    while game_server.host_connections:
+        await asyncio.sleep(0.01)
+    async with websockets.connect(game_server.uri):
+        pass
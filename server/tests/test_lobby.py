@@ -0,0 +1,28 @@
+import json
+from uuid import UUID
+
+import websockets
+
+
+async def test_only_the_bound_connection_can_remove_a_player(game_server):
+    connect = websockets.connect
+    async with connect(game_server.uri) as host, connect(game_server.uri) as other:
+        await host.send(json.dumps({"type": "lobby", "action": "create", "name": "Mine"}))
+        created = json.loads(await host.recv())
+        leave = {
+            "type": "lobby",
+            "action": "leave",
+            "lobby_id": created["lobby"]["id"],
+            "player_id": created["player_id"]
+        }
+
+        await other.send(json.dumps(leave))
+        assert json.loads(await other.recv()) == {
+            "type": "error", "message": "Player not bound to this connection"
+        }
+        session = game_server.game_state.get_session(UUID(created["lobby"]["id"]))
+        assert UUID(created["player_id"]) in session.players
+
+        await host.send(json.dumps(leave))
+        assert json.loads(await host.recv())["action"] == "update"
+        assert not session.players
@@ -0,0 +1,22 @@
+import json
+from uuid import uuid4
+
+import websockets
+
+from src.game import LobbyCache
+from src.models import GameSession
+
+
+def test_lobbies_page_after_cursor():
+    cache = LobbyCache()
+    sessions = [GameSession(id=uuid4(), name=f"Lobby {n}", created_at=float(n)) for n in range(3)]
+    for session in sessions:
+        cache.update(session)
+    names = [lobby["name"] for lobby in cache.lobbies(cursor=sessions[0].id)]
+    assert names == ["Lobby 1", "Lobby 2"]
+    assert cache.lobbies(cursor=uuid4()) == []
+
+async def test_malformed_cursor_is_a_protocol_error(game_server):
+    async with websockets.connect(game_server.uri) as ws:
+        await ws.send(json.dumps({"type": "lobby", "action": "list", "cursor": "not-a-uuid"}))
+        assert json.loads(await ws.recv()) == {"type": "error", "message": "Invalid message"}
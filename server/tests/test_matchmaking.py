@@ -0,0 +1,86 @@
+from uuid import uuid4
+
+from src.game import Matchmaker
+from src.models import GameSession, GameState, PlayerRole
+
+
+def new_session(ticket):
+    return GameSession(id=uuid4(), name=f"{ticket.name}'s game")
+
+def test_skill_counts_only_once_placed():
+    matchmaker = Matchmaker()
+    state = GameState()
+    matchmaker.enqueue("Host", PlayerRole.COMMANDER, 1250)
+    [match], _ = matchmaker.assign(state, new_session, now=0.0)
+    session = match.session
+    assert matchmaker.session_bucket(session.id) is None
+    assert matchmaker.session_bucket(session.id, match) == 12
+
+    matchmaker.placed(match)
+    assert matchmaker.session_bucket(session.id) == 12
+
+def test_released_match_leaves_ratings_and_requeues():
+    matchmaker = Matchmaker()
+    state = GameState()
+    session = GameSession(id=uuid4(), name="Open")
+    state.sessions[session.id] = session
+    matchmaker.update(session)
+    older = matchmaker.enqueue("Older", PlayerRole.PAWN, 900)
+    [match], _ = matchmaker.assign(state, new_session, now=0.0)
+    newer = matchmaker.enqueue("Newer", PlayerRole.PAWN, 900)
+
+    matchmaker.release(match, requeue=True)
+    assert matchmaker.session_bucket(session.id) is None
+    assert session.get_pawn_count() == 0
+    assert list(matchmaker.queue) == [older.id, newer.id]
+
+async def test_match_for_a_started_lobby_is_requeued(game_server):
+    session = GameSession(id=uuid4(), name="Started")
+    game_server.game_state.sessions[session.id] = session
+    game_server.matchmaker.update(session)
+    ticket = game_server.matchmaker.enqueue("Pawn", PlayerRole.PAWN, 1000)
+    [match], _ = game_server.matchmaker.assign(
+        game_server.game_state, game_server.new_match_session
+    )
+    # The game started between the pass and the write
+    session.status = "in_progress"
+
+    await game_server.executor.run(str(session.id), game_server.place_match, match)
+    assert session.players == {}
+    assert session.get_pawn_count() == 0
+    assert ticket.id in game_server.matchmaker.queue
+    assert game_server.matchmaker.session_bucket(session.id) is None
+
+async def test_placed_players_are_written_under_their_ticket_ids(game_server):
+    tickets = [
+        game_server.matchmaker.enqueue(name, PlayerRole.COMMANDER, 1000) for name in ("A", "B")
+    ]
+    matches, _ = game_server.matchmaker.assign(
+        game_server.game_state, game_server.new_match_session
+    )
+    for match in matches:
+        await game_server.executor.run(str(match.session.id), game_server.place_match, match)
+
+    for ticket in tickets:
+        row = await game_server.db.get_player(str(ticket.id))
+        assert row["name"] == ticket.name
+    [lobby_id] = {str(match.session.id) for match in matches}
+    members = await game_server.db.get_lobby_players(lobby_id)
+    assert {member["id"] for member in members} == {str(ticket.id) for ticket in tickets}
+
+def test_restoring_members_keeps_slots_reserved_for_matches():
+    state = GameState()
+    lobby = {
+        "id": str(uuid4()), "name": "Hydrated", "max_commanders": 2, "max_pawns": 2,
+        "status": "waiting", "created_at": 0.0,
+    }
+    session = state.restore_session(lobby, [])
+    assert session.try_reserve_slot(PlayerRole.PAWN)
+    # A member written before the restart is loaded while the matchmaker holds a slot
+    state.apply({
+        "type": "player_joined",
+        "lobby_id": lobby["id"],
+        "player": {"id": str(uuid4()), "name": "Stored", "role": "pawn"},
+    })
+    assert not session.can_join_as_pawn()
+    assert not session.try_reserve_slot(PlayerRole.PAWN)
@@ -0,0 +1,23 @@
+from src.game import EventLog
+from src.game.event_log import EVENT_FSYNC_SECONDS, SNAPSHOT_SECONDS
+from src.metrics import REGISTRY
+from src.models import GameState
+
+
+async def write_and_snapshot(directory) -> None:
+    log = EventLog(str(directory), fsync=False)
+    await log.open(GameState())
+    await log.record("chat", lobby_id="lobby", sender="a", message="hi")
+    await log.snapshot()
+    await log.close()
+
+async def test_disabled_registry_records_nothing(tmp_path, monkeypatch):
+    monkeypatch.setattr(REGISTRY, "enabled", False)
+    before = EVENT_FSYNC_SECONDS.count(), SNAPSHOT_SECONDS.count()
+    await write_and_snapshot(tmp_path / "disabled")
+    assert (EVENT_FSYNC_SECONDS.count(), SNAPSHOT_SECONDS.count()) == before
+
+    monkeypatch.setattr(REGISTRY, "enabled", True)
+    await write_and_snapshot(tmp_path / "enabled")
+    assert EVENT_FSYNC_SECONDS.count() > before[0]
+    assert SNAPSHOT_SECONDS.count() > before[1]
@@ -0,0 +1,111 @@
+import os
+import time
+from uuid import uuid4
+
+import pytest
+
+from src.database.postgres import PostgresDatabase
+from src.database.retention import Maintenance, RetentionPolicy
+
+# Never DATABASE_URL: the fixture empties the tables of whatever database it points at
+TEST_DATABASE_URL = os.environ.get("TEST_DATABASE_URL", "")
+
+pytestmark = pytest.mark.skipif(
+    not TEST_DATABASE_URL.startswith(("postgres://", "postgresql://")),
+    reason="set TEST_DATABASE_URL to a disposable Postgres to run the Postgres backend tests"
+)
+
+@pytest.fixture
+async def db():
+    pytest.importorskip("asyncpg")
+    database = PostgresDatabase(TEST_DATABASE_URL, min_size=1, max_size=4)
+    await database.connect()
+    async with database._connection() as conn:
+        await conn.execute("TRUNCATE lobby_players, lobbies, players, websocket_commands")
+    try:
+        yield database
+    finally:
+        await database.disconnect()
+
+async def test_create_join_and_list(db):
+    async with db.transaction():
+        lobby = await db.create_lobby("Postgres", 2, 4)
+        commander = await db.create_player("Host", "commander")
+        await db.add_player_to_lobby(commander["id"], lobby["id"])
+    pawn = await db.create_player("Pawn", "pawn")
+    assert await db.add_players_to_lobby([pawn["id"]], lobby["id"]) == 1
+    assert await db.add_player_to_lobby(pawn["id"], lobby["id"]) is False
+
+    row = await db.get_lobby(lobby["id"])
+    assert row["commanders"] == [commander["id"]]
+    assert row["pawns"] == [pawn["id"]]
+    other = await db.create_lobby("Later", 2, 4)
+    waiting = await db.list_lobbies(status="waiting")
+    assert [row["id"] for row in waiting] == [lobby["id"], other["id"]]
+    page = await db.list_lobbies(limit=1, cursor=lobby["id"])
+    assert [row["id"] for row in page] == [other["id"]]
+    members = await db.get_lobbies_players([lobby["id"], other["id"]])
+    assert {member["id"] for member in members[lobby["id"]]} == {commander["id"], pawn["id"]}
+    assert members[other["id"]] == []
+
+    given = str(uuid4())
+    created = await db.create_players([(given, "Ticket", "pawn"), (None, "Generated", "pawn")])
+    assert created[0]["id"] == given
+    assert (await db.get_player(created[1]["id"]))["name"] == "Generated"
+
+async def test_transaction_rolls_back(db):
+    with pytest.raises(RuntimeError):
+        async with db.transaction():
+            lobby = await db.create_lobby("Rolled back", 2, 4)
+            raise RuntimeError("abort")
+    assert await db.get_lobby(lobby["id"]) is None
+
+async def test_journal_batch_roundtrip(db):
+    msgpack = pytest.importorskip("msgpack")
+    now = time.time()
+    commands = [
+        (str(uuid4()), "client", "chat", "unknown", '{"message": "text"}', "json", now),
+        (
+            str(uuid4()), "client", "chat", "unknown",
+            msgpack.packb({"message": "packed"}), "msgpack", now + 1,
+        ),
+        # A JSON connection may send a binary frame
+        (str(uuid4()), "client", "chat", "unknown", b'{"message": "binary json"}', "json", now + 2),
+    ]
+    assert await db.store_websocket_commands(commands) == 3
+
+    unprocessed = await db.get_unprocessed_commands()
+    messages = [command["payload"]["message"] for command in unprocessed]
+    assert messages == ["text", "packed", "binary json"]
+    assert await db.mark_commands_processed([commands[0][0], commands[1][0]]) == 2
+    processed = await db.get_commands_before(now + 10, processed=True)
+    assert [command["id"] for command in processed] == [commands[0][0], commands[1][0]]
+    assert await db.delete_commands([command["id"] for command in processed]) == 2
+    assert [command["id"] for command in await db.get_unprocessed_commands()] == [commands[2][0]]
+
+async def test_expiry_and_compaction(db, tmp_path):
+    finished = await db.create_lobby("Finished", 2, 4)
+    player = await db.create_player("Host", "commander")
+    await db.add_player_to_lobby(player["id"], finished["id"])
+    await db.update_lobby(finished["id"], {**finished, "status": "finished"})
+    waiting = await db.create_lobby("Waiting", 2, 4)
+    orphan = await db.create_player("Orphan", "pawn")
+    await db.store_websocket_commands(
+        [(str(uuid4()), orphan["id"], "chat", "unknown", "{}", "json", time.time())]
+    )
+    policy = RetentionPolicy(
+        archive_dir=str(tmp_path / "archive"),
+        command_retention=0,
+        finished_lobby_ttl=60,
+        abandoned_lobby_ttl=60,
+        player_ttl=60
+    )
+    maintenance = Maintenance(db, policy)
+
+    assert await maintenance.run_once(time.time()) == {"commands": 1, "lobbies": 0, "players": 0}
+    stats = await maintenance.run_once(time.time() + 120)
+    assert stats == {"commands": 0, "lobbies": 2, "players": 2}
+    assert await db.get_lobby(finished["id"]) is None
+    assert await db.get_lobby(waiting["id"]) is None
+    assert await db.get_player(orphan["id"]) is None
+    assert len(list((tmp_path / "archive").iterdir())) == 1
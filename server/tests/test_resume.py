@@ -0,0 +1,25 @@
+from uuid import uuid4
+
+from src.network.resume import ReplayBuffer, ResumeTokens
+
+
+def test_tokens_verify_only_for_their_player_and_lobby():
+    tokens = ResumeTokens("secret")
+    player_id, lobby_id = uuid4(), uuid4()
+    token = tokens.issue(player_id, lobby_id)
+    assert tokens.verify(token, player_id, lobby_id)
+    assert ResumeTokens("secret").verify(token, player_id, lobby_id)
+    assert not tokens.verify(token, uuid4(), lobby_id)
+    assert not ResumeTokens("other").verify(token, player_id, lobby_id)
+
+def test_non_ascii_token_is_rejected():
+    tokens = ResumeTokens("secret")
+    assert not tokens.verify("jéton", uuid4(), uuid4())
+    assert not tokens.verify("\ud800", uuid4(), uuid4())
+
+def test_replay_buffer_counts_dropped_messages():
+    buffer = ReplayBuffer(2)
+    for n in range(3):
+        buffer.append({"n": n})
+    assert list(buffer.messages) == [{"n": 1}, {"n": 2}]
+    assert buffer.dropped == 1
@@ -0,0 +1,107 @@
+import asyncio
+import time
+
+from src.database.retention import Maintenance, RetentionPolicy, read_segment
+from src.database.sqlite import SQLiteDatabase
+from src.network.dispatch import KeyedExecutor
+
+
+async def make_db(tmp_path) -> SQLiteDatabase:
+    db = SQLiteDatabase(str(tmp_path / "risker.db"))
+    await db.connect()
+    return db
+
+async def test_undecodable_command_does_not_block_retention(tmp_path):
+    db = await make_db(tmp_path)
+    try:
+        now = time.time()
+        await db.store_websocket_commands([
+            ("bad", "client", "chat", "unknown", b"\xc1not msgpack", "msgpack", now - 10),
+            ("good", "client", "chat", "unknown", '{"message": "hi"}', "json", now - 5),
+        ])
+        lobby = await db.create_lobby("Abandoned", 2, 4)
+        policy = RetentionPolicy(
+            archive_dir=str(tmp_path / "archive"), command_retention=0, abandoned_lobby_ttl=0
+        )
+        stats = await Maintenance(db, policy).run_once(now + 1)
+
+        assert stats == {"commands": 2, "lobbies": 1, "players": 0}
+        assert await db.get_lobby(lobby["id"]) is None
+        [segment] = (tmp_path / "archive").iterdir()
+        archived = {command["id"]: command["payload"] for command in read_segment(segment)}
+        assert archived["good"] == {"message": "hi"}
+        assert "undecodable" in archived["bad"]
+    finally:
+        await db.disconnect()
+
+async def test_failing_step_does_not_stop_the_others(tmp_path):
+    db = await make_db(tmp_path)
+    try:
+        async def broken(*args):
+            raise RuntimeError("boom")
+        db.get_commands_before = broken
+        lobby = await db.create_lobby("Abandoned", 2, 4)
+        policy = RetentionPolicy(archive_dir=str(tmp_path / "archive"), abandoned_lobby_ttl=0)
+        stats = await Maintenance(db, policy).run_once(time.time() + 1)
+
+        assert stats["lobbies"] == 1
+        assert await db.get_lobby(lobby["id"]) is None
+    finally:
+        await db.disconnect()
+
+async def test_finished_lobby_expires_after_it_finished(tmp_path):
+    db = await make_db(tmp_path)
+    try:
+        lobby = await db.create_lobby("Long game", 2, 4)
+        player = await db.create_player("Host", "commander")
+        await db.add_player_to_lobby(player["id"], lobby["id"])
+        # The game ran for longer than the retention window before it finished
+        await db.conn.execute("UPDATE lobbies SET created_at = created_at - 7200")
+        await db.conn.commit()
+        await db.update_lobby(lobby["id"], {**lobby, "status": "in_progress"})
+        await db.update_lobby(lobby["id"], {**lobby, "status": "finished"})
+        finished = time.time()
+        policy = RetentionPolicy(archive_dir=str(tmp_path / "archive"), finished_lobby_ttl=3600)
+        maintenance = Maintenance(db, policy)
+
+        assert (await maintenance.run_once(finished + 60))["lobbies"] == 0
+        assert await db.get_lobby(lobby["id"]) is not None
+        # Once its players are gone it is not taken for abandoned either
+        await db.remove_player_from_lobby(player["id"], lobby["id"])
+        assert (await maintenance.run_once(finished + 60))["lobbies"] == 0
+        assert (await maintenance.run_once(finished + 3660))["lobbies"] == 1
+    finally:
+        await db.disconnect()
+
+async def test_lobby_expiry_waits_for_the_lobby_turn(tmp_path):
+    db = await make_db(tmp_path)
+    try:
+        lobby = await db.create_lobby("Abandoned", 2, 4)
+        executor = KeyedExecutor()
+        joined = set()
+        maintenance = Maintenance(
+            db,
+            RetentionPolicy(archive_dir=str(tmp_path / "archive"), abandoned_lobby_ttl=0),
+            select_lobbies=lambda lobby_ids: [
+                lobby_id for lobby_id in lobby_ids if lobby_id not in joined
+            ],
+            run_for_lobby=executor.run
+        )
+        release = asyncio.Event()
+
+        async def join():
+            await release.wait()
+            joined.add(lobby["id"])
+
+        # A join already queued for the lobby runs before the deletion does
+        joining = asyncio.create_task(executor.run(lobby["id"], join))
+        await asyncio.sleep(0)
+        expiring = asyncio.create_task(maintenance.run_once(time.time() + 1))
+        await asyncio.sleep(0.05)
+        release.set()
+        await joining
+
+        assert (await expiring)["lobbies"] == 0
+        assert await db.get_lobby(lobby["id"]) is not None
+    finally:
+        await db.disconnect()
@@ -0,0 +1,23 @@
+from uuid import uuid4
+
+from src.network.router import ShardRouter
+from src.network.shard import ClusterConfig, HashRing
+
+
+def test_equivalent_lobby_ids_route_to_the_owning_shard():
+    ring = HashRing(4)
+    router = ShardRouter(ClusterConfig(shards=4), ring)
+    for _ in range(50):
+        lobby_id = uuid4()
+        owner = ring.owner(lobby_id)
+        spellings = (str(lobby_id).upper(), lobby_id.hex, f"{{{lobby_id}}}", f"urn:uuid:{lobby_id}")
+        for spelling in spellings:
+            assert router.shard_for({"lobby_id": spelling}, home=-1) == owner
+
+
+def test_invalid_lobby_ids_go_to_the_home_shard():
+    router = ShardRouter(ClusterConfig(shards=4), HashRing(4))
+    home = 3
+    for lobby_id in ("not-a-uuid", "", 42, ["x"], None):
+        assert router.shard_for({"lobby_id": lobby_id}, home) == home
+    assert router.shard_for({"type": "lobby", "action": "create"}, home) == home